@@ -16,6 +16,13 @@ import uuid
 from decimal import Decimal
 from app.utils.email_utils import send_admin_rejection_notification, send_admin_confirmation_to_owner, send_admin_response_to_seeker
 from app.utils.eav_utils import save_property_eav_values  # Fix: import manquant causant NameError sur PUT /admin/properties/<id>
+from app.utils.pagination_utils import keyset_paginate
+from app.utils.attribute_resolver import invalidate_attribute_resolver
+from app.utils.serialization_utils import serialize_properties
+from app.utils.search_index_utils import (
+    sync_property_search_index, sync_properties_search_index, sync_search_index_for_status,
+    sync_search_index_for_attribute, remove_attribute_from_search_index, apply_fulltext_search
+)
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 from sqlalchemy import inspect
@@ -109,6 +116,8 @@ def update_property_status(status_id):
         if 'display_order' in data: status_obj.display_order = data['display_order']
         if 'is_deterministic' in data: status_obj.is_deterministic = data['is_deterministic']
         
+        # Un statut devenu déterministe (vendu, loué...) masque ses biens des listings publics
+        sync_search_index_for_status(status_obj.id)
         db.session.commit()
         return jsonify(status_obj.to_dict()), 200
     except Exception as e:
@@ -184,6 +193,18 @@ if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
 # ------------- DASHBOARD -------------
+@admin_bp.route('/system/http-metrics', methods=['GET'])
+@jwt_required()
+def get_http_metrics():
+    """Latences des appels HTTP sortants (FedaPay, Nominatim) par hôte, pour le worker qui répond."""
+    from app.utils.http_client import get_http_client
+
+    user = User.query.get(get_jwt_identity())
+    if not user or user.role != 'admin':
+        return jsonify({'message': 'Accès non autorisé.'}), 403
+
+    return jsonify({'pid': os.getpid(), 'hosts': get_http_client().metrics()}), 200
+
 @admin_bp.route('/dashboard/stats', methods=['GET'])
 def get_dashboard_stats():
     from sqlalchemy import func, extract
@@ -409,10 +430,11 @@ def delete_user(user_id):
             prop.deleted_at = datetime.utcnow()
             prop.deletion_reason = f"Cascade: Compte propriétaire ({original_email}) archivé par admin."
     
-    db.session.commit()
-    
-    # Notification
+    sync_properties_search_index(user_properties)
+
+    # Notification (outbox, même transaction que l'archivage)
     send_account_deletion_email(original_email, user.first_name, reason)
+    db.session.commit()
 
     return jsonify({'message': 'Utilisateur archivé avec succès. Ses annonces ont été masquées.'}), 200
 
@@ -447,6 +469,7 @@ def restore_user(user_id):
             prop.deleted_at = None
             prop.deletion_reason = None
 
+    sync_properties_search_index(user_properties)
     db.session.commit()
     return jsonify({'message': 'Utilisateur et ses annonces restaurés avec succès.'}), 200
 
@@ -460,21 +483,16 @@ def get_properties():
     property_type_id = request.args.get('property_type_id')
     status_id = request.args.get('status_id')
     is_validated = request.args.get('is_validated')
+    cursor = request.args.get('cursor')  # Pagination par curseur si fourni (vide = première page)
 
     # 2. Base Query (Exclude soft-deleted)
     query = Property.query.filter(Property.deleted_at == None).options(selectinload(Property.owner))
 
     # 3. Apply Search (Keyword in title, description, city, address) - Tâche 20
+    # Recherche plein-texte (FULLTEXT / FTS5) au lieu d'un ILIKE '%mot%' par mot
+    relevance = None
     if search_query:
-        words = search_query.split()
-        for word in words:
-            pattern = f"%{word}%"
-            query = query.filter(db.or_(
-                Property.title.ilike(pattern),
-                Property.description.ilike(pattern),
-                Property.city.ilike(pattern),
-                Property.address.ilike(pattern)
-            ))
+        query, relevance = apply_fulltext_search(query, Property.id, search_query)
 
     # 4. Apply Filters
     if property_type_id:
@@ -496,12 +514,38 @@ def get_properties():
             query = query.filter(Property.is_validated == True)
 
     # 5. Sorting & Pagination
-    query = query.order_by(Property.created_at.desc())
+    # Le tri par pertinence n'est pas compatible avec un curseur (created_at, id)
+    if relevance is not None and cursor is None:
+        query = query.order_by(relevance.desc())
+    query = query.order_by(Property.created_at.desc(), Property.id.desc())
+
+    if cursor is not None:
+        # Keyset : pas d'OFFSET, COUNT(*) uniquement si include_total=true
+        include_total = request.args.get('include_total', 'false').lower() in ['true', '1']
+        try:
+            items, next_cursor, total = keyset_paginate(
+                query, cursor, limit, Property.created_at, Property.id,
+                key_fn=lambda p: (p.created_at, p.id),
+                include_total=include_total
+            )
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+
+        response = {
+            'properties': serialize_properties(items),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
+            'limit': limit
+        }
+        if total is not None:
+            response['total'] = total
+        return jsonify(response)
+
     pagination = query.paginate(page=page, per_page=limit, error_out=False)
 
     # 6. Response construction
     return jsonify({
-        'properties': [p.to_dict() for p in pagination.items],
+        'properties': serialize_properties(pagination.items),
         'total': pagination.total,
         'page': page,
         'limit': limit,
@@ -523,15 +567,14 @@ def validate_property(property_id):
     prop.is_validated = True
 
     try:
-        db.session.commit()
+        sync_property_search_index(prop)
         
         if should_run_matching:
-            # TRIGGER MATCHING ENGINE
-            try:
-                from app.utils.matching_utils import find_matches_for_property
-                find_matches_for_property(prop.id)
-            except Exception as e:
-                current_app.logger.error(f"Error running matching engine: {e}")
+            # TRIGGER MATCHING ENGINE : job asynchrone enregistré dans la même transaction (exécuté par le worker)
+            from app.utils.job_queue import enqueue_job, JOB_MATCH_PROPERTY
+            enqueue_job(JOB_MATCH_PROPERTY, {'property_id': prop.id})
+
+        db.session.commit()
 
     except Exception as e:
         db.session.rollback()
@@ -572,6 +615,7 @@ def invalidate_property(property_id):
             send_property_invalidation_email(owner.email, prop.title, reason)
 
 
+    sync_property_search_index(prop)
     db.session.commit()
     return jsonify({'message': f"Bien invalidé.", 'property': prop.to_dict()}), 200
 
@@ -604,12 +648,13 @@ def delete_property_admin(property_id):
         visit.status = 'rejected'
         visit.message = f"Bien supprimé par l'administrateur. Raison: {reason}"
 
-    db.session.commit()
-    
-    # Notify Owner
+    sync_property_search_index(prop)
+
+    # Notify Owner (outbox, même transaction que la suppression)
     owner = User.query.get(prop.owner_id)
     if owner:
         send_property_invalidation_email(owner.email, prop.title, f"Votre bien a été supprimé par l'administration. Raison: {reason}")
+    db.session.commit()
 
     return jsonify({'message': f"Bien '{prop.title}' supprimé avec succès."}), 200
 
@@ -630,6 +675,7 @@ def restore_property_admin(property_id):
 
     prop.deleted_at = None
     prop.deletion_reason = None
+    sync_property_search_index(prop)
     db.session.commit()
     return jsonify({'message': f"Bien '{prop.title}' restauré avec succès."}), 200
 
@@ -657,7 +703,7 @@ def get_deleted_properties():
     pagination = query.paginate(page=page, per_page=limit, error_out=False)
 
     return jsonify({
-        'properties': [p.to_dict() for p in pagination.items],
+        'properties': serialize_properties(pagination.items),
         'total': pagination.total,
         'page': page,
         'limit': limit,
@@ -732,6 +778,7 @@ def add_property_attribute():
         return jsonify({'message': 'Nom déjà utilisé.'}), 409
     attr = PropertyAttribute(name=name, data_type=data_type, is_filterable=data.get('is_filterable', False))
     db.session.add(attr)
+    invalidate_attribute_resolver()
     db.session.commit()
     if data_type == 'enum' and 'options' in data:
         for val in data['options']:
@@ -1074,8 +1121,9 @@ def mark_property_as_transacted(property_id):
 
     # Si un agent doit être payé (Parrainage à la première demande)
     if agent_to_pay and agent_to_pay.role == 'agent':
-        # SÉCURITÉ : Verrouillage pour mise à jour solde
-        agent = User.query.with_for_update().get(agent_to_pay.id)
+        # Pas de verrou sur l'agent : le solde est mis à jour par un UPDATE atomique du grand livre
+        from app.utils.ledger import credit_commission
+        agent = agent_to_pay
         
         # Récupérer le pourcentage
         commission_setting = AppSetting.query.filter_by(setting_key='agent_commission_percentage').first()
@@ -1088,12 +1136,12 @@ def mark_property_as_transacted(property_id):
             commission_amount = round(commission_amount, 2)
             
             # 1. Créer la commission
-            db.session.add(Commission(agent_id=agent.id, property_id=prop.id, amount=commission_amount, status='paid'))
+            commission = Commission(agent_id=agent.id, property_id=prop.id, amount=commission_amount, status='paid')
+            db.session.add(commission)
+            db.session.flush()
             
-            # 2. Update Wallet
-            if agent.wallet_balance is None:
-                agent.wallet_balance = Decimal(0)
-            agent.wallet_balance += commission_amount
+            # 2. Créditer le portefeuille (écritures du grand livre + wallet_balance = wallet_balance + montant)
+            credit_commission(commission, description=f'Commission pour le bien: {prop.title}'[:255])
             
             # 3. Transaction Record
             db.session.add(Transaction(
@@ -1115,6 +1163,7 @@ def mark_property_as_transacted(property_id):
                 current_app.logger.warning(f"Échec envoi email commission: {e}")
 
         except Exception as e:
+            db.session.rollback()
             current_app.logger.error(f"Erreur calcul commission: {e}")
             return jsonify({'message': 'Erreur lors du calcul de la commission.'}), 500
 
@@ -1135,6 +1184,7 @@ def mark_property_as_transacted(property_id):
              current_app.logger.warning(f"Échec envoi email client (deal closed): {e}")
 
     try:
+        sync_property_search_index(prop)
         db.session.commit()
         return jsonify({'message': f"Bien marqué comme {new_status}.", 'property': prop.to_dict()}), 200
     except Exception as e:
@@ -1150,14 +1200,22 @@ def get_all_property_requests():
     Récupère les demandes de biens (alertes clients).
     Par défaut, exclut les alertes archivées.
     Utilisez ?include_archived=true pour inclure les archivées.
+    Filtre optionnel sur les critères (en SQL) : ?criterion=clé:valeur (répétable).
     """
+    from app.utils.alert_index_utils import request_listing_options, parse_criteria_filters, apply_criteria_filters
+
     include_archived = request.args.get('include_archived', 'false').lower() == 'true'
+    try:
+        criteria_filters = parse_criteria_filters(request.args.getlist('criterion'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     
-    query = PropertyRequest.query
+    query = PropertyRequest.query.options(*request_listing_options())
     
     # Filtrer les archivées par défaut
     if not include_archived:
         query = query.filter(PropertyRequest.archived_at == None)
+    query = apply_criteria_filters(query, criteria_filters)
     
     requests = query.order_by(PropertyRequest.created_at.desc()).all()
     return jsonify([req.to_dict() for req in requests]), 200 # Assurez-vous d'avoir une méthode to_dict() sur le modèle
@@ -1180,6 +1238,8 @@ def respond_to_property_request(request_id):
         # Mettre à jour la demande dans la base de données
         prop_request.status = 'contacted'
         prop_request.admin_notes = response_message
+        from app.utils.alert_index_utils import sync_property_request_index
+        sync_property_request_index(prop_request)
         
         # Récupérer les informations du client pour l'email
         customer = prop_request.customer
@@ -1368,6 +1428,8 @@ def update_property_attribute(attribute_id):
 
     # 5. Sauvegarder les changements
     try:
+        sync_search_index_for_attribute(attr.id)
+        invalidate_attribute_resolver()
         db.session.commit()
         return jsonify({'message': 'Attribut mis à jour avec succès.', 'attribute': attr.to_dict()}), 200
     except Exception as e:
@@ -1403,7 +1465,9 @@ def delete_property_attribute(attribute_id):
     # Si la vérification passe, l'attribut n'est pas utilisé et peut être supprimé.
     # La suppression des options et des scopes se fait en cascade grâce à la configuration de la BDD.
     try:
+        remove_attribute_from_search_index(attr.name)
         db.session.delete(attr)
+        invalidate_attribute_resolver()
         db.session.commit()
         return jsonify({'message': 'Attribut supprimé avec succès.'}), 204 # 204 No Content est standard pour un DELETE réussi
     except Exception as e:
@@ -1425,6 +1489,9 @@ def update_property_by_admin(property_id):
 
     # Vérifier que le bien existe
     property = Property.query.get_or_404(property_id)
+    # État de matching avant modification (re-matching incrémental des alertes, voir plus bas)
+    from app.utils.match_engine import load_property_snapshot, diff_property_snapshots
+    previous_snapshot = load_property_snapshot(property.id)
 
     data = request.get_json()
     if not data:
@@ -1528,6 +1595,18 @@ def update_property_by_admin(property_id):
     # -------------------------------
 
     try:
+        sync_property_search_index(property)
+
+        if property.is_validated:
+            # Prix, ville, statut ou caractéristiques modifiés : seules les alertes concernées sont re-scorées (worker)
+            db.session.flush()
+            fields, attribute_keys = diff_property_snapshots(previous_snapshot, load_property_snapshot(property.id))
+            if fields or attribute_keys:
+                from app.utils.job_queue import enqueue_job, JOB_REMATCH_PROPERTY
+                enqueue_job(JOB_REMATCH_PROPERTY, {
+                    'property_id': property.id, 'fields': fields, 'attribute_keys': attribute_keys
+                })
+
         db.session.commit()
         return jsonify({
             'message': "Bien immobilier mis à jour avec succès par l'admin.",
@@ -1627,9 +1706,8 @@ def confirm_visit_request_admin(request_id):
         
         visit_request.status = 'accepted'
         visit_request.customer_has_unread_update = True
-        db.session.commit()
         
-        # Notifier le CLIENT que la visite est définitivement confirmée
+        # Notifier le CLIENT que la visite est définitivement confirmée (outbox, même transaction)
         try:
             customer = User.query.get(visit_request.customer_id)
             prop = Property.query.get(visit_request.property_id)
@@ -1641,6 +1719,7 @@ def confirm_visit_request_admin(request_id):
                 )
         except Exception as email_err:
             current_app.logger.warning(f"Erreur email confirmation client: {email_err}")
+        db.session.commit()
         
         current_app.logger.info(f"Demande de visite {request_id} confirmée (accepted) par admin {current_user_id}")
         
@@ -1681,9 +1760,8 @@ def reject_visit_request_admin(request_id):
 
         visit_request.status = 'rejected'
         visit_request.customer_has_unread_update = True
-        db.session.commit()
 
-        # Notifier le client
+        # Notifier le client (outbox, même transaction)
         try:
             from app.utils.email_utils import send_admin_rejection_notification
             customer = User.query.get(visit_request.customer_id)
@@ -1692,6 +1770,7 @@ def reject_visit_request_admin(request_id):
                 send_admin_rejection_notification(customer.email, prop.title, rejection_message)
         except Exception as email_err:
             current_app.logger.warning(f"Erreur email rejet client: {email_err}")
+        db.session.commit()
         
         current_app.logger.info(f"Demande de visite {request_id} rejetée par admin {current_user_id}")
         
@@ -1738,9 +1817,8 @@ def mark_visit_completed_admin(request_id):
 
         visit_request.status = 'completed'
         visit_request.customer_has_unread_update = True
-        db.session.commit()
         
-        # Envoyer l'email de visite effectuée (Tâche 3)
+        # Envoyer l'email de visite effectuée (Tâche 3) (outbox, même transaction)
         if customer:
             try:
                 from app.utils.email_utils import send_visit_completed_email
@@ -1750,6 +1828,7 @@ def mark_visit_completed_admin(request_id):
                 send_visit_completed_email(customer.email, customer_name, prop_title)
             except Exception as email_err:
                 current_app.logger.error(f"Erreur lors de l'envoi de l'email de visite effectuée: {email_err}")
+        db.session.commit()
         
         return jsonify({'message': 'Visite marquée comme effectuée. Le pass a été déduit.'}), 200
         
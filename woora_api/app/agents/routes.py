@@ -3,9 +3,11 @@ from app.models import Property, User, Referral, Commission, PropertyType, Prope
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.utils.helpers import generate_unique_referral_code
 from app.utils.eav_utils import save_property_eav_values
+from app.utils.search_index_utils import sync_property_search_index
 from app import db
 import requests
 import os
+from app.utils import http_client
 from sqlalchemy import func, or_, desc, case, cast, String, Numeric
 from app.models import PayoutRequest, Transaction
 from datetime import datetime
@@ -32,140 +34,18 @@ def get_all_properties_for_agent():
     if not agent or agent.role != 'agent':
         return jsonify({'message': "Accès non autorisé. Seuleument les agents peuvent accéder à cette ressource."}), 403
 
-    # --- DÉBUT DE LA CORRECTION ---
-    # Pagination
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
-
-    # Base query for general marketplace: Validated + Not Deleted
-    base_query = Property.query.options(
-        selectinload(Property.images),
-        selectinload(Property.property_type),
-        selectinload(Property.owner)
-    ).join(Property.owner).outerjoin(PropertyStatus).filter(
-        Property.is_validated == True,
-        Property.deleted_at == None,
-        User.deleted_at == None,
-        (PropertyStatus.is_deterministic == False) | (PropertyStatus.id == None)
-    )
-
-    # --- 1. Filtre par Statut (Dynamique) ---
-    status_param = request.args.get('status')
-    if status_param and status_param != 'null' and status_param != '':
-        base_query = base_query.filter(Property.status == status_param)
-    else:
-        # Comportement par défaut : Vente et Location
-        base_query = base_query.filter(Property.status.in_(['for_sale', 'for_rent']))
-
-    # --- 2. Filtres "Durs" (Exclusion) ---
-    # Recherche Textuelle (Tâche 20 : Double mots-clés)
-    search_query = request.args.get('search', '').strip()
-    if search_query:
-        words = search_query.split()
-        for word in words:
-            pattern = f"%{word}%"
-            base_query = base_query.filter(or_(
-                Property.title.ilike(pattern),
-                Property.city.ilike(pattern),
-                Property.address.ilike(pattern),
-                Property.description.ilike(pattern)
-            ))
-
-    # Filtrage par rayon géographique (Tâche 23 : GPS / Rayon de distance)
+    # Requête sur le read-model dénormalisé (PropertySearchIndex) : validé + non supprimé + statut public
+    # Pagination par curseur si `cursor` est fourni (défilement infini), sinon page / per_page.
+    from app.utils.search_index_utils import paginate_listing
+    from app.utils.geo_utils import haversine_km
+    from app.utils.serialization_utils import serialize_property_ids
     try:
-        lat_param = request.args.get('latitude')
-        lng_param = request.args.get('longitude')
-        radius_param = request.args.get('radius') # en kilomètres
-        
-        if lat_param and lng_param and radius_param:
-            lat_val = float(lat_param)
-            lng_val = float(lng_param)
-            radius_val = float(radius_param)
-            
-            # Formule de Haversine en SQL Alchemy
-            from sqlalchemy import func
-            distance = 6371 * func.acos(
-                func.cos(func.radians(lat_val)) * 
-                func.cos(func.radians(Property.latitude)) * 
-                func.cos(func.radians(Property.longitude) - func.radians(lng_val)) + 
-                func.sin(func.radians(lat_val)) * 
-                func.sin(func.radians(Property.latitude))
-            )
-            base_query = base_query.filter(distance <= radius_val)
-    except Exception as geo_err:
-        current_app.logger.error(f"Erreur lors du filtrage géographique par rayon: {geo_err}")
-
-    # Type de Bien
-    try:
-        property_type_id = request.args.get('property_type_id')
-        if property_type_id:
-            base_query = base_query.filter(Property.property_type_id == int(property_type_id))
-    except (ValueError, TypeError):
-        pass
-
-    # Prix Min / Max
-    try:
-        min_price = request.args.get('min_price')
-        if min_price:
-            base_query = base_query.filter(cast(Property.price, Numeric) >= float(min_price))
-        
-        max_price = request.args.get('max_price')
-        if max_price:
-            base_query = base_query.filter(cast(Property.price, Numeric) <= float(max_price))
-    except (ValueError, TypeError):
-        pass
+        entries, pagination_meta = paginate_listing(request.args, allow_country_filter=False)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
 
-    # --- 3. Filtres Dynamiques (Stricts avec EAV) ---
-    filters_json = request.args.get('filters')
-    if filters_json:
-        try:
-            dynamic_filters = json.loads(filters_json)
-            if isinstance(dynamic_filters, dict) and dynamic_filters:
-                from app.models import PropertyValue, PropertyAttribute
-                from sqlalchemy import and_
-                
-                for key, value in dynamic_filters.items():
-                    # Match exact basé sur le type reçu du JSON
-                    if isinstance(value, bool):
-                        cond = and_(
-                            func.lower(PropertyAttribute.name) == key.lower().strip(),
-                            PropertyValue.value_boolean == value
-                        )
-                    elif isinstance(value, int):
-                        cond = and_(
-                            func.lower(PropertyAttribute.name) == key.lower().strip(),
-                            PropertyValue.value_integer == value
-                        )
-                    elif isinstance(value, float):
-                        cond = and_(
-                            func.lower(PropertyAttribute.name) == key.lower().strip(),
-                            PropertyValue.value_decimal == str(value)
-                        )
-                    else:
-                        val_str = str(value).lower().strip()
-                        cond = and_(
-                            func.lower(PropertyAttribute.name) == key.lower().strip(),
-                            func.lower(PropertyValue.value_string) == val_str
-                        )
-                    
-                    # On exige que CET attribut avec CETTE valeur existe pour ce bien
-                    has_attr = db.session.query(PropertyValue.id).join(
-                        PropertyAttribute, PropertyValue.attribute_id == PropertyAttribute.id
-                    ).filter(
-                        PropertyValue.property_id == Property.id,
-                        cond
-                    ).exists()
-                    
-                    base_query = base_query.filter(has_attr)
-
-        except json.JSONDecodeError:
-            pass
-
-    # --- 4. Tri et Pagination ---
-    query = base_query.order_by(Property.created_at.desc())
-
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    properties = pagination.items
+    # Sérialisation de la page uniquement, directement depuis des tuples (sans hydratation ORM)
+    properties_list = serialize_property_ids([entry.property_id for entry in entries])
     
     lat_param = request.args.get('latitude')
     lng_param = request.args.get('longitude')
@@ -177,26 +57,14 @@ def get_all_properties_for_agent():
         except ValueError:
             pass
 
-    properties_list = []
-    for p in properties:
-        p_dict = p.to_dict()
-        if lat_val is not None and lng_val is not None and p.latitude is not None and p.longitude is not None:
-            import math
-            lat1, lon1 = math.radians(lat_val), math.radians(lng_val)
-            lat2, lon2 = math.radians(float(p.latitude)), math.radians(float(p.longitude))
-            dlon = lon2 - lon1
-            dlat = lat2 - lat1
-            a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-            c = 2 * math.asin(math.sqrt(a))
-            r = 6371 # Radius of earth in kilometers
-            p_dict['distance_km'] = round(c * r, 2)
-        properties_list.append(p_dict)
+    for p_dict in properties_list:
+        if lat_val is not None and lng_val is not None and p_dict['latitude'] is not None and p_dict['longitude'] is not None:
+            # Distance exacte calculée uniquement pour les biens de la page
+            p_dict['distance_km'] = round(haversine_km(lat_val, lng_val, p_dict['latitude'], p_dict['longitude']), 2)
 
     return jsonify({
         'properties': properties_list,
-        'total': pagination.total,
-        'pages': pagination.pages,
-        'current_page': page
+        **pagination_meta
     }), 200
 
 @agents_bp.route('/properties/<int:property_id>', methods=['GET'])
@@ -323,12 +191,25 @@ def get_agent_referrals_with_details():
 
     return jsonify(response_data), 200
 
+def _serialize_commission(comm):
+    return {
+        'id': comm.id,
+        'amount': float(comm.amount) if comm.amount is not None else 0.0,
+        'status': comm.status,
+        'created_at': comm.created_at.isoformat(),
+        'property_title': comm.property.title if comm.property else "Bien supprimé"
+    }
+
 @agents_bp.route('/commissions', methods=['GET'])
 @jwt_required()
 def get_agent_commissions():
     """
     Récupère le solde du portefeuille de l'agent et la liste détaillée de ses commissions.
+    Le solde est Users.wallet_balance (celui que débitent les demandes de virement) ; le grand livre
+    (snapshot + écritures récentes) ne fournit que les cumuls.
     """
+    from app.utils.ledger import wallet_summary
+
     current_user_id = get_jwt_identity()
     agent = User.query.get(current_user_id)
     
@@ -336,23 +217,18 @@ def get_agent_commissions():
         return jsonify({'message': "Accès non autorisé."}), 403
 
     # Récupérer toutes les commissions pour cet agent, triées par date (la plus récente en premier)
-    commissions = Commission.query.filter_by(agent_id=current_user_id).order_by(Commission.created_at.desc()).all()
-    
-    # Formater la liste des commissions
-    commission_list = []
-    for comm in commissions:
-        commission_list.append({
-            'id': comm.id,
-            'amount': float(comm.amount) if comm.amount is not None else 0.0,
-            'status': comm.status,
-            'created_at': comm.created_at.isoformat(),
-            'property_title': comm.property.title if comm.property else "Bien supprimé"
-        })
+    commissions = Commission.query.options(selectinload(Commission.property)).filter_by(
+        agent_id=current_user_id
+    ).order_by(Commission.created_at.desc()).all()
+
+    wallet = wallet_summary(agent.id)
 
     # Construire la réponse finale
     response_data = {
         'wallet_balance': float(agent.wallet_balance) if agent.wallet_balance is not None else 0.0,
-        'commissions': commission_list
+        'total_earned': float(wallet['total_earned']),
+        'total_withdrawn': float(wallet['total_withdrawn']),
+        'commissions': [_serialize_commission(comm) for comm in commissions]
     }
 
     return jsonify(response_data), 200
@@ -407,8 +283,14 @@ def get_property_types_for_agent():
 @agents_bp.route('/commissions/summary', methods=['GET'])
 @jwt_required()
 def get_commission_summary():
-    """Récupérer le résumé des commissions de l'agent"""
+    """
+    Récupérer le résumé des commissions de l'agent.
+    Le solde est Users.wallet_balance ; les cumuls des commissions créditées et des montants virés
+    viennent du grand livre (snapshot + écritures récentes).
+    """
     try:
+        from app.utils.ledger import wallet_summary
+
         current_user_id = get_jwt_identity()
         user = User.query.get(current_user_id)
         
@@ -425,6 +307,14 @@ def get_commission_summary():
             Commission.agent_id == current_user_id,
             Commission.status == 'paid'
         ).scalar() or 0
+
+        wallet = wallet_summary(user.id)
+        wallet_balance = user.wallet_balance or 0
+        
+        # Commissions récentes
+        recent_commissions = Commission.query.options(selectinload(Commission.property)).filter_by(
+            agent_id=current_user_id
+        ).order_by(Commission.created_at.desc()).limit(20).all()
         
         # Dernière demande de versement
         last_payout = PayoutRequest.query.filter_by(
@@ -436,12 +326,15 @@ def get_commission_summary():
         can_request_payout = float(total_commissions) >= min_payout_amount
         
         return jsonify({
+            'wallet_balance': float(wallet_balance),
+            'total_earned_commissions': float(wallet['total_earned']),
+            'total_withdrawn_commissions': float(wallet['total_withdrawn']),
             'total_pending_commissions': float(total_commissions),
             'total_paid_commissions': float(paid_commissions),
             'can_request_payout': can_request_payout,
             'minimum_payout_amount': min_payout_amount,
             'last_payout_request': last_payout.to_dict() if last_payout else None,
-            'commissions': [commission.to_dict() for commission in user.commissions_earned]
+            'commissions': [_serialize_commission(commission) for commission in recent_commissions]
         }), 200
         
     except Exception as e:
@@ -451,10 +344,11 @@ def get_commission_summary():
 @jwt_required()
 def request_commission_payout():
     """Demander un versement de commissions en se basant sur le solde du portefeuille."""
+    from app.utils.ledger import reserve_payout, release_payout, InsufficientFunds
     try:
         current_user_id = get_jwt_identity()
-        # ✅ VERROUILLAGE PESSIMISTE: On verrouille la ligne utilisateur pour éviter les race conditions (double dépense)
-        user = User.query.with_for_update().get(current_user_id)
+        # Pas de verrou sur l'utilisateur : le débit du grand livre est conditionnel (pas de double dépense)
+        user = User.query.get(current_user_id)
         
         if not user or user.role != 'agent':
             return jsonify({'error': 'Accès refusé.'}), 403
@@ -505,6 +399,14 @@ def request_commission_payout():
         )
         
         db.session.add(payout_request)
+        db.session.flush()
+        
+        # Montant débité du portefeuille dès la demande (recrédité si le virement échoue)
+        try:
+            reserve_payout(payout_request)
+        except InsufficientFunds:
+            db.session.rollback()
+            return jsonify({'error': 'Solde insuffisant : il a changé pendant la demande.'}), 409
         db.session.commit()
         
         # Initier le paiement avec FedaPay
@@ -517,6 +419,7 @@ def request_commission_payout():
         else:
             payout_request.status = 'failed'
             payout_request.error_message = fedapay_result.get('error', 'Erreur FedaPay inconnue')
+            release_payout(payout_request)
         
         db.session.commit()
         
@@ -588,7 +491,7 @@ def initiate_fedapay_payout(payout_request, payment_details):
         current_app.logger.info(f"=== FIN REQUÊTE FEDAPAY ===")
         
         # Étape 1: Créer le virement (Payout)
-        response = requests.post(
+        response = http_client.post(
             f'{fedapay_base_url}/payouts',
             json=payout_data,
             headers=headers,
@@ -623,7 +526,7 @@ def initiate_fedapay_payout(payout_request, payment_details):
         start_payload = {"payouts": [{"id": payout_id, "send_now": True}]}
         
         try:
-            start_response = requests.put(
+            start_response = http_client.put(
                 f'{fedapay_base_url}/payouts/start',
                 json=start_payload,
                 headers=headers,
@@ -705,92 +608,18 @@ def initiate_fedapay_payout(payout_request, payment_details):
 
 @agents_bp.route('/webhooks/fedapay/payout', methods=['POST'])
 def fedapay_payout_webhook():
-    """Webhook pour traiter les notifications de versement FedaPay et mettre à jour le solde."""
+    """
+    Notification de versement FedaPay : l'événement est enregistré (sans doublon) et la réponse part aussitôt.
+    Le solde et les commissions sont mis à jour par le worker (scripts/webhook_worker.py).
+    """
     try:
-        # ✅ AMÉLIORATION: Logger la requête webhook complète
-        webhook_data = request.get_json()
-        current_app.logger.info(f"=== WEBHOOK FEDAPAY PAYOUT REÇU ===")
-        current_app.logger.info(f"Headers: {dict(request.headers)}")
-        current_app.logger.info(f"Body: {json.dumps(webhook_data, indent=2)}")
-        current_app.logger.info(f"=== FIN WEBHOOK REÇU ===")
-        
-        data = webhook_data.get('data', {}) # Le payload est souvent dans une clé "data"
-        event = webhook_data.get('event') # ex: 'payout.approved'
-
-        if not data or not event:
-             # Si la structure n'est pas celle attendue, on prend le JSON racine
-             data = webhook_data
-             event = data.get('name') # FedaPay utilise 'name' pour l'événement et 'data' pour le payload
-
-        transaction_id = data.get('id')
-        status = data.get('status') # approved, declined, etc.
-        
-        current_app.logger.info(f"Webhook traité - Event: {event}, Transaction ID: {transaction_id}, Status: {status}")
-        
-        if not transaction_id:
-            return jsonify({'error': 'ID de transaction manquant dans le webhook'}), 400
-        
-        payout_request = PayoutRequest.query.filter_by(fedapay_transaction_id=str(transaction_id)).first()
-        
-        if not payout_request:
-            current_app.logger.warning(f"Demande de versement non trouvée pour transaction_id: {transaction_id}")
-            return jsonify({'error': 'Demande de versement non trouvée'}), 404
-        
-        # Éviter de traiter plusieurs fois le même webhook
-        if payout_request.status == 'completed' or payout_request.status == 'failed':
-            current_app.logger.info(f"Webhook déjà traité pour payout_request {payout_request.id}")
-            return jsonify({'message': 'Webhook déjà traité'}), 200
-
-        if status == 'approved':
-            # ✅ CORRECTION LOGIQUE : Mettre à jour le solde du portefeuille
-            agent = User.query.get(payout_request.agent_id)
-            if agent:
-                current_balance = float(agent.wallet_balance or 0.0)
-                payout_amount = float(payout_request.requested_amount)
-                agent.wallet_balance = current_balance - payout_amount
-                
-                current_app.logger.info(f"Solde agent {agent.id} mis à jour: {current_balance} -> {agent.wallet_balance}")
-            
-            payout_request.status = 'completed'
-            payout_request.completed_at = datetime.utcnow()
-            payout_request.actual_amount = payout_request.requested_amount # On suppose que le montant versé est celui demandé
-            
-            # Marquer toutes les commissions 'pending' comme 'paid'
-            updated_commissions = Commission.query.filter(
-                Commission.agent_id == payout_request.agent_id,
-                Commission.status == 'pending'
-            ).update({'status': 'paid'})
-            
-            current_app.logger.info(f"{updated_commissions} commissions marquées comme payées pour l'agent {payout_request.agent_id}")
-            
-            # Créer une transaction de type 'commission_payout'
-            transaction = Transaction(
-                user_id=payout_request.agent_id,
-                amount=-payout_request.actual_amount, # Montant négatif car c'est un retrait
-                type='commission_payout',
-                description=f'Virement FedaPay (Payout #{payout_request.id})',
-                related_entity_id=str(payout_request.id)
-            )
-            db.session.add(transaction)
-            
-        elif status in ['declined', 'failed']:
-            payout_request.status = 'failed'
-            payout_request.error_message = data.get('last_error_message', 'Versement échoué par FedaPay')
-            
-            current_app.logger.error(f"Payout {payout_request.id} échoué: {payout_request.error_message}")
-        
-        db.session.commit()
-        
-        current_app.logger.info(f"Webhook FedaPay traité avec succès pour payout_request {payout_request.id}")
-        return jsonify({'message': 'Webhook traité avec succès'}), 200
-        
+        from app.utils.webhook_events import ingest_webhook, PROVIDER_FEDAPAY_PAYOUT
+        body, status_code = ingest_webhook(PROVIDER_FEDAPAY_PAYOUT, request.get_data(), request.headers.get('X-FEDAPAY-SIGNATURE'))
+        return jsonify(body), status_code
     except Exception as e:
         db.session.rollback()
-        current_app.logger.error(f"=== ERREUR WEBHOOK FEDAPAY ===")
-        current_app.logger.error(f"Erreur: {str(e)}", exc_info=True)
-        current_app.logger.error(f"=== FIN ERREUR WEBHOOK ===")
-        
-        return jsonify({'error': 'Erreur interne lors du traitement du webhook'}), 500
+        current_app.logger.error(f"❌ Webhook FedaPay payout non enregistré: {e}", exc_info=True)
+        return jsonify({'error': 'Erreur interne lors de l\'enregistrement du webhook'}), 500
 
 # ===============================================
 # 5. ROUTE POUR L'HISTORIQUE DES VERSEMENTS
@@ -839,11 +668,13 @@ def get_payout_history():
 def request_withdrawal():
     """
     Initie une demande de virement (Payout) pour l'agent connecté.
-    Sécurisée avec statut de transition et débit différé par Webhook (Tâche 8).
+    Le montant est débité du portefeuille dès la demande par un débit conditionnel du grand livre
+    (pas de verrou sur l'utilisateur), puis recrédité si le virement échoue.
     """
+    from app.utils.ledger import reserve_payout, release_payout, InsufficientFunds
+
     current_user_id = get_jwt_identity()
-    # ✅ VERROUILLAGE PESSIMISTE
-    agent = User.query.with_for_update().get(current_user_id)
+    agent = User.query.get(current_user_id)
     
     if not agent or agent.role != 'agent':
         return jsonify({'message': "Accès non autorisé."}), 403
@@ -873,7 +704,7 @@ def request_withdrawal():
         amount_int = int(amount)
         if amount_int < 1000:
             return jsonify({'message': "Le montant minimum pour un virement est de 1000 FCFA."}), 400
-        if amount_int > agent.wallet_balance:
+        if amount_int > (agent.wallet_balance or 0):
             return jsonify({'message': "Solde insuffisant pour effectuer ce virement."}), 400
     except (ValueError, TypeError):
         return jsonify({'message': "Le montant doit être un nombre entier valide."}), 400
@@ -888,6 +719,12 @@ def request_withdrawal():
         phone_number=phone_number
     )
     db.session.add(payout_request)
+    db.session.flush()
+    try:
+        reserve_payout(payout_request)
+    except InsufficientFunds:
+        db.session.rollback()
+        return jsonify({'message': "Solde insuffisant pour effectuer ce virement."}), 400
     db.session.commit()
 
     # --- DÉBUT DE L'INTERACTION AVEC FEDAPAY ---
@@ -918,7 +755,7 @@ def request_withdrawal():
 
     try:
         # Étape 1 : Créer le Payout
-        response_create = requests.post(FEDAPAY_API_URL, headers=headers, json=payout_data)
+        response_create = http_client.post(FEDAPAY_API_URL, headers=headers, json=payout_data)
         response_create.raise_for_status() # Lève une exception pour les erreurs HTTP (4xx ou 5xx)
         payout_response_data = response_create.json()
         payout_id = payout_response_data.get('v1/payout', {}).get('id') or payout_response_data.get('id')
@@ -929,7 +766,7 @@ def request_withdrawal():
         # Étape 2 : Lancer le Payout immédiatement
         start_url = f"{FEDAPAY_API_URL}/start"
         start_data = { "payouts": [{ "id": payout_id, "send_now": True }] }
-        response_start = requests.put(start_url, headers=headers, json=start_data)
+        response_start = http_client.put(start_url, headers=headers, json=start_data)
         response_start.raise_for_status()
 
         # Étape 3 : Mettre à jour la demande en état 'processing' et stocker le payout ID
@@ -938,7 +775,7 @@ def request_withdrawal():
         payout_request.processed_at = datetime.utcnow()
         db.session.commit()
 
-        # Le solde n'est pas débité tout de suite. Il le sera par le webhook sur payout.approved !
+        # Le solde est déjà débité ; le webhook payout.approved solde les commissions
         return jsonify({
             'message': f"Votre demande de retrait de {amount_int} XOF a été initiée et est en cours de traitement.",
             'new_balance': float(agent.wallet_balance)
@@ -950,6 +787,7 @@ def request_withdrawal():
         current_app.logger.error(f"Erreur FedaPay: {error_msg}")
         payout_request.status = 'failed'
         payout_request.error_message = f"Erreur communication FedaPay: {error_msg[:200]}"
+        release_payout(payout_request)
         db.session.commit()
         return jsonify({'message': "Une erreur est survenue lors de la communication avec le service de paiement."}), 503
     except Exception as e:
@@ -959,6 +797,7 @@ def request_withdrawal():
         try:
             payout_request.status = 'failed'
             payout_request.error_message = f"Erreur interne: {str(e)[:200]}"
+            release_payout(payout_request)
             db.session.commit()
         except:
             pass
@@ -1174,6 +1013,7 @@ def create_property_for_agent():
                 db.session.add(new_image)
                 current_app.logger.debug(f"Image ajoutée: {image_url}")
 
+        sync_property_search_index(new_property)
         db.session.commit()
         current_app.logger.info("Bien immobilier créé avec succès et commité.")
 
@@ -1202,12 +1042,13 @@ def get_agent_created_properties():
         return jsonify({'message': f"Accès non autorisé. Votre rôle est '{agent.role}', mais 'agent' est requis."}), 403
 
     # Récupérer toutes les propriétés créées par cet agent
-    properties = Property.query.options(selectinload(Property.images), selectinload(Property.owner)).filter_by(agent_id=current_user_id).filter(Property.deleted_at == None).all()
+    properties = Property.query.options(selectinload(Property.owner)).filter_by(agent_id=current_user_id).filter(Property.deleted_at == None).all()
     
+    from app.utils.serialization_utils import PropertySerializationContext
+    context = PropertySerializationContext(properties)
     properties_with_details = []
     for prop in properties:
-        property_dict = prop.to_dict()
-        property_dict['image_urls'] = [image.image_url for image in prop.images]
+        property_dict = prop.to_dict(context=context)
         
         # Ajouter les informations sur le propriétaire
         if prop.owner:
@@ -1275,7 +1116,7 @@ def initiate_subscription_payment():
 
     try:
         from app.models import ServiceFee
-        import requests
+        from app.utils import http_client
         import os
         import json
         
@@ -1308,7 +1149,7 @@ def initiate_subscription_payment():
             }
         }
 
-        resp = requests.post(
+        resp = http_client.post(
             "https://sandbox-api.fedapay.com/v1/transactions" if os.getenv("FEDAPAY_ENVIRONMENT", "sandbox") == 'sandbox' else "https://api.fedapay.com/v1/transactions",
             json=payload,
             headers=headers,
@@ -1325,7 +1166,7 @@ def initiate_subscription_payment():
             # Let's request the token explicitly
             transaction_id = data.get('id')
             
-            token_resp = requests.post(
+            token_resp = http_client.post(
                 f"https://sandbox-api.fedapay.com/v1/transactions/{transaction_id}/token" if os.getenv("FEDAPAY_ENVIRONMENT", "sandbox") == 'sandbox' else f"https://api.fedapay.com/v1/transactions/{transaction_id}/token",
                 headers=headers,
                 timeout=10
@@ -1376,7 +1217,7 @@ def purchase_subscription():
 
     try:
         from app.models import ServiceFee, AppSetting
-        import requests
+        from app.utils import http_client
         import os
         from datetime import datetime, timedelta
         
@@ -1391,7 +1232,7 @@ def purchase_subscription():
             'Authorization': f'Bearer {os.getenv("FEDAPAY_SECRET_KEY")}'
         }
         
-        resp = requests.get(
+        resp = http_client.get(
             f"https://sandbox-api.fedapay.com/v1/transactions/{transaction_id}" if os.getenv("FEDAPAY_ENVIRONMENT", "sandbox") == 'sandbox' else f"https://api.fedapay.com/v1/transactions/{transaction_id}",
             headers=headers,
             timeout=10
@@ -220,10 +220,10 @@ def forgot_password():
     # On stocke en BASE DE DONNÉES
     user.reset_password_token = verification_code
     user.reset_password_expires = expiration_time
-    db.session.commit()
 
-    # On envoie l'email via le service
+    # On envoie l'email via le service (outbox, même transaction que le code)
     auth_services.send_reset_password_email(email, verification_code)
+    db.session.commit()
     current_app.logger.info(f"Code de réinitialisation pour {email}: {verification_code}")
     
     return jsonify({"message": "Un code de réinitialisation a été envoyé à votre email."}), 200
@@ -7,7 +7,8 @@ from flask_mail import Message
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import create_access_token
 
-from app import db, mail
+from app import db
+from app.utils.email_outbox import queue_email
 from app.models import User, AppSetting
 
 
@@ -21,7 +22,7 @@ def send_verification_email(email, code):
                     recipients=[email])
     msg.body = f'Votre code de vérification est : {code}. Ce code est valide pendant 10 minutes.'
     try:
-        mail.send(msg)
+        queue_email(msg)
         return True
     except Exception as e:
         current_app.logger.error(f'Erreur lors de l\'envoi de l\'e-mail à {email}: {e}')
@@ -107,12 +108,12 @@ def register_user_initiate(email, password, first_name, last_name, phone_number,
     user.verification_code = verification_code
     user.verification_code_expires = expires_at
 
-    db.session.commit()
-
-    # Envoyer l'e-mail de vérification
+    # Envoyer l'e-mail de vérification (outbox, même transaction que le code)
     if not send_verification_email(email, verification_code):
         pass
 
+    db.session.commit()
+
     return True
 
 def resend_verification_email_service(email):
@@ -137,11 +138,11 @@ def resend_verification_email_service(email):
     # On met à jour la DB
     user.verification_code = new_code
     user.verification_code_expires = new_expires_at
-    db.session.commit()
 
-    # Renvoyer l'email
+    # Renvoyer l'email (outbox, même transaction que le code)
     if not send_verification_email(email, new_code):
         raise ValueError("Erreur lors de l'envoi de l'e-mail.")
+    db.session.commit()
     
     return True
 
@@ -215,7 +216,7 @@ def send_reset_password_email(email, code):
                     recipients=[email])
     msg.body = f'Votre code de réinitialisation est : {code}. Ce code est valide pendant 10 minutes.'
     try:
-        mail.send(msg)
+        queue_email(msg)
         return True
     except Exception as e:
         current_app.logger.error(f'Erreur lors de l\'envoi de l\'e-mail à {email}: {e}')
@@ -3,7 +3,8 @@ import os
 import hmac
 import hashlib
 import requests
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, current_app
+from app.utils import http_client
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models import db, User, ServiceFee, Transaction
 
@@ -54,7 +55,7 @@ def initiate_visit_pass_payment():
         is_sandbox = os.getenv("FEDAPAY_ENVIRONMENT", "sandbox") == 'sandbox'
         fedapay_base_url = "https://sandbox-api.fedapay.com/v1" if is_sandbox else "https://api.fedapay.com/v1"
         
-        resp = requests.post(
+        resp = http_client.post(
             f"{fedapay_base_url}/transactions",
             json=payload,
             headers=headers,
@@ -168,7 +169,7 @@ def verify_transaction_status(transaction_id):
         is_sandbox = os.getenv("FEDAPAY_ENVIRONMENT", "sandbox") == 'sandbox'
         fedapay_base_url = "https://sandbox-api.fedapay.com/v1" if is_sandbox else "https://api.fedapay.com/v1"
         
-        resp = requests.get(
+        resp = http_client.get(
             f"{fedapay_base_url}/transactions/{transaction_id}",
             headers=headers,
             timeout=30
@@ -239,264 +240,29 @@ def verify_transaction_status(transaction_id):
             'details': str(e)
         }), 500
 
-# ---------- 3. WEBHOOK AMÉLIORÉ ----------
+# ---------- 3. WEBHOOK ----------
 @customers_bp.route('/payment/webhook/fedapay', methods=['POST', 'GET'])
 def fedapay_webhook():
-    import datetime
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-    
-    # ========== LOGS DE SURVEILLANCE COMPLETS ==========
-    print(f"🔥 [{timestamp}] ======= WEBHOOK FEDAPAY APPELÉ =======")
-    print(f"🔥 Méthode: {request.method}")
-    print(f"🔥 IP source: {request.remote_addr}")
-    print(f"🔥 User-Agent: {request.headers.get('User-Agent', 'Non défini')}")
-    print(f"🔥 URL complète: {request.url}")
-    print(f"🔥 Content-Type: {request.headers.get('Content-Type', 'Non défini')}")
-    print(f"🔥 Content-Length: {request.headers.get('Content-Length', 'Non défini')}")
-    
-    # Log de tous les headers importants
-    important_headers = ['X-FEDAPAY-SIGNATURE', 'Authorization', 'X-Forwarded-For', 
-                        'X-Real-IP', 'Host', 'Origin', 'Referer']
-    for header in important_headers:
-        value = request.headers.get(header)
-        if value:
-            print(f"🔥 {header}: {value}")
-    
-    # ========== GESTION DES REQUÊTES GET (TEST DE CONNECTIVITÉ) ==========
+    """
+    Notification de paiement FedaPay : la signature est vérifiée et l'événement enregistré (sans doublon),
+    puis la réponse part aussitôt. Les passes sont créditées par le worker (scripts/webhook_worker.py).
+    """
+    # Test de connectivité
     if request.method == 'GET':
-        print("✅ GET request sur webhook - Endpoint accessible")
-        print(f"✅ URL configurée: {os.getenv('FEDAPAY_CALLBACK_URL', 'Non configurée')}")
-        print(f"✅ Secret webhook configuré: {'Oui' if os.getenv('FEDAPAY_WEBHOOK_SECRET') else 'Non'}")
         return jsonify({
             'status': 'webhook_accessible',
-            'timestamp': timestamp,
+            'secret_configured': bool(current_app.config.get('FEDAPAY_WEBHOOK_SECRET')),
             'message': 'Endpoint webhook FedaPay fonctionnel'
         }), 200
 
-    # ========== TRAITEMENT DES WEBHOOKS POST ==========
     try:
-        # Récupération et log du payload
-        payload = request.get_data()
-        print(f"🔥 Taille du payload: {len(payload)} bytes")
-        print(f"🔥 Payload brut: {payload}")
-        
-        if not payload:
-            print("❌ Payload vide reçu")
-            return jsonify({'status': 'empty_payload', 'timestamp': timestamp}), 400
-        
-        # Tentative de décodage du payload
-        try:
-            payload_str = payload.decode('utf-8')
-            print(f"🔥 Payload décodé: {payload_str}")
-        except UnicodeDecodeError as e:
-            print(f"❌ Erreur décodage payload: {e}")
-            return jsonify({'status': 'decode_error', 'timestamp': timestamp}), 400
-
-        # ========== VÉRIFICATION DE LA SIGNATURE ==========
-        provided_sig = request.headers.get('X-FEDAPAY-SIGNATURE')
-        secret = os.getenv("FEDAPAY_WEBHOOK_SECRET")
-        
-        print(f"🔐 Signature fournie: {provided_sig}")
-        print(f"🔐 Secret configuré: {'Oui (' + str(len(secret)) + ' chars)' if secret else 'Non'}")
-        
-        if not secret:
-            print("⚠️  ATTENTION: Pas de secret webhook configuré - traitement sans vérification")
-        elif not provided_sig:
-            print("❌ Signature manquante dans les headers")
-            print("❌ Headers reçus:", dict(request.headers))
-            return jsonify({'status': 'missing_signature', 'timestamp': timestamp}), 401
-        else:
-            # Vérification de la signature
-            expected_sig = hmac.new(secret.encode(), payload, hashlib.sha256).hexdigest()
-            print(f"🔐 Signature attendue: {expected_sig}")
-            
-            try:
-                # FedaPay peut envoyer la signature avec un préfixe
-                if provided_sig.startswith('sha256='):
-                    sig_part = provided_sig.replace('sha256=', '')
-                elif '=' in provided_sig:
-                    sig_part = provided_sig.split('=')[1]
-                else:
-                    sig_part = provided_sig
-                    
-                print(f"🔐 Signature extraite: {sig_part}")
-                
-                if not hmac.compare_digest(sig_part, expected_sig):
-                    print("❌ Signature incorrecte")
-                    print(f"❌ Attendu: {expected_sig}")
-                    print(f"❌ Reçu: {sig_part}")
-                    return jsonify({'status': 'invalid_signature', 'timestamp': timestamp}), 401
-                else:
-                    print("✅ Signature valide")
-                    
-            except (IndexError, ValueError) as e:
-                print(f"❌ Format de signature invalide: {e}")
-                return jsonify({'status': 'invalid_signature_format', 'timestamp': timestamp}), 401
-
-        # ========== PARSING DES DONNÉES JSON ==========
-        try:
-            data = request.get_json()
-            if not data:
-                print("❌ Impossible de parser le JSON ou JSON vide")
-                return jsonify({'status': 'invalid_json', 'timestamp': timestamp}), 400
-                
-            print(f"🔍 Données JSON reçues: {data}")
-            
-        except Exception as e:
-            print(f"❌ Erreur parsing JSON: {e}")
-            return jsonify({'status': 'json_error', 'details': str(e), 'timestamp': timestamp}), 400
-
-        # ========== EXTRACTION DES INFORMATIONS TRANSACTION ==========
-        # FedaPay peut envoyer différents formats
-        transaction_data = data
-        if 'v1/transaction' in data:
-            transaction_data = data['v1/transaction']
-            print("🔍 Structure imbriquée détectée")
-        
-        transaction_id = (transaction_data.get('id') or 
-                         transaction_data.get('reference') or
-                         str(data.get('id', '')))
-        
-        status = transaction_data.get('status', '').lower()
-        amount = transaction_data.get('amount')
-        
-        print(f"🔍 ID Transaction: {transaction_id}")
-        print(f"🔍 Statut: {status}")
-        print(f"🔍 Montant: {amount}")
-        
-        if not transaction_id:
-            print("❌ ID de transaction manquant")
-            return jsonify({
-                'status': 'missing_transaction_id', 
-                'received_data': data,
-                'timestamp': timestamp
-            }), 400
-
-        # ========== TRAITEMENT SELON LE STATUT ==========
-        if status == 'approved':
-            print(f"✅ Transaction approuvée: {transaction_id}")
-            
-            # Recherche de la transaction locale
-            txn = Transaction.query.filter_by(related_entity_id=str(transaction_id)).first()
-            if not txn:
-                print(f"❌ Transaction locale {transaction_id} introuvable")
-                
-                # Log de toutes les transactions en attente pour debug
-                pending_txns = Transaction.query.filter_by(description='En attente de validation').all()
-                print(f"🔍 Transactions en attente: {[t.related_entity_id for t in pending_txns]}")
-                
-                return jsonify({
-                    'status': 'transaction_not_found',
-                    'transaction_id': transaction_id,
-                    'timestamp': timestamp
-                }), 404
-
-            print(f"✅ Transaction locale trouvée: User {txn.user_id}, Montant {txn.amount}")
-            
-            # Vérification que la transaction n'est pas déjà traitée
-            if 'validé' in txn.description:
-                print(f"⚠️  Transaction {transaction_id} déjà traitée")
-                return jsonify({
-                    'status': 'already_processed',
-                    'transaction_id': transaction_id,
-                    'timestamp': timestamp
-                }), 200
-
-            # Récupération des données nécessaires
-            user = User.query.get(txn.user_id)
-            fee = ServiceFee.query.filter_by(service_key='visit_pass_purchase').first()
-            
-            if not user:
-                print(f"❌ Utilisateur {txn.user_id} introuvable")
-                return jsonify({
-                    'status': 'user_not_found',
-                    'user_id': txn.user_id,
-                    'timestamp': timestamp
-                }), 500
-            
-            if not fee:
-                print("❌ ServiceFee 'visit_pass_purchase' introuvable")
-                return jsonify({
-                    'status': 'service_fee_not_found',
-                    'timestamp': timestamp
-                }), 500
-
-            # Calcul et ajout des passes
-            old_passes = user.visit_passes
-            quantity = int(txn.amount / fee.amount)
-            user.visit_passes += quantity
-            txn.description = f'Achat de {quantity} passe(s) validé'
-            
-            try:
-                db.session.commit()
-                print(f"✅ Succès: +{quantity} passes ajoutés à l'utilisateur {user.id}")
-                print(f"✅ Passes: {old_passes} -> {user.visit_passes}")
-                print(f"✅ Transaction mise à jour: {txn.description}")
-                
-                return jsonify({
-                    'status': 'success',
-                    'transaction_id': transaction_id,
-                    'user_id': user.id,
-                    'passes_added': quantity,
-                    'total_passes': user.visit_passes,
-                    'timestamp': timestamp
-                }), 200
-                
-            except Exception as e:
-                db.session.rollback()
-                print(f"❌ Erreur lors de la sauvegarde: {e}")
-                return jsonify({
-                    'status': 'database_error',
-                    'error': str(e),
-                    'timestamp': timestamp
-                }), 500
-                
-        elif status in ['declined', 'canceled', 'failed']:
-            print(f"❌ Transaction {status}: {transaction_id}")
-            
-            # Optionnel: mettre à jour la transaction locale
-            txn = Transaction.query.filter_by(related_entity_id=str(transaction_id)).first()
-            if txn and 'En attente' in txn.description:
-                txn.description = f'Paiement {status}'
-                try:
-                    db.session.commit()
-                    print(f"✅ Transaction {transaction_id} marquée comme {status}")
-                except Exception as e:
-                    print(f"⚠️  Erreur mise à jour transaction {status}: {e}")
-            
-            return jsonify({
-                'status': 'payment_failed',
-                'payment_status': status,
-                'transaction_id': transaction_id,
-                'timestamp': timestamp
-            }), 200
-            
-        else:
-            print(f"⚠️  Statut non géré: {status}")
-            return jsonify({
-                'status': 'unhandled_status',
-                'payment_status': status,
-                'transaction_id': transaction_id,
-                'timestamp': timestamp
-            }), 200
-
-        return jsonify({
-            'status': 'processed',
-            'timestamp': timestamp
-        }), 200
-
+        from app.utils.webhook_events import ingest_webhook, PROVIDER_FEDAPAY
+        body, status_code = ingest_webhook(PROVIDER_FEDAPAY, request.get_data(), request.headers.get('X-FEDAPAY-SIGNATURE'))
+        return jsonify(body), status_code
     except Exception as e:
-        print(f"❌ Erreur critique webhook: {str(e)}")
-        print(f"❌ Type d'erreur: {type(e).__name__}")
-        import traceback
-        print(f"❌ Traceback complet: {traceback.format_exc()}")
-        
-        return jsonify({
-            'status': 'internal_error',
-            'error': str(e),
-            'error_type': type(e).__name__,
-            'timestamp': timestamp
-        }), 500
+        db.session.rollback()
+        current_app.logger.error(f"❌ Webhook FedaPay non enregistré: {e}", exc_info=True)
+        return jsonify({'status': 'internal_error'}), 500
 
 
 @customers_bp.route('/payment/cancel', methods=['GET'])
@@ -515,7 +281,8 @@ def get_all_properties_for_customer():
     if User.query.get(user_id).role != 'customer':
         return jsonify({'message': 'Accès refusé : customer requis.'}), 403
     from app.models import Property
-    return jsonify([p.to_dict() for p in Property.query.filter(Property.deleted_at == None, Property.is_validated == True).all()]), 200
+    from app.utils.serialization_utils import serialize_properties
+    return jsonify(serialize_properties(Property.query.filter(Property.deleted_at == None, Property.is_validated == True).all())), 200
 
 @customers_bp.route('/properties/<int:property_id>', methods=['GET'])
 @jwt_required()
@@ -575,7 +342,7 @@ def verify_and_process_payment(transaction_id):
         is_sandbox = os.getenv("FEDAPAY_ENVIRONMENT", "sandbox") == 'sandbox'
         fedapay_base_url = "https://sandbox-api.fedapay.com/v1" if is_sandbox else "https://api.fedapay.com/v1"
         
-        resp = requests.get(
+        resp = http_client.get(
             f"{fedapay_base_url}/transactions/{transaction_id}",
             headers=headers,
             timeout=30
@@ -702,7 +469,7 @@ def check_payment_status_only(transaction_id):
         is_sandbox = os.getenv("FEDAPAY_ENVIRONMENT", "sandbox") == 'sandbox'
         fedapay_base_url = "https://sandbox-api.fedapay.com/v1" if is_sandbox else "https://api.fedapay.com/v1"
         
-        resp = requests.get(
+        resp = http_client.get(
             f"{fedapay_base_url}/transactions/{transaction_id}",
             headers=headers,
             timeout=30
@@ -73,4 +73,5 @@ def get_user_favorites():
         (Property.is_validated == True) | (Property.owner_id == current_user_id) | (Property.agent_id == current_user_id)
     ).all()
 
-    return jsonify([p.to_dict() for p in favorite_properties]), 200
+    from app.utils.serialization_utils import serialize_properties
+    return jsonify(serialize_properties(favorite_properties)), 200
@@ -0,0 +1,160 @@
+"""
+Cache à deux niveaux des réponses Nominatim (autocomplétion et géocodage inversé).
+1. LRU en mémoire avec TTL, propre à chaque worker : une frappe déjà vue ("Cot", "Coto", "Cotonou") est
+   servie sans I/O.
+2. Table GeocodingCache partagée par tous les workers et persistante entre les déploiements.
+La politique publique de Nominatim limite à 1 requête/seconde : seules les entrées absentes des deux
+niveaux déclenchent un appel (voir client.py) ; les entrées expirées restent en base pour être servies
+quand le quota est épuisé.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import GeocodingCacheEntry
+
+# Valeur retournée en cas d'absence (None est une réponse valide : "aucune adresse trouvée")
+MISS = object()
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_query(query):
+    """Forme canonique d'une recherche : minuscules, espaces superflus retirés."""
+    return _WHITESPACE.sub(' ', (query or '').strip()).casefold()
+
+
+def search_cache_key(query, country_code):
+    return f"{(country_code or '').upper()}:{normalize_query(query)}"[:255]
+
+
+def reverse_cache_key(latitude, longitude, precision=4):
+    """Coordonnées arrondies (4 décimales ≈ 11 m) : les positions voisines partagent la même adresse."""
+    return f"{round(latitude, precision):.{precision}f},{round(longitude, precision):.{precision}f}"
+
+
+class TTLCache:
+    """LRU borné dont chaque entrée expire après son TTL. Thread-safe."""
+
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISS
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return MISS
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class GeocodingCache:
+    """Mémoire puis base ; une entrée lue en base est remontée dans le LRU pour le reste de sa durée de vie."""
+
+    def __init__(self, max_size=4096, memory_ttl=3600):
+        self.memory = TTLCache(max_size)
+        self.memory_ttl = memory_ttl
+
+    def get(self, kind, key):
+        value = self.memory.get((kind, key))
+        if value is not MISS:
+            return value
+
+        try:
+            entry = GeocodingCacheEntry.query.filter_by(kind=kind, cache_key=key).first()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning(f"⚠️ Cache géocodage indisponible: {e}")
+            return MISS
+        if entry is None:
+            return MISS
+
+        remaining = (entry.expires_at - datetime.utcnow()).total_seconds()
+        if remaining <= 0:
+            return MISS
+        self.memory.set((kind, key), entry.payload, min(self.memory_ttl, remaining))
+        return entry.payload
+
+    def get_stale(self, kind, key):
+        """Dernière réponse connue, même expirée (servie quand Nominatim est indisponible ou le quota épuisé)."""
+        try:
+            entry = GeocodingCacheEntry.query.filter_by(kind=kind, cache_key=key).first()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning(f"⚠️ Cache géocodage indisponible: {e}")
+            return MISS
+        return entry.payload if entry is not None else MISS
+
+    def set(self, kind, key, payload, ttl):
+        """Enregistre la réponse dans les deux niveaux (une erreur d'écriture en base n'est pas bloquante)."""
+        self.memory.set((kind, key), payload, min(self.memory_ttl, ttl))
+
+        expires_at = datetime.utcnow() + timedelta(seconds=ttl)
+        try:
+            entry = GeocodingCacheEntry.query.filter_by(kind=kind, cache_key=key).first()
+            if entry is None:
+                db.session.add(GeocodingCacheEntry(kind=kind, cache_key=key, payload=payload, expires_at=expires_at))
+            else:
+                entry.payload = payload
+                entry.created_at = datetime.utcnow()
+                entry.expires_at = expires_at
+            db.session.commit()
+        except IntegrityError:
+            # Même clé enregistrée au même moment par un autre worker
+            db.session.rollback()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning(f"⚠️ Écriture du cache géocodage impossible: {e}")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_geocoding_cache():
+    """Cache du processus, dimensionné par GEOCODING_CACHE_SIZE / GEOCODING_MEMORY_TTL."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = GeocodingCache(
+                    max_size=current_app.config.get('GEOCODING_CACHE_SIZE', 4096),
+                    memory_ttl=current_app.config.get('GEOCODING_MEMORY_TTL', 3600)
+                )
+    return _cache
+
+
+def purge_expired_entries(grace_days=30):
+    """
+    Supprime les entrées expirées depuis plus de grace_days jours (les plus récentes peuvent encore être
+    servies périmées). N'effectue pas de commit.
+    """
+    return GeocodingCacheEntry.query.filter(
+        GeocodingCacheEntry.expires_at < datetime.utcnow() - timedelta(days=grace_days)
+    ).delete(synchronize_session=False)
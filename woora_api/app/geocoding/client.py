@@ -0,0 +1,187 @@
+"""
+Accès à Nominatim : coalescence des requêtes identiques et quota partagé.
+- Single-flight : quand plusieurs threads du worker demandent la même clé en même temps, un seul appel
+  part vers Nominatim et tous reçoivent sa réponse.
+- Seau à jetons (NOMINATIM_RATE_LIMIT requêtes/seconde, politique publique : 1) stocké en base
+  (RateLimitBuckets) et donc partagé par tous les workers. Sans jeton disponible après
+  NOMINATIM_MAX_WAIT secondes, l'appel est refusé (RateLimited) et l'appelant sert le cache périmé.
+"""
+import threading
+import time
+from flask import current_app
+from sqlalchemy import select, update, insert
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import RateLimitBucket
+
+NOMINATIM_BUCKET = 'nominatim'
+
+
+class RateLimited(Exception):
+    """Quota d'appels à Nominatim épuisé."""
+
+
+class _Flight:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Un seul appel en cours par clé ; les appels concurrents sur la même clé attendent son résultat."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.event.set()
+
+    def __len__(self):
+        return len(self._flights)
+
+
+class TokenBucket:
+    """Seau à jetons en mémoire (un seul processus) : repli si la base est indisponible."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.time()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        """Retourne (jeton obtenu, secondes avant le prochain jeton)."""
+        with self._lock:
+            now = time.time()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True, 0.0
+            return False, (1 - self._tokens) / self.rate
+
+
+class DatabaseTokenBucket:
+    """
+    Seau à jetons dans la table RateLimitBuckets, consommé dans une transaction courte et dédiée
+    (SELECT ... FOR UPDATE) : la session de la requête HTTP n'est pas touchée.
+    """
+
+    def __init__(self, name, rate, capacity):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.fallback = TokenBucket(rate, capacity)
+
+    def try_acquire(self):
+        try:
+            return self._try_acquire()
+        except Exception as e:
+            current_app.logger.warning(f"⚠️ Seau à jetons '{self.name}' indisponible en base, quota local: {e}")
+            return self.fallback.try_acquire()
+
+    def _try_acquire(self, attempts=5):
+        table = RateLimitBucket.__table__
+        for _ in range(attempts):
+            now = time.time()
+            with db.engine.begin() as connection:
+                row = connection.execute(
+                    select(table.c.tokens, table.c.updated_at).where(table.c.name == self.name).with_for_update()
+                ).first()
+                if row is None:
+                    try:
+                        with connection.begin_nested():
+                            connection.execute(insert(table).values(name=self.name, tokens=self.capacity - 1, updated_at=now))
+                        return True, 0.0
+                    except IntegrityError:
+                        continue  # Ligne créée au même moment par un autre worker
+
+                tokens = min(self.capacity, row.tokens + max(0.0, now - row.updated_at) * self.rate)
+                acquired = tokens >= 1
+                if acquired:
+                    tokens -= 1
+                # Compare-and-swap sur updated_at : sans effet si un autre worker a consommé entre-temps
+                # (bases sans SELECT ... FOR UPDATE, SQLite par exemple)
+                swapped = connection.execute(update(table).where(
+                    table.c.name == self.name, table.c.updated_at == row.updated_at
+                ).values(tokens=tokens, updated_at=now)).rowcount
+            if swapped:
+                return (True, 0.0) if acquired else (False, (1 - tokens) / self.rate)
+        return False, 1 / self.rate
+
+    def acquire(self, max_wait):
+        """Attend un jeton au plus max_wait secondes. Retourne False si le quota reste épuisé."""
+        deadline = time.monotonic() + max_wait
+        while True:
+            acquired, wait = self.try_acquire()
+            if acquired:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or wait > remaining:
+                return False
+            time.sleep(wait)
+
+
+class NominatimClient:
+    def __init__(self, bucket, max_wait):
+        self.bucket = bucket
+        self.max_wait = max_wait
+        self.flights = SingleFlight()
+
+    def fetch(self, key, fn):
+        """
+        Exécute fn (appel Nominatim + mise en cache) une seule fois pour tous les appels concurrents sur key,
+        après avoir obtenu un jeton. Lève RateLimited si le quota est épuisé.
+        """
+        return self.flights.do(key, lambda: self._rate_limited(fn))
+
+    def _rate_limited(self, fn):
+        if not self.bucket.acquire(self.max_wait):
+            raise RateLimited()
+        return fn()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_nominatim_client():
+    """Client du processus (NOMINATIM_RATE_LIMIT, NOMINATIM_BURST, NOMINATIM_MAX_WAIT)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                config = current_app.config
+                bucket = DatabaseTokenBucket(
+                    NOMINATIM_BUCKET,
+                    rate=config.get('NOMINATIM_RATE_LIMIT', 1.0),
+                    capacity=config.get('NOMINATIM_BURST', 1)
+                )
+                _client = NominatimClient(bucket, max_wait=config.get('NOMINATIM_MAX_WAIT', 1.0))
+    return _client
@@ -0,0 +1,167 @@
+"""
+Gazetteer hors ligne : localités par pays, chargées en mémoire dans un index de préfixes.
+L'autocomplétion ne garde que les villes dont le nom commence par la saisie : l'index y répond sans appel
+réseau, Nominatim n'est interrogé que si aucune localité connue ne correspond.
+
+Fichier de données (GEOCODING_GAZETTEER_PATH, TSV éventuellement compressé en .gz), construit par
+scripts/build_gazetteer.py depuis un extrait OSM et les villes des biens publiés :
+    country_code  name  type  latitude  longitude  state  country  osm_id
+"""
+import csv
+import gzip
+import heapq
+import io
+import os
+import sys
+import threading
+from bisect import bisect_left
+from flask import current_app
+from app.utils.search_index_utils import fold_search_text
+
+GAZETTEER_COLUMNS = ('country_code', 'name', 'type', 'latitude', 'longitude', 'state', 'country', 'osm_id')
+
+# Ordre d'affichage des suggestions pour un même préfixe : villes d'abord
+PLACE_TYPE_RANKS = {
+    'city': 0, 'town': 1, 'municipality': 2, 'village': 3, 'suburb': 4,
+    'locality': 5, 'hamlet': 6, 'neighbourhood': 7, 'quarter': 7,
+}
+DEFAULT_PLACE_RANK = 8
+
+
+def fold_place_name(name):
+    """Clé de l'index : 'Abomey-Calavi' et 'abomey calavi' -> 'abomey calavi'."""
+    return fold_search_text(name)
+
+
+def place_rank(place_type):
+    return PLACE_TYPE_RANKS.get(place_type, DEFAULT_PLACE_RANK)
+
+
+def open_gazetteer_file(path, mode='rt'):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode, encoding='utf-8', newline='')
+    return io.open(path, mode, encoding='utf-8', newline='')
+
+
+def read_gazetteer_rows(path):
+    """Lignes du fichier sous forme de dicts (GAZETTEER_COLUMNS)."""
+    with open_gazetteer_file(path) as f:
+        for row in csv.reader(f, delimiter='\t'):
+            if not row or row[0].startswith('#'):
+                continue
+            yield dict(zip(GAZETTEER_COLUMNS, row + [''] * (len(GAZETTEER_COLUMNS) - len(row))))
+
+
+def write_gazetteer_rows(path, rows):
+    """Écrit les lignes triées par pays puis nom replié (ordre de chargement de l'index)."""
+    rows = sorted(rows, key=lambda r: (r['country_code'], fold_place_name(r['name']), place_rank(r['type'])))
+    with open_gazetteer_file(path, 'wt') as f:
+        writer = csv.writer(f, delimiter='\t', lineterminator='\n')
+        for row in rows:
+            writer.writerow([row.get(column) or '' for column in GAZETTEER_COLUMNS])
+    return len(rows)
+
+
+class CountryPlaces:
+    """
+    Localités d'un pays en colonnes parallèles triées par nom replié : un préfixe correspond à une plage
+    contiguë (deux bisect), comme un parcours de trie, sans un objet Python par nœud.
+    """
+
+    __slots__ = ('keys', 'ranks', 'places')
+
+    def __init__(self, entries):
+        entries.sort(key=lambda e: (e[0], e[1]))
+        self.keys = [key for key, _, _ in entries]
+        self.ranks = [rank for _, rank, _ in entries]
+        self.places = [place for _, _, place in entries]
+
+    def search(self, folded_prefix, limit):
+        start = bisect_left(self.keys, folded_prefix)
+        end = bisect_left(self.keys, folded_prefix + '\uffff', lo=start)
+        if start == end:
+            return []
+        best = heapq.nsmallest(limit, range(start, end), key=lambda i: (self.ranks[i], len(self.keys[i]), self.keys[i]))
+        return [_suggestion(self.places[i]) for i in best]
+
+
+class Gazetteer:
+    def __init__(self, rows=()):
+        by_country = {}
+        seen = set()
+        for row in rows:
+            country_code = (row.get('country_code') or '').upper()
+            key = fold_place_name(row.get('name'))
+            if not country_code or not key or (country_code, key) in seen:
+                continue  # Une seule entrée par nom et par pays (la première, fichier trié par rang)
+            seen.add((country_code, key))
+            by_country.setdefault(country_code, []).append((key, place_rank(row.get('type')), _compact_place(row)))
+        self.countries = {code: CountryPlaces(entries) for code, entries in by_country.items()}
+
+    @classmethod
+    def from_file(cls, path):
+        return cls(read_gazetteer_rows(path))
+
+    def __len__(self):
+        return sum(len(places.keys) for places in self.countries.values())
+
+    def has_country(self, country_code):
+        return (country_code or '').upper() in self.countries
+
+    def autocomplete(self, query, country_code, limit=10):
+        """Localités du pays dont le nom commence par query (casse et accents ignorés)."""
+        places = self.countries.get((country_code or '').upper())
+        folded = fold_place_name(query)
+        if places is None or not folded:
+            return []
+        return places.search(folded, limit)
+
+
+def _compact_place(row):
+    """Tuple (nom, type, lat, lon, région, pays, osm_id) : les chaînes répétées (types, régions, pays) sont partagées."""
+    return (
+        row['name'],
+        sys.intern(row.get('type') or 'locality'),
+        float(row['latitude']) if row.get('latitude') else None,
+        float(row['longitude']) if row.get('longitude') else None,
+        sys.intern(row['state']) if row.get('state') else None,
+        sys.intern(row['country']) if row.get('country') else None,
+        int(row['osm_id']) if row.get('osm_id') else None,
+    )
+
+
+def _suggestion(place):
+    """Même format que les suggestions Nominatim de services.autocomplete_address."""
+    name, place_type, latitude, longitude, state, country, osm_id = place
+    return {
+        'display_name': name,
+        'raw_display_name': ', '.join(filter(None, [name, state, country])),
+        'city': name,
+        'suburb': None,
+        'state': state,
+        'country': country,
+        'latitude': latitude,
+        'longitude': longitude,
+        'type': place_type,
+        'osm_id': osm_id,
+    }
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer():
+    """Gazetteer du processus, chargé une seule fois (vide si le fichier de données n'existe pas)."""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                path = current_app.config.get('GEOCODING_GAZETTEER_PATH')
+                if path and os.path.exists(path):
+                    _gazetteer = Gazetteer.from_file(path)
+                    current_app.logger.info(f"🗺️ Gazetteer chargé : {len(_gazetteer)} localité(s) ({path})")
+                else:
+                    _gazetteer = Gazetteer()
+                    current_app.logger.warning(f"⚠️ Gazetteer introuvable ({path}) : autocomplétion via Nominatim uniquement")
+    return _gazetteer
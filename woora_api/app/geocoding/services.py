@@ -1,11 +1,19 @@
 """
 Service de géocodage utilisant Nominatim (OpenStreetMap)
 pour l'autocomplétion d'adresses et le géocodage inversé.
+L'autocomplétion répond d'abord depuis le gazetteer hors ligne (gazetteer.py).
+Les réponses Nominatim sont mises en cache (mémoire puis base, voir cache.py) : Nominatim n'est appelé que pour
+une recherche ou une position jamais vue (ou expirée), une seule fois pour des requêtes identiques simultanées
+et dans la limite du quota partagé (client.py). Quota épuisé ou Nominatim en erreur : l'entrée périmée est servie.
 """
 import requests
 from flask import current_app
+from app.utils import http_client
+from .cache import get_geocoding_cache, search_cache_key, reverse_cache_key, normalize_query, MISS
+from .gazetteer import get_gazetteer, fold_place_name
+from .client import get_nominatim_client, RateLimited
 
-NOMINATIM_BASE_URL = "https://nominatim.openstreetmap.org"
+NOMINATIM_BASE_URL = "https://nominatim.openstreetmap.org"  # Surchargeable par la config NOMINATIM_BASE_URL
 USER_AGENT = "WooraBuilding/1.0"
 
 
@@ -24,29 +32,84 @@ def autocomplete_address(query, country_code='SN', limit=10):
     if not query or len(query) < 2:
         return []
 
+    # Localités connues : pas d'appel réseau pendant la frappe
+    results = get_gazetteer().autocomplete(query, country_code, limit)
+    if results:
+        return results
+
+    cache = get_geocoding_cache()
+    key = search_cache_key(query, country_code)
+    results = cache.get('search', key)
+    if results is MISS:
+        results = _fetch_and_cache(cache, 'search', key, lambda: _search_cities(normalize_query(query), country_code))
+        if results is MISS:
+            return []
+
+    return results[:limit]
+
+
+def _fetch_and_cache(cache, kind, key, lookup):
+    """
+    Appel Nominatim pour une entrée absente du cache (lookup retourne MISS en cas d'erreur), coalescé et
+    soumis au quota. Erreur ou quota épuisé : dernière réponse connue, même périmée, sinon MISS.
+    """
+    def fetch():
+        # Entrée enregistrée par un appel identique terminé entre-temps
+        value = cache.get(kind, key)
+        if value is not MISS:
+            return value
+        value = lookup()
+        if value is not MISS:
+            cache.set(kind, key, value, _cache_ttl(value))
+        return value
+
+    try:
+        value = get_nominatim_client().fetch((kind, key), fetch)
+    except RateLimited:
+        current_app.logger.warning(f"⚠️ Quota Nominatim épuisé ({kind} '{key}') : cache périmé servi")
+        value = MISS
+    if value is MISS:
+        value = cache.get_stale(kind, key)
+    return value
+
+
+def _nominatim_url(path):
+    return f"{current_app.config.get('NOMINATIM_BASE_URL') or NOMINATIM_BASE_URL}/{path}"
+
+
+def _cache_ttl(payload):
+    config = current_app.config
+    return config.get('GEOCODING_CACHE_TTL', 30 * 24 * 3600) if payload else config.get('GEOCODING_NEGATIVE_TTL', 24 * 3600)
+
+
+def _search_cities(query, country_code):
+    """
+    Appel Nominatim /search : toutes les villes dont le nom commence par query (sans limite, le cache
+    sert ensuite n'importe quel `limit`). Retourne MISS en cas d'erreur.
+    """
     try:
         params = {
             'q': query,
             'countrycodes': country_code, # Réactivé pour restreindre la recherche au pays spécifié
             'format': 'json',
             'addressdetails': 1,
-            'addressdetails': 1,
             'limit': 50, # On demande PLUS de résultats à Nominatim pour pouvoir filtrer agressivement après
             'accept-language': 'fr',  # Résultats en français
         }
         
         headers = {'User-Agent': USER_AGENT}
         
-        response = requests.get(
-            f"{NOMINATIM_BASE_URL}/search",
+        response = http_client.get(
+            _nominatim_url('search'),
             params=params,
             headers=headers,
-            timeout=5
+            timeout=5,
+            max_retries=0  # Une nouvelle tentative consommerait un 2e appel sur le jeton du quota
         )
         
         if response.status_code != 200:
             current_app.logger.error(f"Nominatim API error: {response.status_code}")
-            return []
+            return MISS
         
         data = response.json()
         
@@ -80,8 +143,8 @@ def autocomplete_address(query, country_code='SN', limit=10):
             
             # FILTRAGE STRICT: Le nom de la ville DOIT commencer par la recherche
             # Sinon on se retrouve avec "Natitingou" quand on tape "Po" (à cause de La Poste)
-            # On utilise une comparaison insensible à la casse et aux accents (basique)
-            if not city_name.lower().startswith(query.lower()):
+            # On utilise une comparaison insensible à la casse et aux accents (même repli que le gazetteer)
+            if not fold_place_name(city_name).startswith(fold_place_name(query)):
                 continue
                 
             seen_names.add(city_name)
@@ -103,14 +166,14 @@ def autocomplete_address(query, country_code='SN', limit=10):
                 'osm_id': item.get('osm_id'),
             })
         
-        return results[:limit]
+        return results
         
     except requests.RequestException as e:
         current_app.logger.error(f"Nominatim request failed: {e}")
-        return []
+        return MISS
     except Exception as e:
         current_app.logger.error(f"Geocoding error: {e}")
-        return []
+        return MISS
 
 
 def reverse_geocode(latitude, longitude):
@@ -124,6 +187,20 @@ def reverse_geocode(latitude, longitude):
     Returns:
         dict: Informations d'adresse ou None si erreur
     """
+    cache = get_geocoding_cache()
+    key = reverse_cache_key(latitude, longitude, current_app.config.get('GEOCODING_REVERSE_PRECISION', 4))
+    address = cache.get('reverse', key)
+    if address is MISS:
+        address = _fetch_and_cache(cache, 'reverse', key, lambda: _reverse_lookup(latitude, longitude))
+
+    if address is MISS or address is None:
+        return None
+    # Les coordonnées renvoyées sont celles demandées, pas celles arrondies de l'entrée en cache
+    return {**address, 'latitude': latitude, 'longitude': longitude}
+
+
+def _reverse_lookup(latitude, longitude):
+    """Appel Nominatim /reverse. Retourne l'adresse, None si aucune adresse, MISS en cas d'erreur."""
     try:
         params = {
             'lat': latitude,
@@ -135,18 +212,22 @@ def reverse_geocode(latitude, longitude):
         
         headers = {'User-Agent': USER_AGENT}
         
-        response = requests.get(
-            f"{NOMINATIM_BASE_URL}/reverse",
+        response = http_client.get(
+            _nominatim_url('reverse'),
             params=params,
             headers=headers,
-            timeout=5
+            timeout=5,
+            max_retries=0
         )
         
         if response.status_code != 200:
             current_app.logger.error(f"Reverse geocode error: {response.status_code}")
-            return None
+            return MISS
         
         data = response.json()
+        if 'error' in data:
+            # "Unable to geocode" : aucune adresse à cette position (réponse mise en cache)
+            return None
         address = data.get('address', {})
         
         return {
@@ -163,7 +244,7 @@ def reverse_geocode(latitude, longitude):
         
     except requests.RequestException as e:
         current_app.logger.error(f"Reverse geocode request failed: {e}")
-        return None
+        return MISS
     except Exception as e:
         current_app.logger.error(f"Reverse geocode error: {e}")
-        return None
+        return MISS
@@ -1,5 +1,6 @@
 from app import db
 from datetime import datetime
+from sqlalchemy import event, DDL
 
 # ===================================================================
 # MODÈLES DE BASE (UTILISATEURS, PARAMÈTRES)
@@ -50,6 +51,9 @@ class User(db.Model):
     reset_password_token = db.Column(db.String(10), nullable=True) # Le code OTP
     reset_password_expires = db.Column(db.DateTime, nullable=True)
 
+    # Fréquence des emails d'alerte (digest des nouveaux matches, voir app/utils/alert_digest.py)
+    alert_digest_frequency = db.Column(db.Enum('instant', 'hourly', 'daily'), nullable=False, default='instant', server_default='instant')
+
     # Relations (si un utilisateur est supprimé, toutes ses données associées le sont aussi)
     properties = db.relationship('Property', back_populates='owner', foreign_keys='Property.owner_id', cascade="all, delete-orphan")
     created_properties = db.relationship('Property', foreign_keys='Property.agent_id')
@@ -82,6 +86,7 @@ class User(db.Model):
             'suspension_attachment_url': self.suspension_attachment_url,
             'nationality': self.nationality,
             'gender': self.gender,
+            'alert_digest_frequency': self.alert_digest_frequency,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
         }
@@ -282,9 +287,25 @@ class Property(db.Model):
     visit_requests_received = db.relationship('VisitRequest', back_populates='property', cascade="all, delete-orphan")
     commissions_paid = db.relationship('Commission', back_populates='property', cascade="all, delete-orphan")
 
-    def to_dict(self):
+    def to_dict(self, context=None):
+        # Avec un PropertySerializationContext (listes), les relations sont lues dans les données préchargées de la page
+        if context is not None:
+            property_status = context.statuses.get(self.status_id)
+            property_type = context.property_types.get(self.property_type_id)
+            agent = context.users.get(self.agent_id)
+            buyer = context.users.get(self.buyer_id)
+            image_urls = context.image_urls_by_property.get(self.id, [])
+            attribute_values = context.values_by_property.get(self.id, [])
+        else:
+            property_status = self.property_status
+            property_type = self.property_type
+            agent = self.agent
+            buyer = self.buyer
+            image_urls = [image.image_url for image in self.images]
+            attribute_values = [(pv.attribute.name if pv.attribute else None, pv) for pv in self.property_values]
+
         # Récupérer l'objet statut lié
-        status_data = self.property_status.to_dict() if self.property_status else {
+        status_data = property_status.to_dict() if property_status else {
             'id': 0, 'name': 'Statut Inconnu', 'color': '#808080'
         }
         
@@ -307,8 +328,7 @@ class Property(db.Model):
         
         # Build attributes dynamically EXCLUSIVELY from the EAV PropertyValues table
         attributes_dict = {}
-        for pv in self.property_values:
-            attr_name = pv.attribute.name if pv.attribute else None
+        for attr_name, pv in attribute_values:
             if not attr_name:
                 continue
                 
@@ -326,8 +346,8 @@ class Property(db.Model):
         attributes_dict['description'] = self.description
         if self.price is not None:
             attributes_dict['price'] = float(self.price)
-        if self.property_status:
-            attributes_dict['status'] = self.property_status.name
+        if property_status:
+            attributes_dict['status'] = property_status.name
         elif self.status: # Fallback au champ brut
             attributes_dict['status'] = self.status
             
@@ -341,23 +361,23 @@ class Property(db.Model):
         attributes_dict['property_type_id'] = self.property_type_id
             
         base_data['attributes'] = attributes_dict
-        base_data['image_urls'] = [image.image_url for image in self.images]
-        base_data['property_type'] = {'id': self.property_type.id, 'name': self.property_type.name} if self.property_type else None
+        base_data['image_urls'] = image_urls
+        base_data['property_type'] = {'id': property_type.id, 'name': property_type.name} if property_type else None
         
         # Ajouter les informations de l'agent si le bien a été créé par un agent
-        if self.agent:
+        if agent:
             base_data['created_by_agent'] = {
-                'agent_id': self.agent.id,
-                'agent_name': f"{self.agent.first_name} {self.agent.last_name}",
-                'agent_email': self.agent.email
+                'agent_id': agent.id,
+                'agent_name': f"{agent.first_name} {agent.last_name}",
+                'agent_email': agent.email
             }
         
         # Ajouter les informations de l'acheteur s'il existe (Admin only idéalement, mais ici inclus)
-        if self.buyer:
+        if buyer:
              base_data['buyer_details'] = {
-                'buyer_id': self.buyer.id,
-                'buyer_name': f"{self.buyer.first_name} {self.buyer.last_name}",
-                'buyer_email': self.buyer.email
+                'buyer_id': buyer.id,
+                'buyer_name': f"{buyer.first_name} {buyer.last_name}",
+                'buyer_email': buyer.email
             }
         
         return base_data
@@ -371,6 +391,94 @@ class PropertyImage(db.Model):
     
     property = db.relationship('Property', back_populates='images')
 
+# ===================================================================
+# READ-MODEL DE RECHERCHE (LISTINGS PUBLICS)
+# ===================================================================
+
+class PropertySearchIndex(db.Model):
+    """
+    Table dénormalisée : une ligne par bien visible publiquement (validé, non supprimé,
+    propriétaire actif, statut non déterministe). Maintenue par
+    app.utils.search_index_utils.sync_property_search_index à chaque écriture.
+    """
+    __tablename__ = 'PropertySearchIndex'
+    property_id = db.Column(db.Integer, db.ForeignKey('Properties.id', ondelete='CASCADE'), primary_key=True)
+    owner_id = db.Column(db.Integer, nullable=False)
+    property_type_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(50), nullable=True)  # Slug legacy ('for_sale', 'for_rent', ...)
+    status_id = db.Column(db.Integer, nullable=True)
+    price = db.Column(db.Numeric(20, 2), nullable=False)
+    city = db.Column(db.String(100), nullable=True)  # Normalisé en minuscules
+    country = db.Column(db.String(100), nullable=True)  # Normalisé en minuscules
+    latitude = db.Column(db.Numeric(9, 6), nullable=True)
+    longitude = db.Column(db.Numeric(9, 6), nullable=True)
+    geohash = db.Column(db.String(12), nullable=True)  # Cellule geohash (préfiltre des recherches par rayon)
+    created_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_psi_status_created', 'status', 'created_at'),
+        db.Index('idx_psi_type_price', 'property_type_id', 'price'),
+        db.Index('idx_psi_country_city', 'country', 'city'),
+        db.Index('idx_psi_created', 'created_at', 'property_id'),
+        db.Index('idx_psi_geohash', 'geohash'),
+        db.Index('idx_psi_lat_lng', 'latitude', 'longitude'),
+    )
+
+    values = db.relationship('PropertySearchIndexValue', cascade="all, delete-orphan", passive_deletes=True)
+
+class PropertySearchIndexValue(db.Model):
+    """
+    Valeurs EAV filtrables aplaties (clé = nom d'attribut en minuscules) pour les filtres dynamiques.
+    """
+    __tablename__ = 'PropertySearchIndexValues'
+    property_id = db.Column(db.Integer, db.ForeignKey('PropertySearchIndex.property_id', ondelete='CASCADE'), primary_key=True)
+    attribute_key = db.Column(db.String(100), primary_key=True)
+    value_string = db.Column(db.String(255), nullable=True)  # Normalisé en minuscules
+    value_integer = db.Column(db.Integer, nullable=True)
+    value_boolean = db.Column(db.Boolean, nullable=True)
+    value_decimal = db.Column(db.Numeric(20, 2), nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_psiv_key_string', 'attribute_key', 'value_string'),
+        db.Index('idx_psiv_key_integer', 'attribute_key', 'value_integer'),
+        db.Index('idx_psiv_key_boolean', 'attribute_key', 'value_boolean'),
+        db.Index('idx_psiv_key_decimal', 'attribute_key', 'value_decimal'),
+    )
+
+class PropertySearchDocument(db.Model):
+    """
+    Texte de recherche plein-texte d'un bien (titre, ville, adresse, description),
+    normalisé sans accents et en minuscules. Index FULLTEXT sous MySQL,
+    table virtuelle FTS5 (PropertySearchFts) sous SQLite.
+    """
+    __tablename__ = 'PropertySearchDocuments'
+    property_id = db.Column(db.Integer, db.ForeignKey('Properties.id', ondelete='CASCADE'), primary_key=True)
+    search_text = db.Column(db.Text, nullable=False, default='')
+
+    __table_args__ = (
+        db.Index('ft_property_search_text', 'search_text', mysql_prefix='FULLTEXT'),
+    )
+
+# Sous SQLite, la recherche plein-texte passe par une table FTS5 synchronisée par triggers
+_SQLITE_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS PropertySearchFts USING fts5(
+        search_text, content='PropertySearchDocuments', content_rowid='property_id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS psd_fts_ai AFTER INSERT ON PropertySearchDocuments BEGIN
+        INSERT INTO PropertySearchFts(rowid, search_text) VALUES (new.property_id, new.search_text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS psd_fts_ad AFTER DELETE ON PropertySearchDocuments BEGIN
+        INSERT INTO PropertySearchFts(PropertySearchFts, rowid, search_text) VALUES ('delete', old.property_id, old.search_text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS psd_fts_au AFTER UPDATE ON PropertySearchDocuments BEGIN
+        INSERT INTO PropertySearchFts(PropertySearchFts, rowid, search_text) VALUES ('delete', old.property_id, old.search_text);
+        INSERT INTO PropertySearchFts(rowid, search_text) VALUES (new.property_id, new.search_text);
+    END""",
+]
+for _ddl in _SQLITE_FTS_DDL:
+    event.listen(PropertySearchDocument.__table__, 'after_create', DDL(_ddl).execute_if(dialect='sqlite'))
+
 class UserFavorite(db.Model):
     __tablename__ = 'user_favorites'
     user_id = db.Column(db.Integer, db.ForeignKey('Users.id', ondelete='CASCADE'), primary_key=True)
@@ -466,6 +574,15 @@ class PropertyRequestMatch(db.Model):
     property_id = db.Column(db.Integer, db.ForeignKey('Properties.id', ondelete='CASCADE'), nullable=False)
     is_read = db.Column(db.Boolean, default=False, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Email d'alerte : NULL tant que le match n'a figuré dans aucun digest envoyé au chercheur
+    notified_at = db.Column(db.DateTime, nullable=True)
+    digest_id = db.Column(db.Integer, db.ForeignKey('AlertDigests.id', ondelete='SET NULL'), nullable=True)
+
+    __table_args__ = (
+        # Un seul match par couple alerte / bien (écritures concurrentes du moteur de matching)
+        db.Index('uq_request_property_match', 'property_request_id', 'property_id', unique=True),
+        db.Index('idx_match_notified_at', 'notified_at'),
+    )
 
     property_request = db.relationship('PropertyRequest', back_populates='matches')
     property = db.relationship('Property')
@@ -492,6 +609,7 @@ class PropertyRequest(db.Model):
     customer = db.relationship('User', back_populates='property_requests', foreign_keys=[customer_id])
     property_type = db.relationship('PropertyType', back_populates='property_requests')
     matches = db.relationship('PropertyRequestMatch', back_populates='property_request', cascade="all, delete-orphan", lazy='dynamic')
+    criteria = db.relationship('PropertyRequestCriteria', back_populates='property_request', cascade="all, delete-orphan", passive_deletes=True)
 
     def to_dict(self):
         matches_count = self.matches.count() if self.id else 0
@@ -549,6 +667,49 @@ class PropertyRequest(db.Model):
             } if self.customer else None
         }
 
+class PropertyRequestCriteria(db.Model):
+    """
+    Critères dynamiques d'une alerte, extraits une fois de request_details (JSON) à la création :
+    une ligne par critère, avec la valeur déjà typée pour le moteur de matching.
+    """
+    __tablename__ = 'PropertyRequestCriteria'
+    id = db.Column(db.Integer, primary_key=True)
+    property_request_id = db.Column(db.Integer, db.ForeignKey('PropertyRequests.id', ondelete='CASCADE'), nullable=False)
+    attribute_id = db.Column(db.Integer, db.ForeignKey('PropertyAttributes.id', ondelete='SET NULL'), nullable=True)
+    attribute_key = db.Column(db.String(255), nullable=False)  # Clé du critère en minuscules
+    operator = db.Column(db.String(10), nullable=False, default='eq')
+    value_text = db.Column(db.Text, nullable=False)  # str(valeur).lower() : comparaison texte
+    value_number = db.Column(db.Float(precision=53), nullable=True)  # DOUBLE ; renseigné si la valeur est numérique (ou booléenne)
+    value_boolean = db.Column(db.Boolean, nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_prc_request', 'property_request_id'),
+        db.Index('idx_prc_attribute', 'attribute_id', 'value_number'),
+    )
+
+    property_request = db.relationship('PropertyRequest', back_populates='criteria')
+    attribute = db.relationship('PropertyAttribute')
+
+class PropertyRequestIndex(db.Model):
+    """
+    Index inversé des alertes (PropertyRequests) pour le moteur de matching : critères obligatoires
+    normalisés (type, statut souhaité, ville, fourchette de prix). Maintenu par
+    app.utils.alert_index_utils.sync_property_request_index à la création / fermeture d'une alerte.
+    """
+    __tablename__ = 'PropertyRequestIndex'
+    property_request_id = db.Column(db.Integer, db.ForeignKey('PropertyRequests.id', ondelete='CASCADE'), primary_key=True)
+    property_type_id = db.Column(db.Integer, nullable=True)
+    is_active = db.Column(db.Boolean, nullable=False, default=True)
+    preferred_status = db.Column(db.String(50), nullable=False, default='')  # '' = pas de critère
+    city_key = db.Column(db.String(100), nullable=False, default='')  # Ville en minuscules, '' = pas de critère
+    min_price = db.Column(db.Numeric(12, 2), nullable=True)  # NULL = pas de borne
+    max_price = db.Column(db.Numeric(12, 2), nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_pri_match', 'property_type_id', 'is_active', 'preferred_status', 'city_key', 'min_price'),
+        db.Index('idx_pri_max_price', 'property_type_id', 'is_active', 'max_price'),
+    )
+
 # ===================================================================
 # MODÈLES FINANCIERS (TRANSACTIONS, COMMISSIONS)
 # ===================================================================
@@ -610,3 +771,190 @@ class PayoutRequest(db.Model):
             'processed_at': self.processed_at.isoformat() if self.processed_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None,
         }
+
+# ===================================================================
+# FILE DE TÂCHES ASYNCHRONES (JOBS)
+# ===================================================================
+
+class BackgroundJob(db.Model):
+    """
+    File de tâches durable en base : les routes enregistrent un job (dans la même transaction que
+    la modification métier) et le worker (scripts/job_worker.py) l'exécute hors requête HTTP.
+    Sémantique "au moins une fois" : un job verrouillé par un worker mort est repris après expiration.
+    """
+    __tablename__ = 'BackgroundJobs'
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.JSON, nullable=True)
+    status = db.Column(db.Enum('pending', 'running', 'done', 'failed'), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Prochaine exécution possible (backoff)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    locked_by = db.Column(db.String(100), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_job_status_run_after', 'status', 'run_after'),
+    )
+
+# ===================================================================
+# OUTBOX DES EMAILS TRANSACTIONNELS
+# ===================================================================
+
+class EmailOutbox(db.Model):
+    """
+    Emails en attente d'envoi : les fonctions de email_utils enregistrent le message (dans la même transaction
+    que la modification métier) et le worker (scripts/email_worker.py) l'envoie hors requête HTTP.
+    Après max_attempts échecs, l'email passe en 'dead' (dead-letter) et n'est plus retenté.
+    """
+    __tablename__ = 'EmailOutbox'
+    id = db.Column(db.Integer, primary_key=True)
+    subject = db.Column(db.String(255), nullable=False)
+    sender = db.Column(db.String(255), nullable=False)
+    recipients = db.Column(db.JSON, nullable=False)
+    html = db.Column(db.Text, nullable=True)
+    body = db.Column(db.Text, nullable=True)  # Version texte
+    status = db.Column(db.Enum('pending', 'sending', 'sent', 'dead'), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Backoff entre tentatives
+    locked_at = db.Column(db.DateTime, nullable=True)
+    locked_by = db.Column(db.String(100), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+# ===================================================================
+# DIGESTS DES EMAILS D'ALERTE
+# ===================================================================
+
+class AlertDigest(db.Model):
+    """Email d'alerte envoyé à un chercheur, regroupant ses nouveaux matches (PropertyRequestMatch.digest_id)."""
+    __tablename__ = 'AlertDigests'
+    id = db.Column(db.Integer, primary_key=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey('Users.id', ondelete='CASCADE'), nullable=False)
+    frequency = db.Column(db.Enum('instant', 'hourly', 'daily'), nullable=False)
+    match_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('idx_digest_customer_created', 'customer_id', 'created_at'),
+    )
+
+# ===================================================================
+# CACHE DE GÉOCODAGE
+# ===================================================================
+
+class GeocodingCacheEntry(db.Model):
+    """
+    Réponses Nominatim déjà formatées (app/geocoding/cache.py), derrière le cache LRU en mémoire de chaque worker.
+    kind 'search' : clé "pays:requête normalisée" ; kind 'reverse' : clé "lat,lon" arrondis.
+    """
+    __tablename__ = 'GeocodingCache'
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.Enum('search', 'reverse'), nullable=False)
+    cache_key = db.Column(db.String(255), nullable=False)
+    payload = db.Column(db.JSON, nullable=True)  # Liste de suggestions, adresse, ou null (aucun résultat)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('kind', 'cache_key', name='uq_geocoding_cache_key'),
+        db.Index('idx_geocoding_cache_expires', 'expires_at'),
+    )
+
+class RateLimitBucket(db.Model):
+    """
+    Seau à jetons partagé par tous les workers (app/geocoding/client.py) : respecte un quota d'appels à une
+    API externe (Nominatim : 1 requête/seconde) quel que soit le nombre de processus gunicorn.
+    """
+    __tablename__ = 'RateLimitBuckets'
+    name = db.Column(db.String(50), primary_key=True)
+    # Double précision (DOUBLE sous MySQL) : un FLOAT simple arrondit un horodatage epoch à ~128 s près
+    tokens = db.Column(db.Float(precision=53), nullable=False)
+    updated_at = db.Column(db.Float(precision=53), nullable=False)  # Horodatage epoch (secondes, fractions incluses)
+
+# ===================================================================
+# WEBHOOKS ENTRANTS (FEDAPAY)
+# ===================================================================
+
+class WebhookEvent(db.Model):
+    """
+    Notification reçue d'un prestataire de paiement, enregistrée telle quelle par la route webhook (qui répond
+    200 aussitôt) puis appliquée par le worker (scripts/webhook_worker.py).
+    La contrainte unique (provider, event_id) rend les renvois du même événement sans effet.
+    """
+    __tablename__ = 'WebhookEvents'
+    id = db.Column(db.Integer, primary_key=True)
+    provider = db.Column(db.String(30), nullable=False)  # 'fedapay' (passes de visite), 'fedapay_payout' (virements)
+    event_id = db.Column(db.String(150), nullable=False)  # "<id transaction>:<statut>"
+    event_type = db.Column(db.String(100), nullable=True)  # ex: 'transaction.approved'
+    object_id = db.Column(db.String(100), nullable=True)  # id de la transaction / du virement FedaPay
+    object_status = db.Column(db.String(50), nullable=True)  # approved, declined...
+    payload = db.Column(db.Text, nullable=False)  # Corps brut de la requête
+    status = db.Column(db.Enum('pending', 'processing', 'processed', 'ignored', 'failed'), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=8)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Backoff entre tentatives
+    locked_at = db.Column(db.DateTime, nullable=True)
+    locked_by = db.Column(db.String(100), nullable=True)
+    result = db.Column(db.String(255), nullable=True)  # Résumé de l'effet appliqué (ou raison de l'abandon)
+    last_error = db.Column(db.Text, nullable=True)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('provider', 'event_id', name='uq_webhook_provider_event'),
+        db.Index('idx_webhook_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+# ===================================================================
+# GRAND LIVRE DES PORTEFEUILLES
+# ===================================================================
+
+class LedgerEntry(db.Model):
+    """
+    Écriture du grand livre (app/utils/ledger.py), en partie double : les écritures d'un même mouvement
+    (transaction_key) ont une somme nulle. Table en ajout seul : une écriture n'est jamais modifiée ni supprimée,
+    une correction est un nouveau mouvement.
+    """
+    __tablename__ = 'LedgerEntries'
+    id = db.Column(db.Integer, primary_key=True)
+    transaction_key = db.Column(db.String(100), nullable=False)  # ex: 'commission:42', 'payout:7'
+    account = db.Column(db.String(50), nullable=False)  # 'wallet:<user_id>', 'platform:commissions', 'fedapay:payouts'...
+    user_id = db.Column(db.Integer, db.ForeignKey('Users.id', ondelete='CASCADE'), nullable=True)  # Comptes portefeuille
+    amount = db.Column(db.Numeric(20, 2), nullable=False)  # Signé : crédit > 0, débit < 0
+    entry_type = db.Column(db.Enum('commission', 'payout', 'payout_release', 'opening'), nullable=False)
+    description = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('transaction_key', 'account', name='uq_ledger_transaction_account'),
+        db.Index('idx_ledger_account_id', 'account', 'id'),
+        db.Index('idx_ledger_created', 'created_at'),
+    )
+
+class LedgerBalanceSnapshot(db.Model):
+    """
+    Solde et cumuls d'un compte du grand livre figés jusqu'à l'écriture last_entry_id
+    (scripts/snapshot_ledger_balances.py) : une lecture ajoute seulement les écritures postérieures.
+    entry_count (écritures jusqu'à last_entry_id) permet au passage de snapshot de détecter une écriture validée
+    en retard avec un id inférieur.
+    """
+    __tablename__ = 'LedgerBalanceSnapshots'
+    account = db.Column(db.String(50), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('Users.id', ondelete='CASCADE'), nullable=True)
+    balance = db.Column(db.Numeric(20, 2), nullable=False, default=0)
+    # Cumuls vus du portefeuille : commissions créditées (et reprise), montants virés nets des annulations
+    total_earned = db.Column(db.Numeric(20, 2), nullable=False, default=0)
+    total_withdrawn = db.Column(db.Numeric(20, 2), nullable=False, default=0)
+    last_entry_id = db.Column(db.Integer, nullable=False, default=0)
+    entry_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -14,6 +14,7 @@ from app.utils.email_utils import (
 )
 
 from app.utils.eav_utils import save_property_eav_values
+from app.utils.search_index_utils import sync_property_search_index, remove_property_search_index
 from werkzeug.utils import secure_filename
 
 UPLOAD_FOLDER = '/tmp' # Définir le dossier d'upload
@@ -214,6 +215,7 @@ def create_property():
                 db.session.add(new_image)
                 current_app.logger.debug(f"Image ajoutée: {image_url}")
 
+        sync_property_search_index(new_property)
         db.session.commit()
         current_app.logger.info("Bien immobilier créé avec succès et commité.")
         
@@ -236,14 +238,11 @@ def get_all_owner_properties(): # NOUVEAU NOM : get_ALL_owner_properties
     if not owner or owner.role != 'owner':
         return jsonify({'message': "Accès non autorisé. Seuls les propriétaires peuvent voir leurs biens."}), 403
 
-    # OPTIMISATION : Pré-chargement des images
-    properties = Property.query.options(selectinload(Property.images)).filter_by(owner_id=current_user_id).filter(Property.deleted_at == None).all()
+    properties = Property.query.filter_by(owner_id=current_user_id).filter(Property.deleted_at == None).all()
     
-    properties_with_images = []
-    for prop in properties:
-        property_dict = prop.to_dict()
-        property_dict['image_urls'] = [image.image_url for image in prop.images]
-        properties_with_images.append(property_dict)
+    # OPTIMISATION : images, valeurs EAV, statuts... chargés en un nombre fixe de requêtes
+    from app.utils.serialization_utils import serialize_properties
+    properties_with_images = serialize_properties(properties)
 
     total_count = len(properties)
     validated_count = sum(1 for p in properties if p.is_validated)
@@ -415,6 +414,7 @@ def update_owner_property(property_id):
     # -------------------------------
 
     try:
+        sync_property_search_index(property)
         db.session.commit()
         
         # Utiliser la méthode to_dict() du modèle pour une réponse cohérente
@@ -444,6 +444,7 @@ def delete_owner_property(property_id):
         return jsonify({'message': "Bien immobilier non trouvé ou vous n'êtes pas le propriétaire."}), 404
 
     try:
+        remove_property_search_index(property.id)
         db.session.delete(property)
         db.session.commit()
         # CORRECTION
@@ -514,9 +515,7 @@ def accept_visit_request_by_owner(request_id):
     visit_request.status = 'owner_accepted'
 
     try:
-        db.session.commit()
-
-        # Notifier l'admin que le propriétaire a accepté et qu'une validation finale est requise
+        # Notifier l'admin que le propriétaire a accepté et qu'une validation finale est requise (outbox, même transaction)
         property_obj = visit_request.property
         try:
             # Récupérer l'email admin
@@ -529,6 +528,7 @@ def accept_visit_request_by_owner(request_id):
                 )
         except Exception as e:
             current_app.logger.warning(f"Échec envoi email admin (proprio accepté): {e}")
+        db.session.commit()
 
         return jsonify({'message': 'Demande acceptée. L\'administrateur va maintenant valider la visite.'}), 200
     except Exception as e:
@@ -566,9 +566,8 @@ def reject_visit_request_by_owner(request_id):
 
     try:
         # Plus de remboursement ici car le pass n'est déduit qu'à la fin (Effectuée)
-        db.session.commit()
 
-        # Notifier le client du refus
+        # Notifier le client du refus (outbox, même transaction)
         customer = visit_request.customer
         property_obj = visit_request.property
         if customer and property_obj:
@@ -577,6 +576,7 @@ def reject_visit_request_by_owner(request_id):
                 property_obj.title,
                 message
             )
+        db.session.commit()
 
         return jsonify({'message': 'Demande de visite refusée. Notification envoyée au client.'}), 200
     except Exception as e:
@@ -673,7 +673,7 @@ def initiate_subscription_payment():
 
     try:
         from app.models import ServiceFee
-        import requests
+        from app.utils import http_client
         import os
         import json
         
@@ -706,7 +706,7 @@ def initiate_subscription_payment():
             }
         }
 
-        resp = requests.post(
+        resp = http_client.post(
             "https://sandbox-api.fedapay.com/v1/transactions" if os.getenv("FEDAPAY_ENVIRONMENT", "sandbox") == 'sandbox' else "https://api.fedapay.com/v1/transactions",
             json=payload,
             headers=headers,
@@ -723,7 +723,7 @@ def initiate_subscription_payment():
             # Let's request the token explicitly
             transaction_id = data.get('id')
             
-            token_resp = requests.post(
+            token_resp = http_client.post(
                 f"https://sandbox-api.fedapay.com/v1/transactions/{transaction_id}/token" if os.getenv("FEDAPAY_ENVIRONMENT", "sandbox") == 'sandbox' else f"https://api.fedapay.com/v1/transactions/{transaction_id}/token",
                 headers=headers,
                 timeout=10
@@ -774,7 +774,7 @@ def purchase_subscription():
 
     try:
         from app.models import ServiceFee, AppSetting
-        import requests
+        from app.utils import http_client
         import os
         from datetime import datetime, timedelta
         
@@ -789,7 +789,7 @@ def purchase_subscription():
             'Authorization': f'Bearer {os.getenv("FEDAPAY_SECRET_KEY")}'
         }
         
-        resp = requests.get(
+        resp = http_client.get(
             f"https://sandbox-api.fedapay.com/v1/transactions/{transaction_id}" if os.getenv("FEDAPAY_ENVIRONMENT", "sandbox") == 'sandbox' else f"https://api.fedapay.com/v1/transactions/{transaction_id}",
             headers=headers,
             timeout=10
@@ -36,152 +36,20 @@ def get_all_properties_for_seeker():
     Utilise un système de Scoring pour les filtres secondaires (attributs) et la pagination SQL.
     """
     
-    # --- 1. Base Query ---
-    # On commence par définir les colonnes de base et les relations à charger
-    base_query = Property.query.options(
-        selectinload(Property.images),
-        selectinload(Property.property_type),
-        selectinload(Property.owner)
-    ).join(Property.owner).outerjoin(PropertyStatus).filter(
-        Property.is_validated == True,
-        Property.deleted_at == None,
-        User.deleted_at == None,
-        (PropertyStatus.is_deterministic == False) | (PropertyStatus.id == None)
-    )
-
-    # --- 1.1 Filtre par Statut (Dynamique) ---
-    status_param = request.args.get('status')
-    if status_param and status_param != 'null' and status_param != '':
-        base_query = base_query.filter(Property.status == status_param)
-    else:
-        # Comportement par défaut : Vente et Location
-        base_query = base_query.filter(Property.status.in_(['for_sale', 'for_rent']))
-
-    # --- 1.2 Filtre par Pays ---
-    country_param = request.args.get('country', '').strip()
-    if country_param and country_param.lower() != 'all' and country_param != 'null':
-        base_query = base_query.filter(func.lower(Property.country) == country_param.lower())
-
-    # --- 2. Filtres "Durs" (Exclusion) ---
-    # Ces filtres éliminent les résultats qui ne correspondent PAS.
-    
-    # Recherche Textuelle (Tâche 20 : Double mots-clés)
-    search_query = request.args.get('search', '').strip()
-    if search_query:
-        words = search_query.split()
-        for word in words:
-            pattern = f"%{word}%"
-            base_query = base_query.filter(or_(
-                Property.title.ilike(pattern),
-                Property.city.ilike(pattern),
-                Property.address.ilike(pattern),
-                Property.description.ilike(pattern)
-            ))
-
-    # Filtrage par rayon géographique (Tâche 23 : GPS / Rayon de distance)
+    # --- 1. Requête sur le read-model dénormalisé (PropertySearchIndex) + pagination ---
+    # Tous les filtres (statut, pays, texte, rayon, type, prix, EAV) sont appliqués sur une seule table indexée.
+    # Pagination par curseur si `cursor` est fourni (défilement infini), sinon page / per_page.
+    from app.utils.search_index_utils import paginate_listing
+    from app.utils.geo_utils import haversine_km
+    from app.utils.serialization_utils import serialize_property_ids
     try:
-        lat_param = request.args.get('latitude')
-        lng_param = request.args.get('longitude')
-        radius_param = request.args.get('radius') # en kilomètres
-        
-        if lat_param and lng_param and radius_param:
-            lat_val = float(lat_param)
-            lng_val = float(lng_param)
-            radius_val = float(radius_param)
-            
-            # Formule de Haversine en SQL Alchemy
-            from sqlalchemy import func
-            distance = 6371 * func.acos(
-                func.cos(func.radians(lat_val)) * 
-                func.cos(func.radians(Property.latitude)) * 
-                func.cos(func.radians(Property.longitude) - func.radians(lng_val)) + 
-                func.sin(func.radians(lat_val)) * 
-                func.sin(func.radians(Property.latitude))
-            )
-            base_query = base_query.filter(distance <= radius_val)
-    except Exception as geo_err:
-        current_app.logger.error(f"Erreur lors du filtrage géographique par rayon: {geo_err}")
-
-    # Type de Bien
-    try:
-        property_type_id = request.args.get('property_type_id')
-        if property_type_id:
-            base_query = base_query.filter(Property.property_type_id == int(property_type_id))
-    except (ValueError, TypeError):
-        pass
+        entries, pagination_meta = paginate_listing(request.args, allow_country_filter=True)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
 
-    # Prix Min / Max
-    try:
-        min_price = request.args.get('min_price')
-        if min_price:
-            base_query = base_query.filter(cast(Property.price, Numeric) >= float(min_price))
-        
-        max_price = request.args.get('max_price')
-        if max_price:
-            base_query = base_query.filter(cast(Property.price, Numeric) <= float(max_price))
-    except (ValueError, TypeError):
-        pass
-
-    # --- 3. Filtres Dynamiques (Stricts avec EAV) ---
-    # Pour chaque filtre dynamique reçu, on exige que la propriété possède cet attribut ET cette valeur.
-    filters_json = request.args.get('filters')
-    if filters_json:
-        try:
-            dynamic_filters = json.loads(filters_json)
-            if isinstance(dynamic_filters, dict) and dynamic_filters:
-                from app.models import PropertyValue, PropertyAttribute
-                from sqlalchemy import and_
-                
-                for key, value in dynamic_filters.items():
-                    # Match exact basé sur le type reçu du JSON
-                    if isinstance(value, bool):
-                        cond = and_(
-                            func.lower(PropertyAttribute.name) == key.lower().strip(),
-                            PropertyValue.value_boolean == value
-                        )
-                    elif isinstance(value, int):
-                        cond = and_(
-                            func.lower(PropertyAttribute.name) == key.lower().strip(),
-                            PropertyValue.value_integer == value
-                        )
-                    elif isinstance(value, float):
-                        cond = and_(
-                            func.lower(PropertyAttribute.name) == key.lower().strip(),
-                            PropertyValue.value_decimal == str(value) # value_decimal is string/numeric in DB
-                        )
-                    else:
-                        # String et fallback
-                        val_str = str(value).lower().strip()
-                        cond = and_(
-                            func.lower(PropertyAttribute.name) == key.lower().strip(),
-                            func.lower(PropertyValue.value_string) == val_str
-                        )
-                    
-                    # On exige que CET attribut avec CETTE valeur existe pour ce bien
-                    has_attr = db.session.query(PropertyValue.id).join(
-                        PropertyAttribute, PropertyValue.attribute_id == PropertyAttribute.id
-                    ).filter(
-                        PropertyValue.property_id == Property.id,
-                        cond
-                    ).exists()
-                    
-                    base_query = base_query.filter(has_attr)
-
-        except json.JSONDecodeError:
-            pass
-
-    # --- 4. Tri et Pagination ---
-    # Tri par date classique
-    query = base_query.order_by(Property.created_at.desc())
-
-    # Pagination DB stricte
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
-
-    # La méthode .paginate() fait un COUNT(*) optimisé puis un LIMIT/OFFSET
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    
-    properties = pagination.items
+    # --- 2. Sérialisation de la page uniquement ---
+    # Sérialisation de la page uniquement, directement depuis des tuples (sans hydratation ORM)
+    properties_list = serialize_property_ids([entry.property_id for entry in entries])
 
     lat_param = request.args.get('latitude')
     lng_param = request.args.get('longitude')
@@ -193,26 +61,14 @@ def get_all_properties_for_seeker():
         except ValueError:
             pass
 
-    properties_list = []
-    for p in properties:
-        p_dict = p.to_dict()
-        if lat_val is not None and lng_val is not None and p.latitude is not None and p.longitude is not None:
-            import math
-            lat1, lon1 = math.radians(lat_val), math.radians(lng_val)
-            lat2, lon2 = math.radians(float(p.latitude)), math.radians(float(p.longitude))
-            dlon = lon2 - lon1
-            dlat = lat2 - lat1
-            a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-            c = 2 * math.asin(math.sqrt(a))
-            r = 6371 # Radius of earth in kilometers
-            p_dict['distance_km'] = round(c * r, 2)
-        properties_list.append(p_dict)
+    for p_dict in properties_list:
+        if lat_val is not None and lng_val is not None and p_dict['latitude'] is not None and p_dict['longitude'] is not None:
+            # Distance exacte calculée uniquement pour les biens de la page
+            p_dict['distance_km'] = round(haversine_km(lat_val, lng_val, p_dict['latitude'], p_dict['longitude']), 2)
 
     return jsonify({
         'properties': properties_list,
-        'total': pagination.total,
-        'pages': pagination.pages,
-        'current_page': page
+        **pagination_meta
     }), 200
 
 @seekers_bp.route('/properties/<int:property_id>', methods=['GET'])
@@ -316,14 +172,14 @@ def purchase_visit_passes():
             return jsonify({'message': "Service d'achat de pass non configuré."}), 500
         
         price_per_pass = price_entry.amount # C'est un Decimal
-        import requests
+        from app.utils import http_client
         import os
         
         headers = {
             'Authorization': f'Bearer {os.getenv("FEDAPAY_SECRET_KEY")}'
         }
         
-        resp = requests.get(
+        resp = http_client.get(
             f"https://sandbox-api.fedapay.com/v1/transactions/{transaction_id}" if os.getenv("FEDAPAY_ENVIRONMENT", "sandbox") == 'sandbox' else f"https://api.fedapay.com/v1/transactions/{transaction_id}",
             headers=headers,
             timeout=10
@@ -437,16 +293,17 @@ def create_property_request():
 
     try:
         db.session.add(new_request)
+        db.session.flush()
+        # Critères typés + index inversé des alertes utilisés par le moteur de matching
+        from app.utils.alert_index_utils import sync_property_request_index, sync_property_request_criteria
+        sync_property_request_criteria(new_request)
+        sync_property_request_index(new_request)
+
+        # --- TRIGGER MATCHING : job asynchrone exécuté par le worker ---
+        from app.utils.job_queue import enqueue_job, JOB_MATCH_REQUEST
+        enqueue_job(JOB_MATCH_REQUEST, {'request_id': new_request.id})
         db.session.commit()
 
-        # --- TRIGGER MATCHING ---
-        from app.utils.matching_utils import find_matches_for_request
-        try:
-            find_matches_for_request(new_request.id)
-        except Exception as e:
-            current_app.logger.error(f"Error triggering matching for request {new_request.id}: {e}")
-        # ------------------------
-
         return jsonify({'message': "Votre alerte a bien été enregistrée. Nous vous contacterons bientôt.", 'request': new_request.to_dict()}), 201
     except Exception as e:
         db.session.rollback()
@@ -458,15 +315,25 @@ def create_property_request():
 def get_seeker_property_requests():
     """
     Récupère l'historique des alertes de recherche pour le client connecté.
+    Filtre optionnel sur les critères (en SQL) : ?criterion=clé:valeur (répétable).
     """
+    from app.utils.alert_index_utils import request_listing_options, parse_criteria_filters, apply_criteria_filters
+
     current_user_id = get_jwt_identity()
     customer = User.query.get(current_user_id)
 
     if not customer or customer.role != 'customer':
         return jsonify({'message': 'Accès refusé.'}), 403
 
+    try:
+        criteria_filters = parse_criteria_filters(request.args.getlist('criterion'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
     # On récupère TOUTES les demandes du client (historique complet), les plus récentes en premier
-    requests = PropertyRequest.query.filter_by(customer_id=current_user_id).order_by(PropertyRequest.created_at.desc()).all()
+    query = PropertyRequest.query.options(*request_listing_options()).filter_by(customer_id=current_user_id)
+    query = apply_criteria_filters(query, criteria_filters)
+    requests = query.order_by(PropertyRequest.created_at.desc()).all()
     
     return jsonify([req.to_dict() for req in requests]), 200
 
@@ -492,6 +359,8 @@ def delete_property_request(request_id):
         req.status = 'closed'
         req.archived_at = datetime.utcnow()
         req.archived_by = current_user_id
+        from app.utils.alert_index_utils import sync_property_request_index
+        sync_property_request_index(req)
         
         db.session.commit()
         return jsonify({'message': "Alerte supprimée avec succès."}), 200
@@ -501,6 +370,48 @@ def delete_property_request(request_id):
         current_app.logger.error(f"Erreur suppression alerte: {e}")
         return jsonify({'message': "Erreur serveur."}), 500
 
+@seekers_bp.route('/alert-digest-settings', methods=['GET'])
+@jwt_required()
+def get_alert_digest_settings():
+    """
+    Fréquence des emails d'alerte du client : 'instant', 'hourly' ou 'daily' (voir app/utils/alert_digest.py).
+    """
+    current_user_id = get_jwt_identity()
+    customer = User.query.get(current_user_id)
+
+    if not customer or customer.role != 'customer':
+        return jsonify({'message': 'Accès refusé.'}), 403
+
+    return jsonify({'alert_digest_frequency': customer.alert_digest_frequency}), 200
+
+@seekers_bp.route('/alert-digest-settings', methods=['PUT'])
+@jwt_required()
+def update_alert_digest_settings():
+    """
+    Modifie la fréquence des emails d'alerte. Les matches déjà en attente partiront dans le prochain digest.
+    """
+    from app.utils.alert_digest import DIGEST_FREQUENCIES
+
+    current_user_id = get_jwt_identity()
+    customer = User.query.get(current_user_id)
+
+    if not customer or customer.role != 'customer':
+        return jsonify({'message': 'Accès refusé.'}), 403
+
+    data = request.get_json() or {}
+    frequency = data.get('alert_digest_frequency')
+    if frequency not in DIGEST_FREQUENCIES:
+        return jsonify({'message': f"Fréquence invalide. Valeurs possibles : {', '.join(DIGEST_FREQUENCIES)}."}), 400
+
+    try:
+        customer.alert_digest_frequency = frequency
+        db.session.commit()
+        return jsonify({'message': "Préférences d'alerte mises à jour.", 'alert_digest_frequency': frequency}), 200
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Erreur mise à jour fréquence des alertes: {e}")
+        return jsonify({'message': "Erreur serveur."}), 500
+
 # ===================================================================
 # GESTION DES FAVORIS
 # ===================================================================
@@ -548,7 +459,8 @@ def get_favorite_properties():
     # Jointure pour récupérer les propriétés favorites
     favorites = db.session.query(Property).join(UserFavorite).filter(UserFavorite.user_id == current_user_id).all()
     
-    return jsonify([p.to_dict() for p in favorites]), 200
+    from app.utils.serialization_utils import serialize_properties
+    return jsonify(serialize_properties(favorites)), 200
 
 # ===================================================================
 # GESTION DES AVIS AGENTS
@@ -721,9 +633,9 @@ def submit_visit_request(property_id):
         # On a déjà vérifié que user.visit_passes > 0 plus haut.
 
         db.session.add(visit_request)
-        db.session.commit()
         
         # Notification au propriétaire du bien (sans données client pour la confidentialité)
+        # Emails enregistrés dans l'outbox, commités avec la demande de visite (envoi par scripts/email_worker.py)
         try:
             owner = User.query.get(property_obj.owner_id)
             if owner:
@@ -756,6 +668,7 @@ def submit_visit_request(property_id):
             )
         except Exception as e:
             current_app.logger.warning(f"Échec envoi email confirmation client: {e}")
+        db.session.commit()
         
         current_app.logger.info(f"Demande de visite créée: {visit_request.id} pour propriété {property_id} par user {user_id}")
         
@@ -0,0 +1,149 @@
+"""
+Digests des emails d'alerte : les nouveaux matches (PropertyRequestMatch.notified_at NULL) sont regroupés
+par chercheur et envoyés en un seul email, selon User.alert_digest_frequency :
+- instant : dès la fin du matching qui les a créés (un email par chercheur et par exécution) ;
+- hourly / daily : au plus un email par heure / par jour (scripts/send_alert_digests.py).
+Le volume d'emails suit le nombre de chercheurs et non le nombre de matches.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from app import db
+from app.models import User, Property, PropertyRequest, PropertyRequestMatch, AlertDigest
+from app.utils.email_utils import send_alert_digest_email
+
+DIGEST_FREQUENCIES = ('instant', 'hourly', 'daily')
+DIGEST_WINDOWS = {
+    'instant': timedelta(0),
+    'hourly': timedelta(hours=1),
+    'daily': timedelta(days=1),
+}
+# Biens listés dans l'email (les suivants sont résumés par "... et N autres")
+DIGEST_MAX_LISTED = 20
+
+
+def _pending_matches(customer_ids):
+    """
+    Matches non notifiés des chercheurs : {customer_id: [lignes (match_id, property_id, title, city, price)]},
+    plus récents d'abord.
+    """
+    rows = db.session.query(
+        PropertyRequest.customer_id, PropertyRequestMatch.id, PropertyRequestMatch.property_id,
+        Property.title, Property.city, Property.price
+    ).join(
+        PropertyRequest, PropertyRequest.id == PropertyRequestMatch.property_request_id
+    ).join(
+        Property, Property.id == PropertyRequestMatch.property_id
+    ).filter(
+        PropertyRequestMatch.notified_at == None,
+        PropertyRequest.customer_id.in_(customer_ids)
+    ).order_by(PropertyRequestMatch.created_at.desc(), PropertyRequestMatch.id.desc()).all()
+
+    pending = defaultdict(list)
+    for customer_id, match_id, property_id, title, city, price in rows:
+        pending[customer_id].append((match_id, property_id, title, city, price))
+    return pending
+
+
+def _format_price(price):
+    return f"{price:,.0f}".replace(",", " ") if price else None
+
+
+def _queue_digest(customer, matches, now):
+    """
+    Met en file l'email du digest et marque les matches comme notifiés. N'effectue pas de commit.
+    Un même bien matché par plusieurs alertes du chercheur n'est listé qu'une fois ; match_count est le
+    nombre de biens annoncé dans l'email.
+    """
+    listed, seen = [], set()
+    for _, property_id, title, city, price in matches:
+        if property_id in seen:
+            continue
+        seen.add(property_id)
+        listed.append({'title': title, 'city': city, 'price': _format_price(price)})
+
+    if not send_alert_digest_email(customer.email, customer.first_name, listed[:DIGEST_MAX_LISTED], len(listed)):
+        return None
+
+    digest = AlertDigest(
+        customer_id=customer.id, frequency=customer.alert_digest_frequency,
+        match_count=len(listed), created_at=now
+    )
+    db.session.add(digest)
+    db.session.flush()
+    PropertyRequestMatch.query.filter(PropertyRequestMatch.id.in_([m[0] for m in matches])).update({
+        PropertyRequestMatch.notified_at: now,
+        PropertyRequestMatch.digest_id: digest.id
+    }, synchronize_session=False)
+    return digest
+
+
+def queue_instant_digests(customer_ids):
+    """
+    Après un matching : un digest pour chaque chercheur en mode 'instant' parmi customer_ids.
+    Les chercheurs en mode hourly / daily sont servis par send_due_digests. N'effectue pas de commit.
+    """
+    if not customer_ids:
+        return []
+    customers = User.query.filter(
+        User.id.in_(customer_ids), User.alert_digest_frequency == 'instant', User.deleted_at == None
+    ).all()
+    if not customers:
+        return []
+
+    now = datetime.utcnow()
+    pending = _pending_matches([c.id for c in customers])
+    digests = []
+    for customer in customers:
+        if pending.get(customer.id):
+            digest = _queue_digest(customer, pending[customer.id], now)
+            if digest:
+                digests.append(digest)
+    return digests
+
+
+def due_customer_ids(now=None, frequencies=DIGEST_FREQUENCIES):
+    """Chercheurs ayant des matches non notifiés et dont le dernier digest est plus ancien que leur fenêtre."""
+    now = now or datetime.utcnow()
+    candidates = db.session.query(User.id, User.alert_digest_frequency).join(
+        PropertyRequest, PropertyRequest.customer_id == User.id
+    ).join(
+        PropertyRequestMatch, PropertyRequestMatch.property_request_id == PropertyRequest.id
+    ).filter(
+        PropertyRequestMatch.notified_at == None,
+        User.deleted_at == None,
+        User.alert_digest_frequency.in_(frequencies)
+    ).distinct().all()
+    if not candidates:
+        return []
+
+    last_sent = dict(db.session.query(AlertDigest.customer_id, func.max(AlertDigest.created_at)).filter(
+        AlertDigest.customer_id.in_([customer_id for customer_id, _ in candidates])
+    ).group_by(AlertDigest.customer_id).all())
+
+    return sorted(
+        customer_id for customer_id, frequency in candidates
+        if customer_id not in last_sent or now - last_sent[customer_id] >= DIGEST_WINDOWS[frequency]
+    )
+
+
+def send_due_digests(now=None, frequencies=DIGEST_FREQUENCIES, batch_size=100):
+    """Met en file les digests dus (un commit par lot de chercheurs). Retourne (nb de digests, nb de biens annoncés)."""
+    now = now or datetime.utcnow()
+    customer_ids = due_customer_ids(now, frequencies)
+    digest_count = match_count = 0
+
+    for start in range(0, len(customer_ids), batch_size):
+        batch_ids = customer_ids[start:start + batch_size]
+        customers = User.query.filter(User.id.in_(batch_ids)).all()
+        pending = _pending_matches(batch_ids)
+        for customer in customers:
+            if not pending.get(customer.id):
+                continue
+            digest = _queue_digest(customer, pending[customer.id], now)
+            if digest:
+                digest_count += 1
+                match_count += digest.match_count
+        db.session.commit()
+
+    return digest_count, match_count
@@ -0,0 +1,187 @@
+import json
+from collections import namedtuple
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import selectinload
+from app import db
+from app.models import PropertyRequest, PropertyRequestIndex, PropertyRequestCriteria
+from app.utils.attribute_resolver import get_attribute_resolver
+
+# Statuts d'alerte pris en compte par le moteur de matching
+ACTIVE_REQUEST_STATUSES = ('new', 'in_progress', 'contacted')
+
+# Clés de request_details traitées par les critères obligatoires (colonnes de PropertyRequest)
+RESERVED_CRITERIA_KEYS = ('city', 'min_price', 'max_price', 'status', 'preferred_status')
+
+# Critère dynamique typé (mêmes champs que PropertyRequestCriteria)
+Criterion = namedtuple('Criterion', ['attribute_key', 'operator', 'value_text', 'value_number', 'value_boolean'])
+
+# Au-delà, trop de sous-chaînes : la ville n'est plus filtrée en SQL (calculate_match_score la revérifie)
+MAX_CITY_KEY_LENGTH = 40
+
+
+def normalize_city_key(city):
+    """Clé ville d'une alerte : mêmes règles que calculate_match_score (minuscules, '' si absente)."""
+    return city.lower() if city else ''
+
+
+def city_keys_for_property(city):
+    """
+    Toutes les clés ville d'alerte compatibles avec la ville d'un bien : le critère ville est
+    "ville de l'alerte contenue dans la ville du bien", donc les sous-chaînes de la ville du bien.
+    Retourne None si la ville est trop longue pour être énumérée.
+    """
+    if not city:
+        return set()
+    city = city.lower()
+    if len(city) > MAX_CITY_KEY_LENGTH:
+        return None
+    return {city[i:j] for i in range(len(city)) for j in range(i + 1, len(city) + 1)}
+
+
+def parse_request_criteria(request_details):
+    """
+    Extrait les critères dynamiques typés du JSON request_details (une seule fois par alerte).
+    Mêmes règles que le moteur de matching : clés réservées, valeurs nulles ou vides ignorées.
+    """
+    try:
+        details = json.loads(request_details) if request_details else {}
+    except json.JSONDecodeError:
+        details = {}
+    if not isinstance(details, dict):
+        return []
+
+    criteria = []
+    for key, value in details.items():
+        if key.lower() in RESERVED_CRITERIA_KEYS or value is None or str(value).strip() == '':
+            continue
+        criteria.append(Criterion(
+            attribute_key=key.lower(),
+            operator='eq',
+            value_text=str(value).lower(),
+            # bool est un int en Python : True vaut 1 dans la comparaison numérique
+            value_number=float(value) if isinstance(value, (int, float)) else None,
+            value_boolean=value if isinstance(value, bool) else None
+        ))
+    return criteria
+
+
+def criterion_matches(criterion, prop_val):
+    """Compare un critère typé à la valeur d'attribut du bien (texte insensible à la casse, ou nombre)."""
+    if prop_val is None:
+        return False
+    if str(prop_val).lower() == criterion.value_text:
+        return True
+    return criterion.value_number is not None and isinstance(prop_val, (int, float)) and prop_val == criterion.value_number
+
+
+def get_request_criteria(req):
+    """Critères de l'alerte : lignes PropertyRequestCriteria, ou JSON pour une alerte pas encore migrée."""
+    if req.criteria:
+        return req.criteria
+    return parse_request_criteria(req.request_details)
+
+
+def request_listing_options():
+    """
+    Chargements groupés des listings d'alertes (admin, client) : client et type. Le champ criteria des
+    réponses reste le JSON request_details ; les lignes PropertyRequestCriteria ne servent qu'au filtrage
+    (?criterion=) et au matching.
+    """
+    return (
+        selectinload(PropertyRequest.customer),
+        selectinload(PropertyRequest.property_type),
+    )
+
+
+def parse_criteria_filters(raw_filters):
+    """
+    Filtres de listing sur les critères : ["clé:valeur", ...] (paramètre ?criterion= répété).
+    Lève ValueError si un filtre n'a pas la forme clé:valeur.
+    """
+    filters = []
+    for raw in raw_filters:
+        key, sep, value = raw.partition(':')
+        if not sep or not key.strip() or not value.strip():
+            raise ValueError(f"Filtre de critère invalide : '{raw}' (attendu clé:valeur)")
+        filters.append((key.strip().lower(), value.strip()))
+    return filters
+
+
+def apply_criteria_filters(query, filters):
+    """
+    Restreint une requête sur PropertyRequest aux alertes portant chacun des critères (EXISTS sur
+    PropertyRequestCriteria, index idx_prc_request) : valeur texte (insensible à la casse) ou numérique.
+    """
+    for key, value in filters:
+        value_match = PropertyRequestCriteria.value_text == value.lower()
+        try:
+            value_match = or_(value_match, PropertyRequestCriteria.value_number == float(value))
+        except ValueError:
+            pass
+        query = query.filter(PropertyRequest.criteria.any(and_(
+            PropertyRequestCriteria.attribute_key == key, value_match
+        )))
+    return query
+
+
+def sync_property_request_criteria(req):
+    """(Re)crée les lignes PropertyRequestCriteria d'une alerte à partir de request_details. À appeler avant le commit."""
+    attribute_ids = {a.name.lower(): a.id for a in get_attribute_resolver().attributes}
+    req.criteria = [
+        PropertyRequestCriteria(
+            attribute_id=attribute_ids.get(c.attribute_key),
+            attribute_key=c.attribute_key,
+            operator=c.operator,
+            value_text=c.value_text,
+            value_number=c.value_number,
+            value_boolean=c.value_boolean
+        )
+        for c in parse_request_criteria(req.request_details)
+    ]
+    return req.criteria
+
+
+def sync_property_request_index(req):
+    """Crée ou met à jour l'entrée d'index d'une alerte. À appeler avant le commit."""
+    entry = db.session.get(PropertyRequestIndex, req.id)
+    if entry is None:
+        entry = PropertyRequestIndex(property_request_id=req.id)
+        db.session.add(entry)
+
+    entry.property_type_id = req.property_type_id
+    entry.is_active = req.status in ACTIVE_REQUEST_STATUSES
+    entry.preferred_status = req.preferred_status or ''
+    entry.city_key = normalize_city_key(req.city)
+    # Un prix à 0 n'est pas un critère (même règle que calculate_match_score)
+    entry.min_price = req.min_price if req.min_price else None
+    entry.max_price = req.max_price if req.max_price else None
+    return entry
+
+
+def candidate_request_ids_for_property(prop):
+    """
+    IDs des alertes actives pouvant passer les critères obligatoires du bien (type, statut, ville, prix).
+    Une seule requête sur l'index ; les alertes écartées ne sont jamais scorées.
+    """
+    query = db.session.query(PropertyRequestIndex.property_request_id).filter(
+        PropertyRequestIndex.property_type_id == prop.property_type_id,
+        PropertyRequestIndex.is_active == True
+    )
+
+    statuses = [''] + ([prop.status] if prop.status else [])
+    query = query.filter(PropertyRequestIndex.preferred_status.in_(statuses))
+
+    city_keys = city_keys_for_property(prop.city)
+    if city_keys is not None:
+        query = query.filter(PropertyRequestIndex.city_key.in_([''] + sorted(city_keys)))
+
+    if prop.price:
+        query = query.filter(
+            or_(PropertyRequestIndex.min_price == None, PropertyRequestIndex.min_price <= prop.price),
+            or_(PropertyRequestIndex.max_price == None, PropertyRequestIndex.max_price >= prop.price)
+        )
+    else:
+        # Bien sans prix : seules les alertes sans fourchette de prix restent candidates
+        query = query.filter(PropertyRequestIndex.min_price == None, PropertyRequestIndex.max_price == None)
+
+    return [request_id for (request_id,) in query.all()]
@@ -0,0 +1,200 @@
+import re
+import time
+import threading
+from collections import namedtuple
+from app import db
+from app.models import PropertyAttribute, AppSetting
+
+# Instantané léger d'un attribut (pas d'objet ORM : le cache survit aux sessions)
+AttributeInfo = namedtuple('AttributeInfo', ['id', 'name', 'data_type', 'is_filterable'])
+
+# Alias historiques du payload mobile -> nom officiel normalisé
+ATTRIBUTE_ALIASES = {
+    "surface m2": ["surface (m2)"],
+    "nombre de salle de bain": ["nombre de salle de bains"],
+    "niveau d'étage": ["niveau d'étage", "niveau d étage"],
+    "giillage porte et fenêtre": ["grille de protection"],
+    "cours avant": ["cour avant"],
+}
+
+# Clé AppSetting portant la version du référentiel d'attributs (partagée entre workers gunicorn)
+VERSION_SETTING_KEY = 'property_attributes_version'
+# Intervalle (secondes) entre deux vérifications de la version en base
+VERSION_CHECK_INTERVAL = 30
+
+NGRAM_SIZE = 3
+FUZZY_CACHE_SIZE = 2048
+
+
+def clean_key(key):
+    k = str(key).replace('.', ' ').strip().lower()
+    return re.sub(r'\s+', ' ', k)
+
+
+def _ngrams(text):
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+class AttributeResolver:
+    """
+    Résolution des clés du payload vers les PropertyAttributes, entièrement en mémoire :
+    - correspondance exacte (nom normalisé + alias) en O(1),
+    - correspondance approchante ("clé contenue dans le nom" ou "nom contenu dans la clé")
+      via un index de trigrammes précalculé, mémoïsée par clé.
+    Le résultat est identique au parcours linéaire historique : premier attribut dans l'ordre de la table.
+    """
+
+    def __init__(self, attributes):
+        self.attributes = list(attributes)
+        self.by_id = {a.id: a for a in self.attributes}
+
+        # Même ordre d'insertion que l'ancien get_normalized_attributes()
+        self.attr_map = {}
+        for a in self.attributes:
+            cleaned = clean_key(a.name)
+            self.attr_map[cleaned] = a
+            for alias in ATTRIBUTE_ALIASES.get(cleaned, []):
+                self.attr_map[alias] = a
+
+        self._keys = list(self.attr_map.keys())
+        self._key_ngrams = [_ngrams(k) for k in self._keys]
+        self._ngram_index = {}
+        for position, grams in enumerate(self._key_ngrams):
+            for gram in grams:
+                self._ngram_index.setdefault(gram, set()).add(position)
+
+        # Noms trop courts pour avoir des trigrammes : toujours candidats
+        self._short_positions = {p for p, grams in enumerate(self._key_ngrams) if not grams}
+        self._fuzzy_cache = {}
+
+    def resolve(self, raw_key):
+        """Retourne l'AttributeInfo correspondant à une clé du payload, ou None."""
+        cleaned = clean_key(raw_key)
+        found = self.attr_map.get(cleaned)
+        if found:
+            return found
+
+        if cleaned in self._fuzzy_cache:
+            return self._fuzzy_cache[cleaned]
+
+        position = self._fuzzy_position(cleaned)
+        found = self.attr_map[self._keys[position]] if position is not None else None
+
+        if len(self._fuzzy_cache) >= FUZZY_CACHE_SIZE:
+            self._fuzzy_cache.clear()
+        self._fuzzy_cache[cleaned] = found
+        return found
+
+    def _fuzzy_position(self, cleaned):
+        if len(cleaned) < NGRAM_SIZE:
+            # Clé trop courte pour l'index : parcours linéaire (rare)
+            for position, key in enumerate(self._keys):
+                if cleaned in key or key in cleaned:
+                    return position
+            return None
+
+        grams = _ngrams(cleaned)
+        candidates = set()
+
+        # 1. clé contenue dans un nom : le nom possède tous les trigrammes de la clé
+        postings = [self._ngram_index.get(g, set()) for g in grams]
+        if all(postings):
+            candidates |= set.intersection(*postings)
+
+        # 2. nom contenu dans la clé : tous les trigrammes du nom sont dans la clé
+        hits = {}
+        for gram in grams:
+            for position in self._ngram_index.get(gram, ()):
+                hits[position] = hits.get(position, 0) + 1
+        for position, count in hits.items():
+            if count == len(self._key_ngrams[position]):
+                candidates.add(position)
+        candidates |= self._short_positions
+
+        for position in sorted(candidates):
+            key = self._keys[position]
+            if cleaned in key or key in cleaned:
+                return position
+        return None
+
+
+class _ResolverCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.resolver = None
+        self.version = None
+        self.checked_at = 0.0
+
+
+_cache = _ResolverCache()
+
+
+def _read_version():
+    setting = AppSetting.query.filter_by(setting_key=VERSION_SETTING_KEY).first()
+    return setting.setting_value if setting else '0'
+
+
+def _load_resolver():
+    rows = db.session.query(
+        PropertyAttribute.id, PropertyAttribute.name, PropertyAttribute.data_type, PropertyAttribute.is_filterable
+    ).order_by(PropertyAttribute.id).all()
+    return AttributeResolver(AttributeInfo(*row) for row in rows)
+
+
+def get_attribute_resolver():
+    """
+    Résolveur partagé par le process. La version en base n'est relue qu'une fois toutes les
+    VERSION_CHECK_INTERVAL secondes ; l'index n'est reconstruit que si elle a changé.
+    """
+    now = time.monotonic()
+    if _cache.resolver is not None and now - _cache.checked_at < VERSION_CHECK_INTERVAL:
+        return _cache.resolver
+
+    with _cache.lock:
+        if _cache.resolver is not None and now - _cache.checked_at < VERSION_CHECK_INTERVAL:
+            return _cache.resolver
+
+        version = _read_version()
+        if _cache.resolver is None or version != _cache.version:
+            _cache.resolver = _load_resolver()
+            _cache.version = version
+        _cache.checked_at = now
+        return _cache.resolver
+
+
+def reload_attribute_resolver():
+    """
+    Recharge immédiatement le résolveur partagé depuis la base, sans attendre VERSION_CHECK_INTERVAL :
+    à appeler quand une clé ne se résout pas, l'attribut pouvant avoir été créé ou renommé par un autre
+    worker (ou sans incrément de version). Une requête sur PropertyAttributes, comme avant le cache.
+    """
+    with _cache.lock:
+        _cache.version = _read_version()
+        _cache.resolver = _load_resolver()
+        _cache.checked_at = time.monotonic()
+        return _cache.resolver
+
+
+def invalidate_attribute_resolver():
+    """
+    À appeler (avant le commit) après création / modification / suppression d'un attribut :
+    incrémente la version en base pour les autres workers et vide le cache local.
+    """
+    setting = AppSetting.query.filter_by(setting_key=VERSION_SETTING_KEY).first()
+    if not setting:
+        setting = AppSetting(
+            setting_key=VERSION_SETTING_KEY,
+            setting_value='1',
+            description="Version du référentiel d'attributs (invalidation des caches).",
+            data_type='integer',
+            is_editable_by_admin=False
+        )
+        db.session.add(setting)
+    else:
+        current = int(setting.setting_value) if setting.setting_value.isdigit() else 0
+        setting.setting_value = str(current + 1)
+
+    with _cache.lock:
+        _cache.resolver = None
+        _cache.version = None
+        _cache.checked_at = 0.0
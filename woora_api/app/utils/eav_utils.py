@@ -1,122 +1,146 @@
 import re
 from app import db
-from app.models import PropertyValue, PropertyAttribute
-
-def clean_key(key):
-    k = str(key).replace('.', ' ').strip().lower()
-    return re.sub(r'\s+', ' ', k)
+from sqlalchemy.orm.util import identity_key
+from app.models import Property, PropertyValue
+from app.utils.attribute_resolver import clean_key, get_attribute_resolver, reload_attribute_resolver
 
 def get_normalized_attributes():
-    attrs = PropertyAttribute.query.all()
-    attr_map = {}
-    for a in attrs:
-        cleaned = clean_key(a.name)
-        attr_map[cleaned] = a
-        if cleaned == "surface m2":
-            attr_map["surface (m2)"] = a
-        if cleaned == "nombre de salle de bain":
-            attr_map["nombre de salle de bains"] = a
-        if cleaned == "niveau d'étage":
-            attr_map["niveau d'étage"] = a
-            attr_map["niveau d étage"] = a
-        if cleaned == "giillage porte et fenêtre":
-            attr_map["grille de protection"] = a
-        if cleaned == "cours avant":
-            attr_map["cour avant"] = a
-    return attr_map
-
-def save_property_eav_values(property_id, dynamic_attributes):
+    """
+    Dictionnaire {nom normalisé ou alias: AttributeInfo}, servi par le cache process-wide
+    (voir app.utils.attribute_resolver) : aucune requête tant que la version n'a pas changé.
+    """
+    return get_attribute_resolver().attr_map
+
+def _coerce_eav_value(data_type, val):
+    """Convertit une valeur brute du payload vers (value_string, value_integer, value_boolean, value_decimal)."""
+    v_str, v_int, v_bool, v_dec = None, None, None, None
+
+    if data_type == 'boolean':
+        if isinstance(val, bool): v_bool = val
+        elif isinstance(val, str): v_bool = val.lower() in ['true', '1', 'oui', 'yes']
+        else: v_bool = bool(val)
+    elif data_type == 'integer':
+        if isinstance(val, int): v_int = val
+        elif isinstance(val, str):
+            match = re.search(r'\d+', val)
+            v_int = int(match.group()) if match else None
+        else: v_int = int(val)
+    elif data_type == 'decimal':
+        v_dec = float(val)
+    else:
+        v_str = str(val)[:255] if val is not None else None
+
+    return v_str, v_int, v_bool, v_dec
+
+def _same_eav_value(pv, values):
+    v_str, v_int, v_bool, v_dec = values
+    current_dec = float(pv.value_decimal) if pv.value_decimal is not None else None
+    return (pv.value_string == v_str and pv.value_integer == v_int
+            and pv.value_boolean == v_bool and current_dec == v_dec)
+
+def save_property_eav_values(property_id, dynamic_attributes, resolver=None):
     """
     Parcourt le dictionnaire dynamique (ex: payload Flutter), trouve les PropertyAttributes correspondants,
     et insère/met à jour de manière robuste les lignes dans PropertyValues (modèle EAV).
+
+    Chemin "bulk" : une seule requête pour lire les valeurs existantes du bien, calcul du diff en mémoire,
+    puis un INSERT multi-lignes pour les nouvelles valeurs ; seules les valeurs réellement modifiées
+    ou supprimées génèrent des UPDATE / DELETE.
+    La résolution des clés passe par le résolveur d'attributs en cache (`resolver` optionnel) ; une clé
+    non résolue entraîne un rechargement du résolveur (une fois par appel) avant d'être ignorée.
     """
     if not dynamic_attributes or not isinstance(dynamic_attributes, dict):
         return
-        
-    attr_map = get_normalized_attributes()
-    
+
+    if resolver is None:
+        resolver = get_attribute_resolver()
+
     # Clés à ignorer car stockées dans Properties (colonne)
     system_keys = ['price', 'title', 'status', 'description', 'address', 'city', 'latitude', 'longitude', 'jours_visite', 'horaires_visite', 'postal_code', 'property_type_id', 'is_validated', 'created_at', 'updated_at', 'deleted_at']
 
     # On ne supprime plus tout d'un coup pour éviter la perte de données (Merge/Upsert)
-    # PropertyValue.query.filter_by(property_id=property_id).delete() # REMOVED
-    
-    unique_attrs_processed = set()
+    # Seuls les attributs présents dans le payload sont touchés.
+    target_values = {}  # attribute_id -> tuple de valeurs typées
+    reloaded = False
+    attrs_to_delete = set()
 
     for key, val in dynamic_attributes.items():
         if val is None or val == "":
             continue
-            
+
         cleaned_k = clean_key(key)
         if cleaned_k in system_keys or cleaned_k.startswith('_'):
             continue
-            
-        # Chercher l'attribut officiel
-        found_attr = attr_map.get(cleaned_k)
-        
-        # Fuzzy match si la clé exacte n'y est pas
-        if not found_attr:
-            for ak, av in attr_map.items():
-                if cleaned_k in ak or ak in cleaned_k:
-                    found_attr = av
-                    break
-        
+
+        # Chercher l'attribut officiel (exact, alias, puis correspondance approchante indexée)
+        found_attr = resolver.resolve(cleaned_k)
+
+        # Attribut peut-être créé ou renommé par un autre worker depuis la dernière vérification du cache
+        if not found_attr and not reloaded:
+            resolver = reload_attribute_resolver()
+            reloaded = True
+            found_attr = resolver.resolve(cleaned_k)
+
         if not found_attr:
             continue
-            
+
         attr_id = found_attr.id
-        if attr_id in unique_attrs_processed:
-            continue 
-        unique_attrs_processed.add(attr_id)
-
-        # Si la valeur est nulle ou vide, on supprime l'attribut s'il existe
-        if val is None or str(val).strip() == '':
-            existing_pv = PropertyValue.query.filter_by(property_id=property_id, attribute_id=attr_id).first()
-            if existing_pv:
-                db.session.delete(existing_pv)
+        if attr_id in target_values or attr_id in attrs_to_delete:
+            continue
+
+        # Si la valeur est vide (espaces), on supprime l'attribut s'il existe
+        if str(val).strip() == '':
+            attrs_to_delete.add(attr_id)
             continue
 
-        d_type = found_attr.data_type
-        v_str, v_int, v_bool, v_dec = None, None, None, None
-        
         try:
-            if d_type == 'boolean':
-                if isinstance(val, bool): v_bool = val
-                elif isinstance(val, str): v_bool = val.lower() in ['true', '1', 'oui', 'yes']
-                else: v_bool = bool(val)
-            elif d_type == 'integer':
-                if isinstance(val, int): v_int = val
-                elif isinstance(val, str):
-                    match = re.search(r'\d+', val)
-                    v_int = int(match.group()) if match else None
-                else: v_int = int(val)
-            elif d_type == 'decimal':
-                v_dec = float(val)
-            else:
-                v_str = str(val)[:255] if val is not None else None
+            values = _coerce_eav_value(found_attr.data_type, val)
         except Exception:
             continue
-            
-        if v_str is None and v_int is None and v_bool is None and v_dec is None:
+
+        if all(v is None for v in values):
             continue
-            
-        # --- UPSERT LOGIC ---
-        existing_pv = PropertyValue.query.filter_by(property_id=property_id, attribute_id=attr_id).first()
-        
+
+        target_values[attr_id] = values
+
+    if not target_values and not attrs_to_delete:
+        return
+
+    # --- DIFF EN MÉMOIRE (1 seule requête de lecture) ---
+    existing = {
+        pv.attribute_id: pv
+        for pv in PropertyValue.query.filter_by(property_id=property_id).all()
+    }
+
+    new_rows = []
+    for attr_id, values in target_values.items():
+        existing_pv = existing.get(attr_id)
         if existing_pv:
-            existing_pv.value_string = v_str
-            existing_pv.value_integer = v_int
-            existing_pv.value_boolean = v_bool
-            existing_pv.value_decimal = v_dec
+            if not _same_eav_value(existing_pv, values):
+                existing_pv.value_string, existing_pv.value_integer, existing_pv.value_boolean, existing_pv.value_decimal = values
         else:
-            new_pv = PropertyValue(
-                property_id=property_id,
-                attribute_id=attr_id,
-                value_string=v_str,
-                value_integer=v_int,
-                value_boolean=v_bool,
-                value_decimal=v_dec
-            )
-            db.session.add(new_pv)
-    
-    db.session.flush() # Appliquer dans la transaction courante sans commiter (ça sera commité par la Route parent)
+            v_str, v_int, v_bool, v_dec = values
+            new_rows.append({
+                'property_id': property_id,
+                'attribute_id': attr_id,
+                'value_string': v_str,
+                'value_integer': v_int,
+                'value_boolean': v_bool,
+                'value_decimal': v_dec
+            })
+
+    for attr_id in attrs_to_delete:
+        if attr_id in existing:
+            db.session.delete(existing[attr_id])
+
+    db.session.flush()  # UPDATE / DELETE des seules valeurs modifiées
+
+    if new_rows:
+        # INSERT multi-lignes en un seul aller-retour
+        db.session.execute(PropertyValue.__table__.insert(), new_rows)
+        # La collection Property.property_values éventuellement chargée n'est plus à jour
+        prop = db.session.identity_map.get(identity_key(Property, property_id))
+        if prop is not None:
+            db.session.expire(prop, ['property_values'])
+
+    # Appliqué dans la transaction courante sans commiter (ça sera commité par la Route parent)
@@ -0,0 +1,151 @@
+from datetime import datetime, timedelta
+from email.utils import formataddr
+from flask import current_app
+from flask_mail import Message
+from sqlalchemy import or_, and_
+from app import db, mail
+from app.models import EmailOutbox
+
+# Emails envoyés par lot de worker
+OUTBOX_BATCH_SIZE = 50
+
+# Backoff exponentiel entre deux tentatives : RETRY_BASE_DELAY * 2^(tentative - 1), plafonné
+RETRY_BASE_DELAY = 60
+RETRY_MAX_DELAY = 3600
+# Un email 'sending' verrouillé depuis plus longtemps est considéré comme abandonné (worker tué) et repris
+LOCK_TIMEOUT = 600
+
+
+def queue_email(msg, max_attempts=5):
+    """
+    Enregistre un flask_mail.Message dans l'outbox. N'effectue pas de commit : l'email part avec la
+    transaction de la modification métier qui le déclenche (rien n'est envoyé si elle est annulée).
+    """
+    sender = msg.sender or current_app.config['MAIL_DEFAULT_SENDER']
+    if isinstance(sender, (tuple, list)):
+        sender = formataddr(tuple(sender))
+
+    email = EmailOutbox(
+        subject=msg.subject,
+        sender=sender,
+        recipients=list(msg.recipients),
+        html=msg.html,
+        body=msg.body,
+        status='pending',
+        attempts=0,
+        max_attempts=max_attempts,
+        next_attempt_at=datetime.utcnow()
+    )
+    db.session.add(email)
+    return email
+
+
+def build_message(email):
+    """Reconstruit le flask_mail.Message d'une ligne EmailOutbox."""
+    return Message(
+        email.subject,
+        sender=email.sender,
+        recipients=list(email.recipients or []),
+        html=email.html,
+        body=email.body
+    )
+
+
+def claim_email_batch(worker_name, batch_size=OUTBOX_BATCH_SIZE):
+    """
+    Verrouille et retourne le prochain lot d'emails à envoyer (liste vide si l'outbox est vide).
+    SELECT ... FOR UPDATE SKIP LOCKED : plusieurs workers peuvent tourner en parallèle.
+    """
+    now = datetime.utcnow()
+    stale_before = now - timedelta(seconds=LOCK_TIMEOUT)
+
+    emails = EmailOutbox.query.filter(
+        or_(
+            and_(EmailOutbox.status == 'pending', EmailOutbox.next_attempt_at <= now),
+            and_(EmailOutbox.status == 'sending', EmailOutbox.locked_at < stale_before)
+        )
+    ).order_by(EmailOutbox.next_attempt_at, EmailOutbox.id).limit(batch_size).with_for_update(skip_locked=True).all()
+
+    claimed = []
+    for email in emails:
+        if email.status == 'sending' and email.attempts >= email.max_attempts:
+            # Worker mort pendant la dernière tentative autorisée
+            email.status = 'dead'
+            email.last_error = (email.last_error or '') + f"\nVerrou expiré ({email.locked_by}) après {email.attempts} tentative(s)."
+            email.locked_at = None
+            email.locked_by = None
+            continue
+        email.status = 'sending'
+        email.locked_at = now
+        email.locked_by = worker_name
+        email.attempts += 1
+        claimed.append(email)
+    db.session.commit()
+    return claimed
+
+
+def mark_email_sent(email):
+    email.status = 'sent'
+    email.sent_at = datetime.utcnow()
+    email.locked_at = None
+    email.locked_by = None
+    email.last_error = None
+
+
+def mark_email_failed(email, error):
+    """Replanifie l'email (backoff) ou le passe en dead-letter après max_attempts."""
+    email.last_error = str(error)[-4000:]
+    email.locked_at = None
+    email.locked_by = None
+    if email.attempts >= email.max_attempts:
+        email.status = 'dead'
+        current_app.logger.error(f"❌ Email #{email.id} ({email.recipients}) abandonné après {email.attempts} tentative(s): {error}")
+    else:
+        delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (email.attempts - 1))
+        email.status = 'pending'
+        email.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        current_app.logger.warning(f"⚠️ Email #{email.id} en échec (tentative {email.attempts}), nouvel essai dans {delay}s: {error}")
+
+
+def deliver_emails(emails, pool=None):
+    """
+    Envoie un lot d'emails verrouillés et enregistre le résultat de chacun. Retourne le nombre d'emails envoyés.
+    pool : SMTPConnectionPool (connexions réutilisées) ; sans pool, une session SMTP par message (mail.send).
+    """
+    if pool is not None:
+        errors = pool.send_messages([build_message(email) for email in emails])
+    else:
+        errors = []
+        for email in emails:
+            try:
+                mail.send(build_message(email))
+                errors.append(None)
+            except Exception as e:
+                errors.append(e)
+
+    sent = 0
+    for email, error in zip(emails, errors):
+        if error is not None:
+            mark_email_failed(email, error)
+            continue
+        mark_email_sent(email)
+        sent += 1
+    db.session.commit()
+    return sent
+
+
+def process_email_batch(worker_name, batch_size=OUTBOX_BATCH_SIZE, pool=None):
+    """Envoie au plus un lot. Retourne (nb d'emails traités, nb d'emails envoyés)."""
+    emails = claim_email_batch(worker_name, batch_size)
+    if not emails:
+        return 0, 0
+    return len(emails), deliver_emails(emails, pool=pool)
+
+
+def requeue_dead_emails():
+    """Remet en file les emails en dead-letter (après correction de la configuration SMTP, par exemple). N'effectue pas de commit."""
+    return EmailOutbox.query.filter(EmailOutbox.status == 'dead').update({
+        EmailOutbox.status: 'pending',
+        EmailOutbox.attempts: 0,
+        EmailOutbox.next_attempt_at: datetime.utcnow()
+    }, synchronize_session=False)
@@ -0,0 +1,107 @@
+"""
+Registre des templates d'emails (Jinja2, app/templates/emails/).
+Chaque template est compilé une seule fois par processus, avec autoescape : les titres de biens, messages
+et motifs saisis par les utilisateurs ne sont plus interpolés bruts dans le HTML.
+La version texte (alternative text/plain) est dérivée une seule fois du bloc `content` de chaque template.
+"""
+import os
+import re
+import html
+import threading
+from datetime import datetime
+from jinja2 import Environment, FileSystemLoader, select_autoescape, StrictUndefined
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates')
+
+TEXT_FOOTER = (
+    "\n\n--\n"
+    "© {{ year }} WOORA BUILDING. Tous droits réservés.\n"
+    "Ceci est un message automatique, merci de ne pas y répondre directement.\n"
+    "Une question ? Contactez-nous à contact@woorabuilding.com"
+)
+
+_BLOCK_TITLE = re.compile(r'{%\s*block\s+title\s*%}(.*?){%\s*endblock\s*%}', re.S)
+_BLOCK_CONTENT = re.compile(r'{%\s*block\s+content\s*%}(.*){%\s*endblock\s*%}', re.S)
+_LINK = re.compile(r'<a\s[^>]*href="([^"]*)"[^>]*>(.*?)</a>', re.S | re.I)
+_LINE_BREAK = re.compile(r'<br\s*/?>', re.I)
+_BLOCK_END = re.compile(r'</(p|h[1-6]|div|blockquote|ul|ol)>', re.I)
+_LIST_ITEM = re.compile(r'<li[^>]*>', re.I)
+_TAG = re.compile(r'<[^>]+>')
+_BLANK_LINES = re.compile(r'\n{3,}')
+
+
+def html_to_text_source(source):
+    """Source Jinja HTML -> source Jinja texte (les balises Jinja sont conservées, le HTML est retiré)."""
+    text = _LINK.sub(lambda m: f"{m.group(2)} : {m.group(1)}", source)
+    text = _LINE_BREAK.sub('\n', text)
+    text = _LIST_ITEM.sub('- ', text)
+    text = re.sub(r'</li>\s*', '\n', text, flags=re.I)
+    text = _BLOCK_END.sub('\n\n', text)
+    text = html.unescape(_TAG.sub('', text))
+    lines = [line.strip() for line in text.splitlines()]
+    return _BLANK_LINES.sub('\n\n', '\n'.join(lines)).strip()
+
+
+class EmailTemplate:
+    def __init__(self, name, title, html_template, text_template):
+        self.name = name
+        self.title = title
+        self.html_template = html_template
+        self.text_template = text_template
+
+    def render(self, **context):
+        """Retourne (html, texte)."""
+        context.setdefault('year', datetime.utcnow().year)
+        # Les blocs {% if %} retirés laissent des lignes vides en trop dans la version texte
+        return self.html_template.render(**context), _BLANK_LINES.sub('\n\n', self.text_template.render(**context))
+
+
+class EmailTemplateRegistry:
+    def __init__(self, templates_dir=TEMPLATES_DIR):
+        loader = FileSystemLoader(templates_dir)
+        self.html_env = Environment(
+            loader=loader, autoescape=select_autoescape(['html']), undefined=StrictUndefined
+        )
+        self.text_env = Environment(autoescape=False, undefined=StrictUndefined, keep_trailing_newline=False)
+        self.templates = {}
+
+        emails_dir = os.path.join(templates_dir, 'emails')
+        for filename in sorted(os.listdir(emails_dir)):
+            name, extension = os.path.splitext(filename)
+            if extension != '.html' or name == 'layout':
+                continue
+            source = loader.get_source(self.html_env, f'emails/{filename}')[0]
+            title_match = _BLOCK_TITLE.search(source)
+            content_match = _BLOCK_CONTENT.search(source)
+            text_source = html_to_text_source(content_match.group(1) if content_match else source) + TEXT_FOOTER
+            self.templates[name] = EmailTemplate(
+                name,
+                title=title_match.group(1).strip() if title_match else '',
+                html_template=self.html_env.get_template(f'emails/{filename}'),
+                text_template=self.text_env.from_string(text_source)
+            )
+
+    def get(self, name):
+        try:
+            return self.templates[name]
+        except KeyError:
+            raise LookupError(f"Template d'email inconnu : '{name}'")
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_email_template_registry():
+    """Registre chargé et compilé une seule fois par processus."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = EmailTemplateRegistry()
+    return _registry
+
+
+def render_email(name, **context):
+    """Rend le template `name` : retourne (html, texte)."""
+    return get_email_template_registry().get(name).render(**context)
@@ -0,0 +1,109 @@
+import math
+
+EARTH_RADIUS_KM = 6371
+KM_PER_DEGREE_LAT = 111.32
+
+GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Précision stockée en base (cellule d'environ 5m x 5m)
+GEOHASH_PRECISION = 9
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Encode une coordonnée GPS en geohash (base32)."""
+    if latitude is None or longitude is None:
+        return None
+
+    lat, lng = float(latitude), float(longitude)
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    geohash = []
+    bits, bit_count, even = 0, 0, True
+
+    while len(geohash) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if lng >= mid:
+                bits = (bits << 1) | 1
+                lng_range[0] = mid
+            else:
+                bits = bits << 1
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if lat >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits = bits << 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(GEOHASH_BASE32[bits])
+            bits, bit_count = 0, 0
+
+    return ''.join(geohash)
+
+
+def geohash_cell_size(precision):
+    """Taille (en degrés) d'une cellule geohash : (hauteur latitude, largeur longitude)."""
+    total_bits = 5 * precision
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """Rectangle (min_lat, max_lat, min_lng, max_lng) contenant le cercle de rayon radius_km."""
+    lat, lng = float(latitude), float(longitude)
+    delta_lat = radius_km / KM_PER_DEGREE_LAT
+    cos_lat = math.cos(math.radians(lat))
+    # Près des pôles, le cercle couvre toutes les longitudes
+    delta_lng = 180.0 if cos_lat < 1e-6 else min(180.0, radius_km / (KM_PER_DEGREE_LAT * cos_lat))
+    return (
+        max(-90.0, lat - delta_lat), min(90.0, lat + delta_lat),
+        max(-180.0, lng - delta_lng), min(180.0, lng + delta_lng)
+    )
+
+
+def geohash_prefixes_for_bbox(min_lat, max_lat, min_lng, max_lng, max_cells=16):
+    """
+    Préfixes geohash couvrant le rectangle : on prend la précision la plus fine dont une cellule
+    est au moins aussi grande que le rectangle (donc 4 cellules maximum), puis on échantillonne.
+    Retourne [] si le rectangle est trop grand pour qu'un préfixe soit utile.
+    """
+    height, width = max_lat - min_lat, max_lng - min_lng
+    precision = 0
+    for p in range(1, GEOHASH_PRECISION + 1):
+        cell_height, cell_width = geohash_cell_size(p)
+        if cell_height >= height and cell_width >= width:
+            precision = p
+        else:
+            break
+    if precision == 0:
+        return []
+
+    cell_height, cell_width = geohash_cell_size(precision)
+    step_lat, step_lng = cell_height / 2, cell_width / 2
+    prefixes = set()
+    lat = min_lat
+    while True:
+        lng = min_lng
+        while True:
+            prefixes.add(encode_geohash(lat, lng, precision))
+            if lng >= max_lng:
+                break
+            lng = min(max_lng, lng + step_lng)
+        if lat >= max_lat:
+            break
+        lat = min(max_lat, lat + step_lat)
+
+    return sorted(prefixes) if len(prefixes) <= max_cells else []
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Distance orthodromique exacte en kilomètres."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (float(lat1), float(lng1), float(lat2), float(lng2)))
+    dlat = lat2 - lat1
+    dlng = lng2 - lng1
+    a = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
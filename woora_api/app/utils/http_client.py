@@ -0,0 +1,200 @@
+"""
+Client HTTP sortant partagé (FedaPay, Nominatim).
+- Une requests.Session par hôte, avec son pool de connexions keep-alive : pas de résolution DNS ni de
+  handshake TLS à chaque vérification de paiement ou géocodage.
+- Timeouts par défaut (HTTP_CONNECT_TIMEOUT / HTTP_READ_TIMEOUT) pour tout appel qui n'en précise pas.
+- Nouvelles tentatives bornées avec backoff exponentiel et jitter :
+  méthodes idempotentes (GET, HEAD, OPTIONS) sur erreur réseau, timeout ou 429/502/503/504 ;
+  autres méthodes (création de paiement, de virement...) uniquement si la connexion n'a pas pu être établie,
+  la requête n'ayant alors jamais été envoyée.
+- Latences par hôte (nombre d'appels, erreurs, moyenne, p50 / p95 / max sur les derniers appels).
+Les exceptions levées sont celles de requests : les `except requests.exceptions...` existants restent valables.
+"""
+import random
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from flask import current_app, has_app_context
+
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+RETRY_STATUS_CODES = frozenset([429, 502, 503, 504])
+# Latences conservées par hôte pour les percentiles
+LATENCY_SAMPLES = 500
+
+DEFAULTS = {
+    'HTTP_CONNECT_TIMEOUT': 5,
+    'HTTP_READ_TIMEOUT': 30,
+    'HTTP_MAX_RETRIES': 2,
+    'HTTP_RETRY_BACKOFF': 0.5,
+    'HTTP_RETRY_MAX_BACKOFF': 4.0,
+    'HTTP_POOL_MAXSIZE': 10,
+    'HTTP_SLOW_REQUEST_THRESHOLD': 2.0,
+}
+
+
+def _request_not_sent(error):
+    """Connexion impossible (timeout de connexion, refus, DNS) : la requête n'est jamais partie."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(error, requests.exceptions.ConnectionError) and isinstance(reason, NewConnectionError)
+
+
+def _config(name):
+    if has_app_context():
+        return current_app.config.get(name, DEFAULTS[name])
+    return DEFAULTS[name]
+
+
+class HostMetrics:
+    __slots__ = ('requests', 'errors', 'retries', 'total_time', 'max_time', 'samples', 'lock')
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.samples = deque(maxlen=LATENCY_SAMPLES)
+        self.lock = threading.Lock()
+
+    def record(self, elapsed, error=False):
+        with self.lock:
+            self.requests += 1
+            self.errors += int(error)
+            self.total_time += elapsed
+            self.max_time = max(self.max_time, elapsed)
+            self.samples.append(elapsed)
+
+    def snapshot(self):
+        with self.lock:
+            samples = sorted(self.samples)
+            requests_count, errors, retries = self.requests, self.errors, self.retries
+            total_time, max_time = self.total_time, self.max_time
+
+        def percentile(p):
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 1) if samples else None
+
+        return {
+            'requests': requests_count,
+            'errors': errors,
+            'retries': retries,
+            'avg_ms': round(total_time / requests_count * 1000, 1) if requests_count else None,
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'max_ms': round(max_time * 1000, 1),
+        }
+
+
+class HttpClient:
+    def __init__(self):
+        self._sessions = {}
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _host(self, url):
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def _session(self, host):
+        session = self._sessions.get(host)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(host)
+                if session is None:
+                    session = requests.Session()
+                    pool_size = _config('HTTP_POOL_MAXSIZE')
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+                    session.mount(host, adapter)
+                    self._sessions[host] = session
+                    self._metrics[host] = HostMetrics()
+        return session
+
+    def _backoff(self, attempt):
+        """Backoff exponentiel avec jitter complet : aléatoire entre 0 et base * 2^attempt (plafonné)."""
+        ceiling = min(_config('HTTP_RETRY_MAX_BACKOFF'), _config('HTTP_RETRY_BACKOFF') * 2 ** attempt)
+        return random.uniform(0, ceiling)
+
+    def request(self, method, url, max_retries=None, **kwargs):
+        method = method.upper()
+        host = self._host(url)
+        session = self._session(host)
+        metrics = self._metrics[host]
+        kwargs.setdefault('timeout', (_config('HTTP_CONNECT_TIMEOUT'), _config('HTTP_READ_TIMEOUT')))
+        max_retries = _config('HTTP_MAX_RETRIES') if max_retries is None else max_retries
+        idempotent = method in IDEMPOTENT_METHODS
+
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = session.request(method, url, **kwargs)
+            except requests.exceptions.RequestException as e:
+                metrics.record(time.perf_counter() - started, error=True)
+                retryable = _request_not_sent(e) or (
+                    idempotent and isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+                )
+                if not retryable or attempt >= max_retries:
+                    raise
+                self._log_retry(method, url, attempt, e)
+            else:
+                elapsed = time.perf_counter() - started
+                metrics.record(elapsed, error=response.status_code >= 500)
+                if elapsed >= _config('HTTP_SLOW_REQUEST_THRESHOLD') and has_app_context():
+                    current_app.logger.warning(f"🐢 Appel HTTP lent : {method} {host} en {elapsed:.2f}s")
+                if not (idempotent and response.status_code in RETRY_STATUS_CODES) or attempt >= max_retries:
+                    return response
+                self._log_retry(method, url, attempt, f"HTTP {response.status_code}")
+                response.close()
+
+            with metrics.lock:
+                metrics.retries += 1
+            time.sleep(self._backoff(attempt))
+            attempt += 1
+
+    def _log_retry(self, method, url, attempt, error):
+        if has_app_context():
+            current_app.logger.warning(f"⚠️ {method} {urlsplit(url).netloc}{urlsplit(url).path} : nouvel essai ({attempt + 1}) après {error}")
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def metrics(self):
+        """Latences par hôte depuis le démarrage du processus."""
+        return {host: metrics.snapshot() for host, metrics in list(self._metrics.items())}
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_client = HttpClient()
+
+
+def get_http_client():
+    """Client du processus (sessions et métriques partagées par tous les threads)."""
+    return _client
+
+
+def get(url, **kwargs):
+    return _client.get(url, **kwargs)
+
+
+def post(url, **kwargs):
+    return _client.post(url, **kwargs)
+
+
+def put(url, **kwargs):
+    return _client.put(url, **kwargs)
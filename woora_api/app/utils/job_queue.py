@@ -0,0 +1,156 @@
+import os
+import socket
+import traceback
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import or_, and_
+from app import db
+from app.models import BackgroundJob
+
+# Types de jobs
+JOB_MATCH_PROPERTY = 'match_property'
+JOB_MATCH_REQUEST = 'match_request'
+JOB_REMATCH_PROPERTY = 'rematch_property'
+
+# Backoff exponentiel entre deux tentatives : RETRY_BASE_DELAY * 2^(tentative - 1), plafonné
+RETRY_BASE_DELAY = 30
+RETRY_MAX_DELAY = 3600
+# Un job 'running' verrouillé depuis plus longtemps est considéré comme abandonné (worker tué) et repris
+LOCK_TIMEOUT = 900
+
+_handlers = {}
+
+
+def job_handler(job_type):
+    """Décorateur : enregistre la fonction exécutée par le worker pour un type de job. Elle reçoit le payload."""
+    def decorator(func):
+        _handlers[job_type] = func
+        return func
+    return decorator
+
+
+def enqueue_job(job_type, payload=None, delay_seconds=0, max_attempts=5):
+    """
+    Ajoute un job à la file. N'effectue pas de commit : le job est enregistré dans la même transaction
+    que la modification métier qui le déclenche (pas de job orphelin, pas de job perdu).
+    """
+    job = BackgroundJob(
+        job_type=job_type,
+        payload=payload or {},
+        status='pending',
+        attempts=0,
+        max_attempts=max_attempts,
+        run_after=datetime.utcnow() + timedelta(seconds=delay_seconds)
+    )
+    db.session.add(job)
+    return job
+
+
+def default_worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_next_job(worker_name):
+    """
+    Verrouille et retourne le prochain job exécutable (ou None).
+    SELECT ... FOR UPDATE SKIP LOCKED : plusieurs workers peuvent tourner en parallèle sans se marcher dessus.
+    """
+    now = datetime.utcnow()
+    stale_before = now - timedelta(seconds=LOCK_TIMEOUT)
+
+    while True:
+        job = BackgroundJob.query.filter(
+            or_(
+                and_(BackgroundJob.status == 'pending', BackgroundJob.run_after <= now),
+                and_(BackgroundJob.status == 'running', BackgroundJob.locked_at < stale_before)
+            )
+        ).order_by(BackgroundJob.run_after, BackgroundJob.id).with_for_update(skip_locked=True).first()
+
+        if job is None:
+            db.session.commit()  # Libère la transaction de lecture
+            return None
+
+        if job.status == 'running' and job.attempts >= job.max_attempts:
+            # Worker mort pendant la dernière tentative autorisée
+            job.status = 'failed'
+            job.last_error = (job.last_error or '') + f"\nVerrou expiré ({job.locked_by}) après {job.attempts} tentative(s)."
+            job.locked_at = None
+            job.locked_by = None
+            db.session.commit()
+            continue
+
+        job.status = 'running'
+        job.locked_at = now
+        job.locked_by = worker_name
+        job.attempts += 1
+        db.session.commit()
+        return job
+
+
+def run_job(job):
+    """Exécute un job verrouillé, puis le marque 'done', le replanifie (backoff) ou le marque 'failed'."""
+    job_id = job.id
+    handler = _handlers.get(job.job_type)
+
+    try:
+        if handler is None:
+            raise LookupError(f"Aucun handler pour le type de job '{job.job_type}'.")
+        handler(job.payload or {})
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(BackgroundJob, job_id)
+        job.last_error = traceback.format_exc()[-4000:]
+        job.locked_at = None
+        job.locked_by = None
+
+        if handler is None or job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            current_app.logger.error(f"❌ Job #{job_id} ({job.job_type}) abandonné après {job.attempts} tentative(s): {e}")
+        else:
+            delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (job.attempts - 1))
+            job.status = 'pending'
+            job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+            current_app.logger.warning(f"⚠️ Job #{job_id} ({job.job_type}) en échec (tentative {job.attempts}), nouvel essai dans {delay}s: {e}")
+        db.session.commit()
+        return False
+
+    job = db.session.get(BackgroundJob, job_id)
+    job.status = 'done'
+    job.completed_at = datetime.utcnow()
+    job.locked_at = None
+    job.locked_by = None
+    job.last_error = None
+    db.session.commit()
+    current_app.logger.info(f"✅ Job #{job_id} ({job.job_type}) terminé.")
+    return True
+
+
+def process_next_job(worker_name=None):
+    """Exécute au plus un job. Retourne False si la file est vide."""
+    job = claim_next_job(worker_name or default_worker_name())
+    if job is None:
+        return False
+    run_job(job)
+    return True
+
+
+# ===================================================================
+# HANDLERS
+# ===================================================================
+
+@job_handler(JOB_MATCH_PROPERTY)
+def _run_match_property(payload):
+    from app.utils.matching_utils import find_matches_for_property
+    find_matches_for_property(payload['property_id'])
+
+
+@job_handler(JOB_MATCH_REQUEST)
+def _run_match_request(payload):
+    from app.utils.matching_utils import find_matches_for_request
+    find_matches_for_request(payload['request_id'])
+
+
+@job_handler(JOB_REMATCH_PROPERTY)
+def _run_rematch_property(payload):
+    from app.utils.matching_utils import rematch_property_after_update
+    rematch_property_after_update(payload['property_id'], payload.get('fields', []), payload.get('attribute_keys', []))
@@ -0,0 +1,226 @@
+"""
+Grand livre des portefeuilles, en partie double.
+- Chaque mouvement (commission créditée, virement, ...) est un ensemble d'écritures LedgerEntries de somme
+  nulle, identifié par une clé unique (transaction_key) : l'enregistrer deux fois est sans effet.
+- Les écritures sont en ajout seul. Le solde dénormalisé Users.wallet_balance est mis à jour dans la même
+  transaction par un UPDATE atomique (wallet_balance = wallet_balance + :delta) : ni SELECT ... FOR UPDATE,
+  ni arithmétique en Python. Un débit n'est appliqué que si le solde le couvre (condition dans le WHERE).
+- Les comptes de la plateforme (commissions, virements FedaPay) n'ont pas de solde dénormalisé : aucune
+  ligne chaude partagée par tous les agents.
+- LedgerBalanceSnapshots fige périodiquement le solde et les cumuls de chaque compte, recalculés sur les
+  écritures validées (scripts/snapshot_ledger_balances.py) : une lecture = snapshot + écritures postérieures,
+  sans parcours de l'historique. La détection des écritures validées en retard reste dans le passage de snapshot.
+"""
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import func, case, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.util import identity_key
+from app import db
+from app.models import LedgerEntry, LedgerBalanceSnapshot, User
+
+PLATFORM_COMMISSIONS_ACCOUNT = 'platform:commissions'  # Contrepartie des commissions créditées aux agents
+FEDAPAY_PAYOUTS_ACCOUNT = 'fedapay:payouts'  # Fonds virés aux agents via FedaPay
+OPENING_BALANCES_ACCOUNT = 'platform:opening'  # Soldes antérieurs au grand livre (reprise)
+
+_CENT = Decimal('0.01')
+
+
+class InsufficientFunds(Exception):
+    """Le solde du portefeuille ne couvre pas le débit demandé."""
+
+
+def wallet_account(user_id):
+    return f'wallet:{user_id}'
+
+
+def _amount(value):
+    return Decimal(str(value or 0)).quantize(_CENT)
+
+
+# ===================================================================
+# ÉCRITURE
+# ===================================================================
+
+def _apply_wallet_delta(user_id, delta, require_funds):
+    users = User.__table__
+    balance = func.coalesce(users.c.wallet_balance, 0)
+    statement = update(users).where(users.c.id == user_id).values(wallet_balance=balance + delta)
+    guarded = require_funds and delta < 0
+    if guarded:
+        statement = statement.where(balance + delta >= 0)
+
+    if db.session.execute(statement).rowcount == 0:
+        if guarded:
+            raise InsufficientFunds(f"Solde insuffisant pour débiter {-delta} du portefeuille {user_id}")
+        raise LookupError(f"Utilisateur {user_id} introuvable")
+
+    # L'utilisateur déjà chargé dans la session relira son solde
+    cached = db.session.identity_map.get(identity_key(User, user_id))
+    if cached is not None:
+        db.session.expire(cached, ['wallet_balance'])
+
+
+def post_transaction(transaction_key, entry_type, legs, description=None, require_funds=False, apply_balances=True):
+    """
+    Enregistre un mouvement. legs : [(compte, montant signé, user_id ou None)], de somme nulle ; les jambes
+    portant un user_id mettent à jour Users.wallet_balance (sauf apply_balances=False, pour une reprise).
+    require_funds : un débit qui rendrait un solde négatif lève InsufficientFunds et rien n'est écrit.
+    Retourne False si le mouvement était déjà enregistré. N'effectue pas de commit.
+    """
+    rows = [
+        {
+            'transaction_key': transaction_key, 'account': account, 'user_id': user_id,
+            'amount': _amount(amount), 'entry_type': entry_type, 'description': description,
+            'created_at': datetime.utcnow(),
+        }
+        for account, amount, user_id in legs
+    ]
+    if sum(row['amount'] for row in rows) != 0:
+        raise ValueError(f"Mouvement {transaction_key} déséquilibré")
+
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(LedgerEntry.__table__), rows)
+            if apply_balances:
+                for row in rows:
+                    if row['user_id'] is not None and row['amount']:
+                        _apply_wallet_delta(row['user_id'], row['amount'], require_funds)
+    except IntegrityError:
+        if not is_posted(transaction_key):
+            raise
+        return False
+    return True
+
+
+def is_posted(transaction_key):
+    return db.session.query(LedgerEntry.id).filter_by(transaction_key=transaction_key).first() is not None
+
+
+def credit_commission(commission, description=None, apply_balances=True):
+    """Crédite le portefeuille de l'agent d'une commission (contrepartie : compte des commissions de la plateforme)."""
+    amount = _amount(commission.amount)
+    return post_transaction(f'commission:{commission.id}', 'commission', [
+        (wallet_account(commission.agent_id), amount, commission.agent_id),
+        (PLATFORM_COMMISSIONS_ACCOUNT, -amount, None),
+    ], description=description, apply_balances=apply_balances)
+
+
+def _payout_legs(payout_request, sign=1):
+    amount = _amount(payout_request.requested_amount) * sign
+    return [
+        (wallet_account(payout_request.agent_id), -amount, payout_request.agent_id),
+        (FEDAPAY_PAYOUTS_ACCOUNT, amount, None),
+    ]
+
+
+def reserve_payout(payout_request):
+    """
+    Débite le portefeuille du montant demandé dès la demande de virement (payout_request doit avoir un id).
+    Lève InsufficientFunds si le solde ne le couvre pas : deux demandes simultanées ne peuvent pas le dépasser.
+    """
+    return post_transaction(f'payout:{payout_request.id}', 'payout', _payout_legs(payout_request),
+                            description=f'Virement FedaPay (Payout #{payout_request.id})', require_funds=True)
+
+
+def settle_payout(payout_request, apply_balances=True):
+    """
+    Virement confirmé par FedaPay. Le montant a déjà été débité à la demande (reserve_payout) ; seules les
+    demandes antérieures au grand livre sont débitées ici, sans condition de solde : l'argent est parti.
+    """
+    return post_transaction(f'payout:{payout_request.id}', 'payout', _payout_legs(payout_request),
+                            description=f'Virement FedaPay (Payout #{payout_request.id})', apply_balances=apply_balances)
+
+
+def release_payout(payout_request):
+    """Virement échoué : recrédite le montant réservé (sans effet si rien n'avait été réservé)."""
+    if not is_posted(f'payout:{payout_request.id}'):
+        return False
+    return post_transaction(f'payout_release:{payout_request.id}', 'payout_release', _payout_legs(payout_request, sign=-1),
+                            description=f'Annulation du virement FedaPay (Payout #{payout_request.id})')
+
+
+# ===================================================================
+# LECTURE ET SNAPSHOTS
+# ===================================================================
+
+def _totals_columns():
+    """Solde, cumul des commissions (et reprise), cumul net des virements (annulations déduites)."""
+    earned = case((LedgerEntry.entry_type.in_(['commission', 'opening']), LedgerEntry.amount), else_=0)
+    withdrawn = case((LedgerEntry.entry_type.in_(['payout', 'payout_release']), -LedgerEntry.amount), else_=0)
+    return (
+        func.coalesce(func.sum(LedgerEntry.amount), 0),
+        func.coalesce(func.sum(earned), 0),
+        func.coalesce(func.sum(withdrawn), 0),
+    )
+
+
+def account_summary(account):
+    """
+    Solde et cumuls (vus du portefeuille : commissions gagnées, montants virés) d'un compte :
+    snapshot + écritures postérieures (index (account, id)).
+    """
+    snapshot = db.session.get(LedgerBalanceSnapshot, account)
+    last_entry_id = snapshot.last_entry_id if snapshot else 0
+    balance, earned, withdrawn = db.session.query(*_totals_columns()).filter(
+        LedgerEntry.account == account, LedgerEntry.id > last_entry_id
+    ).one()
+    if snapshot is not None:
+        balance, earned, withdrawn = (
+            _amount(balance) + snapshot.balance, _amount(earned) + snapshot.total_earned, _amount(withdrawn) + snapshot.total_withdrawn
+        )
+    return {'balance': _amount(balance), 'total_earned': _amount(earned), 'total_withdrawn': _amount(withdrawn)}
+
+
+def wallet_summary(user_id):
+    return account_summary(wallet_account(user_id))
+
+
+def refresh_balance_snapshots(batch_size=500):
+    """
+    Met à jour les snapshots des comptes dont le nombre d'écritures ou le plus grand id a changé
+    (une requête COUNT/MAX groupée, sur l'index (account, id)), en recalculant leurs totaux sur les
+    écritures validées. Une écriture validée en retard avec un id inférieur à last_entry_id change le
+    nombre d'écritures : son compte est recalculé au passage suivant.
+    Retourne le nombre de comptes mis à jour. N'effectue pas de commit.
+    """
+    counts = db.session.query(
+        LedgerEntry.account, func.count(LedgerEntry.id), func.max(LedgerEntry.id)
+    ).group_by(LedgerEntry.account).all()
+    snapshots = {snapshot.account: snapshot for snapshot in LedgerBalanceSnapshot.query.all()}
+    changed = [
+        account for account, entry_count, last_entry_id in counts
+        if account not in snapshots
+        or (snapshots[account].entry_count, snapshots[account].last_entry_id) != (entry_count, last_entry_id)
+    ]
+
+    now = datetime.utcnow()
+    for start in range(0, len(changed), batch_size):
+        rows = db.session.query(
+            LedgerEntry.account, func.max(LedgerEntry.user_id), *_totals_columns(),
+            func.count(LedgerEntry.id), func.max(LedgerEntry.id)
+        ).filter(LedgerEntry.account.in_(changed[start:start + batch_size])).group_by(LedgerEntry.account).all()
+        for account, user_id, balance, earned, withdrawn, entry_count, last_entry_id in rows:
+            snapshot = snapshots.get(account)
+            if snapshot is None:
+                snapshot = LedgerBalanceSnapshot(account=account, user_id=user_id)
+                db.session.add(snapshot)
+            snapshot.balance = _amount(balance)
+            snapshot.total_earned = _amount(earned)
+            snapshot.total_withdrawn = _amount(withdrawn)
+            snapshot.entry_count = entry_count
+            snapshot.last_entry_id = last_entry_id
+            snapshot.updated_at = now
+    return len(changed)
+
+
+def find_wallet_drifts(limit=100):
+    """Portefeuilles dont Users.wallet_balance diffère du solde du grand livre : [(user_id, solde, solde du grand livre)]."""
+    drifts = []
+    for user_id, wallet_balance in db.session.query(User.id, User.wallet_balance).filter(User.role == 'agent').all():
+        ledger_balance = wallet_summary(user_id)['balance']
+        if _amount(wallet_balance) != ledger_balance:
+            drifts.append((user_id, _amount(wallet_balance), ledger_balance))
+            if len(drifts) >= limit:
+                break
+    return drifts
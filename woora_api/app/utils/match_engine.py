@@ -0,0 +1,399 @@
+"""
+Moteur de matching vectorisé (NumPy).
+Mêmes règles que matching_utils.calculate_match_score (critères obligatoires type / statut / ville / prix,
+puis règle des 80% sur les critères dynamiques), calculées par opérations sur tableaux :
+- PropertyColumns : les biens validés d'un type encodés en colonnes (prix en centimes, code statut,
+  code ville, une colonne texte + une colonne numérique par attribut) ; une alerte est scorée contre
+  tous les biens d'un coup (find_matches_for_request, re-matching complet).
+- AlertColumns : un lot d'alertes encodé en colonnes ; un bien est scoré contre toutes les alertes
+  d'un coup (find_matches_for_property).
+Les structures sont picklables (multiprocessing).
+"""
+from collections import namedtuple, defaultdict
+from decimal import Decimal
+import numpy as np
+from app import db
+from app.models import Property, PropertyValue, PropertyRequest, PropertyRequestCriteria
+from app.utils.attribute_resolver import get_attribute_resolver
+from app.utils.alert_index_utils import parse_request_criteria, Criterion
+
+# Score minimal (règle des 80%) pour enregistrer un match
+MATCH_THRESHOLD = 0.8
+
+# Alerte réduite à ses critères (picklable)
+AlertSpec = namedtuple('AlertSpec', [
+    'id', 'customer_id', 'property_type_id', 'preferred_status', 'city_key', 'min_price', 'max_price', 'criteria'
+])
+
+# Bien réduit à ce que lit le scoring (ville en minuscules, prix en centimes, attributs en minuscules)
+PropertySnapshot = namedtuple('PropertySnapshot', ['id', 'property_type_id', 'status', 'city', 'price_cents', 'attributes'])
+
+
+def to_cents(value):
+    """Montant -> centimes (entier exact). 0 si absent ou nul : un prix à 0 n'est ni un prix ni un critère."""
+    if not value:
+        return 0
+    return int((Decimal(str(value)) * 100).to_integral_value())
+
+
+def _numeric(value):
+    # bool est un int en Python : True vaut 1 dans la comparaison numérique (comme criterion_matches)
+    return float(value) if isinstance(value, (int, float)) else np.nan
+
+
+class PropertyColumns:
+    """Biens validés d'un type, encodés en tableaux NumPy."""
+
+    def __init__(self, property_type_id, ids, statuses, cities, prices, attributes):
+        count = len(ids)
+        self.property_type_id = property_type_id
+        self.ids = np.array(ids, dtype=np.int64)
+
+        self.status_codes = {}
+        self.status = np.array(
+            [self.status_codes.setdefault(s, len(self.status_codes)) if s is not None else -1 for s in statuses],
+            dtype=np.int32
+        ).reshape(count)
+
+        self.city_values = []  # Villes distinctes (minuscules)
+        city_codes = {}
+        codes = []
+        for city in cities:
+            if city:
+                if city not in city_codes:
+                    city_codes[city] = len(self.city_values)
+                    self.city_values.append(city)
+                codes.append(city_codes[city])
+            else:
+                codes.append(-1)
+        self.city = np.array(codes, dtype=np.int32).reshape(count)
+
+        self.price_cents = np.array([to_cents(p) for p in prices], dtype=np.int64).reshape(count)
+        self.has_price = self.price_cents != 0
+
+        # Par attribut : code du texte str(valeur).lower() (-1 si absent) et valeur numérique (NaN sinon)
+        self.text_codes = {}
+        self.attribute_text = {}
+        self.attribute_number = {}
+        for position, prop_attributes in enumerate(attributes):
+            for key, value in prop_attributes.items():
+                if key not in self.attribute_text:
+                    self.attribute_text[key] = np.full(count, -1, dtype=np.int32)
+                    self.attribute_number[key] = np.full(count, np.nan, dtype=np.float64)
+                text = str(value).lower()
+                self.attribute_text[key][position] = self.text_codes.setdefault(text, len(self.text_codes))
+                self.attribute_number[key][position] = _numeric(value)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def match_alert(self, alert, threshold=MATCH_THRESHOLD):
+        """Tableau des IDs des biens qui matchent l'alerte (critères obligatoires + règle des 80%)."""
+        count = len(self.ids)
+        if alert.property_type_id != self.property_type_id or count == 0:
+            return self.ids[:0]
+
+        mask = np.ones(count, dtype=bool)
+        mandatory_count = 0
+
+        if alert.preferred_status:
+            mandatory_count += 1
+            mask &= self.status == self.status_codes.get(alert.preferred_status, -2)
+
+        if alert.city_key:
+            mandatory_count += 1
+            codes = [code for code, city in enumerate(self.city_values) if alert.city_key in city]
+            mask &= np.isin(self.city, codes)
+
+        min_cents, max_cents = to_cents(alert.min_price), to_cents(alert.max_price)
+        if min_cents or max_cents:
+            mandatory_count += 1
+            mask &= self.has_price
+            if min_cents:
+                mask &= self.price_cents >= min_cents
+            if max_cents:
+                mask &= self.price_cents <= max_cents
+
+        total = mandatory_count + len(alert.criteria)
+        if total == 0 or not mask.any():
+            return self.ids[mask]
+
+        matched = np.full(count, mandatory_count, dtype=np.int64)
+        for criterion in alert.criteria:
+            text = self.attribute_text.get(criterion.attribute_key)
+            if text is None:
+                continue
+            hit = text == self.text_codes.get(criterion.value_text, -2)
+            if criterion.value_number is not None:
+                hit |= self.attribute_number[criterion.attribute_key] == criterion.value_number
+            matched += hit
+
+        return self.ids[mask & (matched / total >= threshold)]
+
+
+class AlertColumns:
+    """Lot d'alertes encodé en tableaux NumPy (critères dynamiques à plat : une entrée par critère)."""
+
+    def __init__(self, alerts):
+        self.alerts = list(alerts)
+        count = len(self.alerts)
+        self.property_type_id = np.array(
+            [a.property_type_id if a.property_type_id is not None else -1 for a in self.alerts], dtype=np.int64
+        ).reshape(count)
+        self.preferred_status = np.array([a.preferred_status or '' for a in self.alerts], dtype=object).reshape(count)
+
+        self.city_keys = []  # Clés ville distinctes
+        city_codes = {}
+        codes = []
+        for alert in self.alerts:
+            if alert.city_key:
+                if alert.city_key not in city_codes:
+                    city_codes[alert.city_key] = len(self.city_keys)
+                    self.city_keys.append(alert.city_key)
+                codes.append(city_codes[alert.city_key])
+            else:
+                codes.append(-1)
+        self.city = np.array(codes, dtype=np.int32).reshape(count)
+
+        self.min_cents = np.array([to_cents(a.min_price) for a in self.alerts], dtype=np.int64).reshape(count)
+        self.max_cents = np.array([to_cents(a.max_price) for a in self.alerts], dtype=np.int64).reshape(count)
+        self.has_price_criterion = (self.min_cents != 0) | (self.max_cents != 0)
+
+        self.mandatory_count = (
+            (self.preferred_status != '').astype(np.int64)
+            + (self.city >= 0).astype(np.int64)
+            + self.has_price_criterion.astype(np.int64)
+        )
+
+        criterion_alert, criterion_text, criterion_number = [], [], []
+        rows_by_key = defaultdict(list)
+        for position, alert in enumerate(self.alerts):
+            for criterion in alert.criteria:
+                rows_by_key[criterion.attribute_key].append(len(criterion_alert))
+                criterion_alert.append(position)
+                criterion_text.append(criterion.value_text)
+                criterion_number.append(criterion.value_number if criterion.value_number is not None else np.nan)
+        self.criterion_alert = np.array(criterion_alert, dtype=np.int64)
+        self.criterion_text = np.array(criterion_text, dtype=object)
+        self.criterion_number = np.array(criterion_number, dtype=np.float64)
+        self.rows_by_key = {key: np.array(rows, dtype=np.int64) for key, rows in rows_by_key.items()}
+        self.criteria_count = np.bincount(self.criterion_alert, minlength=count).astype(np.int64)
+
+    def __len__(self):
+        return len(self.alerts)
+
+    def match_property(self, prop, threshold=MATCH_THRESHOLD):
+        """Alertes (AlertSpec) que le bien (PropertySnapshot) satisfait."""
+        count = len(self.alerts)
+        if count == 0:
+            return []
+
+        mask = self.property_type_id == (prop.property_type_id if prop.property_type_id is not None else -2)
+        mask &= (self.preferred_status == '') | (self.preferred_status == prop.status)
+
+        matching_cities = [code for code, key in enumerate(self.city_keys) if prop.city and key in prop.city]
+        mask &= (self.city < 0) | np.isin(self.city, matching_cities)
+
+        if prop.price_cents:
+            price_ok = ((self.min_cents == 0) | (self.min_cents <= prop.price_cents)) \
+                & ((self.max_cents == 0) | (self.max_cents >= prop.price_cents))
+        else:
+            price_ok = np.zeros(count, dtype=bool)
+        mask &= ~self.has_price_criterion | price_ok
+
+        if not mask.any():
+            return []
+
+        criterion_hit = np.zeros(len(self.criterion_alert), dtype=bool)
+        for key, rows in self.rows_by_key.items():
+            value = prop.attributes.get(key)
+            if value is None:
+                continue
+            hit = self.criterion_text[rows] == str(value).lower()
+            number = _numeric(value)
+            if not np.isnan(number):
+                hit |= self.criterion_number[rows] == number
+            criterion_hit[rows] = hit
+        matched = self.mandatory_count + np.bincount(
+            self.criterion_alert, weights=criterion_hit, minlength=count
+        ).astype(np.int64)
+        total = self.mandatory_count + self.criteria_count
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            passes = np.where(total > 0, matched / np.maximum(total, 1) >= threshold, True)
+        return [self.alerts[i] for i in np.flatnonzero(mask & passes)]
+
+
+def property_snapshot(prop, prop_attributes):
+    """PropertySnapshot d'un objet Property (prop_attributes : build_property_attributes(prop))."""
+    return PropertySnapshot(
+        id=prop.id,
+        property_type_id=prop.property_type_id,
+        status=prop.status,
+        city=prop.city.lower() if prop.city else None,
+        price_cents=to_cents(prop.price),
+        attributes=prop_attributes
+    )
+
+
+def _typed_value(value_boolean, value_integer, value_decimal, value_string):
+    # Même priorité que build_property_attributes
+    if value_boolean is not None:
+        return value_boolean
+    if value_integer is not None:
+        return value_integer
+    if value_decimal is not None:
+        return float(value_decimal)
+    return value_string
+
+
+def load_property_columns(property_type_id):
+    """Extrait en colonnes les biens validés d'un type (deux requêtes sur tuples)."""
+    rows = db.session.query(
+        Property.id, Property.status, Property.city, Property.price
+    ).filter(
+        Property.property_type_id == property_type_id,
+        Property.is_validated == True
+    ).order_by(Property.id).all()
+
+    attribute_names = {a.id: a.name.lower() for a in get_attribute_resolver().attributes}
+    attributes = defaultdict(dict)
+    value_rows = db.session.query(
+        PropertyValue.property_id, PropertyValue.attribute_id,
+        PropertyValue.value_boolean, PropertyValue.value_integer,
+        PropertyValue.value_decimal, PropertyValue.value_string
+    ).join(Property, Property.id == PropertyValue.property_id).filter(
+        Property.property_type_id == property_type_id,
+        Property.is_validated == True
+    ).order_by(PropertyValue.id).all()
+    for property_id, attribute_id, value_boolean, value_integer, value_decimal, value_string in value_rows:
+        name = attribute_names.get(attribute_id)
+        value = _typed_value(value_boolean, value_integer, value_decimal, value_string)
+        if name and value is not None:
+            attributes[property_id][name] = value
+
+    return PropertyColumns(
+        property_type_id,
+        ids=[r.id for r in rows],
+        statuses=[r.status for r in rows],
+        cities=[r.city.lower() if r.city else None for r in rows],
+        prices=[r.price for r in rows],
+        attributes=[attributes.get(r.id, {}) for r in rows]
+    )
+
+
+def load_property_snapshot(property_id):
+    """PropertySnapshot lu en base (tuples, sans objets ORM). None si le bien n'existe pas."""
+    row = db.session.query(
+        Property.id, Property.property_type_id, Property.status, Property.city, Property.price
+    ).filter(Property.id == property_id).first()
+    if row is None:
+        return None
+
+    attribute_names = {a.id: a.name.lower() for a in get_attribute_resolver().attributes}
+    attributes = {}
+    value_rows = db.session.query(
+        PropertyValue.attribute_id, PropertyValue.value_boolean, PropertyValue.value_integer,
+        PropertyValue.value_decimal, PropertyValue.value_string
+    ).filter(PropertyValue.property_id == property_id).order_by(PropertyValue.id).all()
+    for attribute_id, value_boolean, value_integer, value_decimal, value_string in value_rows:
+        name = attribute_names.get(attribute_id)
+        value = _typed_value(value_boolean, value_integer, value_decimal, value_string)
+        if name and value is not None:
+            attributes[name] = value
+
+    return PropertySnapshot(
+        id=row.id,
+        property_type_id=row.property_type_id,
+        status=row.status,
+        city=row.city.lower() if row.city else None,
+        price_cents=to_cents(row.price),
+        attributes=attributes
+    )
+
+
+# Champs du bien lus par le scoring (en plus des attributs EAV)
+MATCHED_FIELDS = ('property_type_id', 'status', 'city', 'price_cents')
+
+
+def diff_property_snapshots(before, after):
+    """
+    Champs de matching modifiés entre deux états d'un bien.
+    Retourne (champs modifiés parmi MATCHED_FIELDS, clés d'attributs modifiées), en listes triées (payload JSON).
+    """
+    fields = [field for field in MATCHED_FIELDS if getattr(before, field) != getattr(after, field)]
+    keys = set(before.attributes) | set(after.attributes)
+    attribute_keys = sorted(
+        key for key in keys
+        if _compared_value(before.attributes.get(key)) != _compared_value(after.attributes.get(key))
+    )
+    return fields, attribute_keys
+
+
+def _compared_value(value):
+    # Ce que criterion_matches compare : texte en minuscules et valeur numérique
+    if value is None:
+        return None
+    return str(value).lower(), float(value) if isinstance(value, (int, float)) else None
+
+
+def alert_touches(alert, fields, attribute_keys):
+    """True si l'un des critères de l'alerte porte sur un champ modifié (son score a pu changer)."""
+    if 'property_type_id' in fields:
+        return True
+    if 'status' in fields and alert.preferred_status:
+        return True
+    if 'city' in fields and alert.city_key:
+        return True
+    if 'price_cents' in fields and (to_cents(alert.min_price) or to_cents(alert.max_price)):
+        return True
+    return any(criterion.attribute_key in attribute_keys for criterion in alert.criteria)
+
+
+def load_alert_specs(request_ids=None, statuses=None, property_type_id=None):
+    """Alertes réduites à leurs critères (colonnes + critères typés), sans objets ORM."""
+    query = db.session.query(
+        PropertyRequest.id, PropertyRequest.customer_id, PropertyRequest.property_type_id,
+        PropertyRequest.preferred_status, PropertyRequest.city,
+        PropertyRequest.min_price, PropertyRequest.max_price, PropertyRequest.request_details
+    )
+    if request_ids is not None:
+        query = query.filter(PropertyRequest.id.in_(request_ids))
+    if statuses:
+        query = query.filter(PropertyRequest.status.in_(statuses))
+    if property_type_id is not None:
+        query = query.filter(PropertyRequest.property_type_id == property_type_id)
+    rows = query.order_by(PropertyRequest.id).all()
+    if not rows:
+        return []
+
+    criteria_by_request = defaultdict(list)
+    criteria_query = db.session.query(
+        PropertyRequestCriteria.property_request_id, PropertyRequestCriteria.attribute_key,
+        PropertyRequestCriteria.operator, PropertyRequestCriteria.value_text,
+        PropertyRequestCriteria.value_number, PropertyRequestCriteria.value_boolean
+    )
+    if request_ids is not None:
+        criteria_query = criteria_query.filter(PropertyRequestCriteria.property_request_id.in_(request_ids))
+    else:
+        criteria_query = criteria_query.filter(PropertyRequestCriteria.property_request_id.in_(
+            query.with_entities(PropertyRequest.id).order_by(None)
+        ))
+    for row in criteria_query.order_by(PropertyRequestCriteria.id).all():
+        criteria_by_request[row.property_request_id].append(Criterion(*row[1:]))
+
+    specs = []
+    for row in rows:
+        # Alerte pas encore migrée vers PropertyRequestCriteria : critères lus dans le JSON
+        criteria = criteria_by_request.get(row.id) or parse_request_criteria(row.request_details)
+        specs.append(AlertSpec(
+            id=row.id,
+            customer_id=row.customer_id,
+            property_type_id=row.property_type_id,
+            preferred_status=row.preferred_status,
+            city_key=row.city.lower() if row.city else '',
+            min_price=row.min_price,
+            max_price=row.max_price,
+            criteria=tuple(criteria)
+        ))
+    return specs
@@ -1,12 +1,41 @@
 from app import db
-from app.models import Property, PropertyRequest, PropertyRequestMatch, User
-from app.utils.email_utils import send_alert_match_email
+from app.models import Property, PropertyRequest, PropertyRequestMatch
+from app.utils.alert_digest import queue_instant_digests
+from app.utils.alert_index_utils import (
+    candidate_request_ids_for_property, get_request_criteria, criterion_matches, ACTIVE_REQUEST_STATUSES
+)
 from flask import current_app
-import json
+from datetime import datetime
+from app.utils.match_engine import (
+    MATCH_THRESHOLD, AlertColumns, load_alert_specs, load_property_columns, property_snapshot,
+    load_property_snapshot, alert_touches
+)
+# Nombre de lignes par INSERT multi-lignes
+MATCH_INSERT_BATCH_SIZE = 500
 
-def calculate_match_score(prop, req):
+def build_property_attributes(prop):
+    """Attributs EAV du bien (clés en minuscules), construits une fois par bien et non par alerte."""
+    prop_attributes = {}
+    for pv in prop.property_values:
+        attr_name = pv.attribute.name if pv.attribute else None
+        if not attr_name:
+            continue
+        if pv.value_boolean is not None:
+            prop_attributes[attr_name.lower()] = pv.value_boolean
+        elif pv.value_integer is not None:
+            prop_attributes[attr_name.lower()] = pv.value_integer
+        elif pv.value_decimal is not None:
+            prop_attributes[attr_name.lower()] = float(pv.value_decimal)
+        elif pv.value_string is not None:
+            prop_attributes[attr_name.lower()] = pv.value_string
+    return prop_attributes
+
+def calculate_match_score(prop, req, prop_attributes=None):
     """
     Calculates the matching score between a property and a request.
+    prop_attributes: result of build_property_attributes(prop), to reuse across requests.
+    Implémentation de référence (un couple à la fois) : les points d'entrée utilisent le moteur
+    vectorisé de match_engine, qui applique exactement les mêmes règles.
     Returns (score, total_criteria, matched_criteria, is_mandatory_failed)
     """
     total_criteria = 0
@@ -55,48 +84,102 @@ def calculate_match_score(prop, req):
             return 0, total_criteria, matched_criteria, True
 
     # 5. Vérification des Attributs Dynamiques (80% rule applies here)
-    try:
-        request_details = json.loads(req.request_details) if req.request_details else {}
-    except json.JSONDecodeError:
-        request_details = {}
-        
-    prop_attributes = {}
-    for pv in prop.property_values:
-        attr_name = pv.attribute.name if pv.attribute else None
-        if not attr_name:
-            continue
-        if pv.value_boolean is not None:
-            prop_attributes[attr_name.lower()] = pv.value_boolean
-        elif pv.value_integer is not None:
-            prop_attributes[attr_name.lower()] = pv.value_integer
-        elif pv.value_decimal is not None:
-            prop_attributes[attr_name.lower()] = float(pv.value_decimal)
-        elif pv.value_string is not None:
-            prop_attributes[attr_name.lower()] = pv.value_string
+    # Critères pré-typés (PropertyRequestCriteria) : plus de json.loads par couple bien/alerte
+    if prop_attributes is None:
+        prop_attributes = build_property_attributes(prop)
     
-    for key, req_val in request_details.items():
-        # Skip criteria already handled at top level
-        if key.lower() in ['city', 'min_price', 'max_price', 'status', 'preferred_status'] or req_val is None or str(req_val).strip() == '':
-            continue
-            
+    for criterion in get_request_criteria(req):
         total_criteria += 1
-        # On cherche la correspondance dans les attributs du bien
-        prop_val = prop_attributes.get(key.lower())
-        
-        if prop_val is not None:
-            if str(req_val).lower() == str(prop_val).lower(): # Match exact texte
-                matched_criteria += 1
-            elif isinstance(req_val, (int, float)) and isinstance(prop_val, (int, float)):
-                if req_val == prop_val: # Match exact nombre
-                    matched_criteria += 1
+        # On cherche la correspondance dans les attributs du bien (match exact texte ou nombre)
+        if criterion_matches(criterion, prop_attributes.get(criterion.attribute_key)):
+            matched_criteria += 1
     
     score = (matched_criteria / total_criteria) if total_criteria > 0 else 1.0
     return score, total_criteria, matched_criteria, False
 
+def bulk_record_matches(matched_pairs):
+    """
+    Enregistre en bloc les matches (req, prop) : une requête pour les couples déjà connus, puis des INSERT
+    multi-lignes. La contrainte unique (property_request_id, property_id) + INSERT IGNORE empêche deux
+    exécutions concurrentes d'insérer le même match. N'effectue pas de commit.
+    Retourne les couples (req, prop) nouvellement matchés.
+    """
+    if not matched_pairs:
+        return []
+
+    objects = {(req.id, prop.id): (req, prop) for req, prop in matched_pairs}
+    new_pairs = insert_new_match_pairs([(req.id, prop.id) for req, prop in matched_pairs])
+    return [objects[pair] for pair in new_pairs]
+
+def insert_new_match_pairs(id_pairs, notified=False):
+    """
+    Variante de bulk_record_matches sur des couples d'IDs (request_id, property_id), pour les traitements
+    en masse sans objets ORM. N'effectue pas de commit. Retourne les couples effectivement insérés par
+    cet appel (rowcount de chaque lot) : ceux qu'une exécution concurrente a insérés d'abord n'y sont pas.
+    notified=True : matches enregistrés comme déjà notifiés (aucun digest ne les reprendra).
+    """
+    if not id_pairs:
+        return []
+
+    request_ids = {request_id for request_id, _ in id_pairs}
+    property_ids = {property_id for _, property_id in id_pairs}
+    existing = set(db.session.query(PropertyRequestMatch.property_request_id, PropertyRequestMatch.property_id).filter(
+        PropertyRequestMatch.property_request_id.in_(request_ids),
+        PropertyRequestMatch.property_id.in_(property_ids)
+    ).all())
+
+    new_pairs = []
+    for pair in id_pairs:
+        if pair in existing:
+            continue
+        existing.add(pair)
+        new_pairs.append(pair)
+
+    now = datetime.utcnow()
+    rows = [
+        {'property_request_id': request_id, 'property_id': property_id, 'is_read': False, 'created_at': now,
+         'notified_at': now if notified else None}
+        for request_id, property_id in new_pairs
+    ]
+    inserted = []
+    for start in range(0, len(rows), MATCH_INSERT_BATCH_SIZE):
+        batch_pairs = new_pairs[start:start + MATCH_INSERT_BATCH_SIZE]
+        batch_rows = rows[start:start + MATCH_INSERT_BATCH_SIZE]
+        savepoint = db.session.begin_nested()
+        if _insert_ignore_matches(batch_rows) == len(batch_rows):
+            savepoint.commit()
+            inserted.extend(batch_pairs)
+            continue
+
+        # Des couples du lot ont été insérés entre-temps par une exécution concurrente (ignorés par
+        # INSERT IGNORE) : le lot est annulé puis repris ligne par ligne pour savoir lesquels sont à nous
+        savepoint.rollback()
+        for pair, row in zip(batch_pairs, batch_rows):
+            if _insert_ignore_matches([row]):
+                inserted.append(pair)
+
+    return inserted
+
+def _insert_ignore_matches(rows):
+    """INSERT IGNORE multi-lignes dans PropertyRequestMatches. Retourne le nombre de lignes insérées."""
+    stmt = PropertyRequestMatch.__table__.insert().values(rows)
+    stmt = stmt.prefix_with('IGNORE', dialect='mysql').prefix_with('OR IGNORE', dialect='sqlite')
+    return db.session.execute(stmt).rowcount
+
+def queue_match_notifications(new_matches):
+    """
+    Notifie les nouveaux matches, à appeler avant le commit : les emails partent avec les matches.
+    Un seul email (digest) par chercheur en mode 'instant', quel que soit le nombre de matches ; les
+    chercheurs en mode hourly / daily les recevront dans leur prochain digest (scripts/send_alert_digests.py).
+    """
+    if not new_matches:
+        return
+    queue_instant_digests({req.customer_id for req, _ in new_matches})
+
 def find_matches_for_property(property_id):
     """
     Finds and records matches for a given property against active PropertyRequests.
-    Triggered when a property is validated by Admin.
+    Triggered when a property is validated by Admin (executed by the job worker, see job_queue).
     """
     try:
         prop = Property.query.get(property_id)
@@ -108,70 +191,89 @@ def find_matches_for_property(property_id):
             current_app.logger.warning(f"Matching Engine: Skipping unvalidated property {property_id}")
             return
 
-        matching_requests = PropertyRequest.query.filter(
-            PropertyRequest.property_type_id == prop.property_type_id,
-            PropertyRequest.status.in_(['new', 'in_progress', 'contacted'])
-        ).all()
-
-        matches_created = 0
-        for req in matching_requests:
-            score, total, matched, failed = calculate_match_score(prop, req)
-            
-            if not failed and score >= 0.8:
-                # Check for existing match
-                existing_match = PropertyRequestMatch.query.filter_by(
-                    property_request_id=req.id,
-                    property_id=prop.id
-                ).first()
-
-                if not existing_match:
-                    db.session.add(PropertyRequestMatch(property_request_id=req.id, property_id=prop.id))
-                    matches_created += 1
-                    seeker = User.query.get(req.customer_id)
-                    if seeker:
-                        send_alert_match_email(seeker.email, seeker.first_name, prop.title, prop.id)
-        
+        # Index inversé : seules les alertes compatibles avec les critères obligatoires sont chargées,
+        # puis le bien est scoré contre toutes ces alertes d'un coup (match_engine vectorisé)
+        candidate_ids = candidate_request_ids_for_property(prop)
+        alerts = load_alert_specs(request_ids=candidate_ids, statuses=ACTIVE_REQUEST_STATUSES) if candidate_ids else []
+        snapshot = property_snapshot(prop, build_property_attributes(prop))
+        matched_pairs = [(alert, prop) for alert in AlertColumns(alerts).match_property(snapshot)]
+
+        new_matches = bulk_record_matches(matched_pairs)
+        queue_match_notifications(new_matches)
         db.session.commit()
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Error in find_matches_for_property: {e}", exc_info=True)
+        raise  # Le job de matching sera retenté par le worker
 
 def find_matches_for_request(request_id):
     """
     Finds and records matches for a new PropertyRequest against existing VALIDATED properties.
-    Triggered when a seeker creates a new alert.
+    Triggered when a seeker creates a new alert (executed by the job worker, see job_queue).
     """
     try:
         req = PropertyRequest.query.get(request_id)
         if not req:
             return
 
-        # Look for validated properties of the same type
-        validated_properties = Property.query.filter_by(
-            property_type_id=req.property_type_id,
-            is_validated=True
-        ).all()
-
-        matches_created = 0
-        for prop in validated_properties:
-            score, total, matched, failed = calculate_match_score(prop, req)
-            
-            if not failed and score >= 0.8:
-                existing_match = PropertyRequestMatch.query.filter_by(
-                    property_request_id=req.id,
-                    property_id=prop.id
-                ).first()
-
-                if not existing_match:
-                    db.session.add(PropertyRequestMatch(property_request_id=req.id, property_id=prop.id))
-                    matches_created += 1
-                    # Notification optionnelle ici ? Le user vient de créer l'alerte. 
-                    # On enverra quand même un mail pour confirmer.
-                    seeker = User.query.get(req.customer_id)
-                    if seeker:
-                        send_alert_match_email(seeker.email, seeker.first_name, prop.title, prop.id)
-        
+        # Biens validés du même type extraits en colonnes, l'alerte est scorée contre tous d'un coup
+        columns = load_property_columns(req.property_type_id)
+        alert = load_alert_specs(request_ids=[req.id])[0]
+        matched_ids = columns.match_alert(alert).tolist()
+        matched_properties = db.session.query(Property.id, Property.title).filter(
+            Property.id.in_(matched_ids)
+        ).order_by(Property.id).all() if matched_ids else []
+        matched_pairs = [(req, prop) for prop in matched_properties]
+
+        new_matches = bulk_record_matches(matched_pairs)
+        # Notification optionnelle ici ? Le user vient de créer l'alerte. 
+        # On enverra quand même un mail pour confirmer.
+        queue_match_notifications(new_matches)
         db.session.commit()
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Error in find_matches_for_request: {e}", exc_info=True)
+        raise  # Le job de matching sera retenté par le worker
+
+def rematch_property_after_update(property_id, fields, attribute_keys):
+    """
+    Re-matching incrémental d'un bien validé modifié par l'admin.
+    fields / attribute_keys : champs de matching modifiés (diff_property_snapshots). Seules les alertes dont un
+    critère porte sur un champ modifié sont re-scorées : les autres ont le même score qu'avant.
+    Les nouveaux matches sont enregistrés (et notifiés), ceux qui ne passent plus sont retirés.
+    """
+    try:
+        prop = Property.query.get(property_id)
+        if not prop or not prop.is_validated:
+            return
+
+        snapshot = load_property_snapshot(prop.id)
+        existing_ids = {request_id for (request_id,) in db.session.query(PropertyRequestMatch.property_request_id).filter(
+            PropertyRequestMatch.property_id == prop.id
+        ).all()}
+        # Alertes pouvant matcher le nouvel état (index inversé) + alertes déjà matchées (à retirer éventuellement)
+        request_ids = set(candidate_request_ids_for_property(prop)) | existing_ids
+        alerts = load_alert_specs(request_ids=request_ids, statuses=ACTIVE_REQUEST_STATUSES) if request_ids else []
+        touched = [alert for alert in alerts if alert_touches(alert, fields, attribute_keys)]
+
+        matched = AlertColumns(touched).match_property(snapshot)
+        matched_ids = {alert.id for alert in matched}
+        retired_ids = [alert.id for alert in touched if alert.id in existing_ids and alert.id not in matched_ids]
+
+        if retired_ids:
+            PropertyRequestMatch.query.filter(
+                PropertyRequestMatch.property_id == prop.id,
+                PropertyRequestMatch.property_request_id.in_(retired_ids)
+            ).delete(synchronize_session=False)
+
+        new_matches = bulk_record_matches([(alert, prop) for alert in matched if alert.id not in existing_ids])
+        queue_match_notifications(new_matches)
+        db.session.commit()
+        current_app.logger.info(
+            f"🔁 Re-matching bien #{prop.id}: {len(touched)} alerte(s) re-scorée(s), "
+            f"{len(new_matches)} nouveau(x) match(es), {len(retired_ids)} retiré(s)."
+        )
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error in rematch_property_after_update: {e}", exc_info=True)
+        raise  # Le job de matching sera retenté par le worker
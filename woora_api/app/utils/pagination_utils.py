@@ -0,0 +1,52 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import or_, and_
+
+
+def encode_cursor(created_at, item_id):
+    """Curseur opaque (base64 url-safe) à partir de la clé de tri (created_at, id)."""
+    payload = {'c': created_at.isoformat() if created_at else None, 'i': item_id}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Décode un curseur. Lève ValueError si le curseur est invalide."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        created_at = datetime.fromisoformat(payload['c']) if payload.get('c') else None
+        return created_at, int(payload['i'])
+    except Exception:
+        raise ValueError("Curseur de pagination invalide.")
+
+
+def keyset_paginate(query, cursor, per_page, created_column, id_column, key_fn, include_total=False):
+    """
+    Pagination par curseur (keyset) sur (created_at DESC, id DESC) : pas d'OFFSET,
+    le coût d'une page est le même quelle que soit la profondeur du défilement.
+    La requête doit déjà être triée par (created_column DESC, id_column DESC).
+    key_fn(item) -> (created_at, id) extrait la clé de tri d'un élément de la page.
+    Retourne (items, next_cursor, total) ; total vaut None si include_total est faux.
+    """
+    total = query.order_by(None).count() if include_total else None
+
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        if created_at is None:
+            # Les created_at NULL sont en fin de liste (DESC)
+            query = query.filter(created_column == None, id_column < last_id)
+        else:
+            query = query.filter(or_(
+                created_column < created_at,
+                and_(created_column == created_at, id_column < last_id),
+                created_column == None
+            ))
+
+    rows = query.limit(per_page + 1).all()
+    items = rows[:per_page]
+    next_cursor = None
+    if len(rows) > per_page and items:
+        next_cursor = encode_cursor(*key_fn(items[-1]))
+
+    return items, next_cursor, total
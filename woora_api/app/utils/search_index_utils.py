@@ -0,0 +1,401 @@
+import json
+import re
+import unicodedata
+from flask import current_app
+from sqlalchemy import func, or_, text, Integer, Float
+from sqlalchemy.dialects.mysql import match as mysql_match
+from app import db
+from app.utils.geo_utils import EARTH_RADIUS_KM, encode_geohash, bounding_box, geohash_prefixes_for_bbox
+from app.utils.pagination_utils import keyset_paginate
+from app.utils.attribute_resolver import get_attribute_resolver
+from app.models import (
+    Property, PropertyStatus, PropertyValue, PropertyAttribute, User,
+    PropertySearchIndex, PropertySearchIndexValue, PropertySearchDocument
+)
+
+# Statuts affichés par défaut dans les listings publics (seekers / agents)
+DEFAULT_LISTING_STATUSES = ['for_sale', 'for_rent']
+
+# innodb_ft_min_token_size (MySQL) : les mots plus courts ne sont pas indexés en FULLTEXT
+FULLTEXT_MIN_TOKEN_LENGTH = 3
+
+
+def normalize_attribute_key(name):
+    return str(name).lower().strip() if name is not None else None
+
+
+def fold_search_text(value):
+    """Minuscules, sans accents, ponctuation remplacée par des espaces ('Été à Cotonou!' -> 'ete a cotonou')."""
+    if not value:
+        return ''
+    folded = unicodedata.normalize('NFKD', str(value))
+    folded = ''.join(c for c in folded if not unicodedata.combining(c)).lower()
+    folded = re.sub(r'[\W_]+', ' ', folded)
+    return folded.strip()
+
+
+def build_property_search_text(prop):
+    return fold_search_text(' '.join(filter(None, [prop.title, prop.city, prop.address, prop.description])))
+
+
+def sync_property_search_document(prop):
+    """Met à jour le document plein-texte du bien (tous les biens, y compris non validés : listing admin)."""
+    document = PropertySearchDocument.query.get(prop.id)
+    if not document:
+        document = PropertySearchDocument(property_id=prop.id)
+        db.session.add(document)
+    document.search_text = build_property_search_text(prop)
+
+
+def apply_fulltext_search(query, id_column, search_query):
+    """
+    Filtre plein-texte sur PropertySearchDocument : chaque mot doit être présent (préfixe),
+    insensible aux accents et à la casse.
+    - MySQL  : MATCH ... AGAINST ('+mot* +mot*' IN BOOLEAN MODE) sur l'index FULLTEXT
+    - SQLite : table FTS5 PropertySearchFts (bm25)
+    - Autres / mots trop courts pour l'index : LIKE sur le texte normalisé
+    Retourne (query, relevance) ; relevance est None si aucun score n'est disponible.
+    """
+    words = fold_search_text(search_query).split()
+    if not words:
+        return query, None
+
+    query = query.join(PropertySearchDocument, PropertySearchDocument.property_id == id_column)
+    dialect = db.session.get_bind().dialect.name
+    relevance = None
+    like_words = words
+
+    if dialect == 'mysql':
+        indexed_words = [w for w in words if len(w) >= FULLTEXT_MIN_TOKEN_LENGTH]
+        like_words = [w for w in words if len(w) < FULLTEXT_MIN_TOKEN_LENGTH]
+        if indexed_words:
+            relevance = mysql_match(
+                PropertySearchDocument.search_text,
+                against=' '.join(f'+{w}*' for w in indexed_words)
+            ).in_boolean_mode()
+            query = query.filter(relevance)
+    elif dialect == 'sqlite':
+        fts = text(
+            "SELECT rowid AS property_id, bm25(PropertySearchFts) AS rank "
+            "FROM PropertySearchFts WHERE PropertySearchFts MATCH :fts_query"
+        ).bindparams(fts_query=' '.join(f'"{w}"*' for w in words)).columns(
+            property_id=Integer, rank=Float
+        ).subquery('fts')
+        query = query.join(fts, fts.c.property_id == id_column)
+        relevance = -fts.c.rank  # bm25 : plus petit = plus pertinent
+        like_words = []
+
+    for word in like_words:
+        query = query.filter(PropertySearchDocument.search_text.like(f'%{word}%'))
+
+    return query, relevance
+
+
+def is_publicly_visible(prop):
+    """
+    Règle de visibilité des listings publics :
+    bien validé, non supprimé, propriétaire actif et statut non déterministe (vendu, loué...).
+    """
+    if not prop or not prop.is_validated or prop.deleted_at is not None:
+        return False
+
+    owner = User.query.get(prop.owner_id)
+    if not owner or owner.deleted_at is not None:
+        return False
+
+    if prop.status_id:
+        status_obj = PropertyStatus.query.get(prop.status_id)
+        if status_obj and status_obj.is_deterministic:
+            return False
+
+    return True
+
+
+def sync_property_search_index(prop):
+    """
+    Met à jour (ou retire) la ligne du read-model PropertySearchIndex pour ce bien.
+    À appeler dans la transaction de la route, AVANT le commit (aucun commit ici).
+    """
+    if prop is None:
+        return
+    if prop.id is None:
+        db.session.flush()
+
+    sync_property_search_document(prop)
+    entry = PropertySearchIndex.query.get(prop.id)
+
+    if not is_publicly_visible(prop):
+        if entry:
+            db.session.delete(entry)
+        return
+
+    if not entry:
+        entry = PropertySearchIndex(property_id=prop.id)
+        db.session.add(entry)
+
+    entry.owner_id = prop.owner_id
+    entry.property_type_id = prop.property_type_id
+    entry.status = prop.status
+    entry.status_id = prop.status_id
+    entry.price = prop.price
+    entry.city = prop.city.strip().lower() if prop.city else None
+    entry.country = prop.country.strip().lower() if prop.country else None
+    entry.latitude = prop.latitude
+    entry.longitude = prop.longitude
+    entry.geohash = encode_geohash(prop.latitude, prop.longitude)
+    entry.created_at = prop.created_at
+
+    # Valeurs EAV filtrables (requête directe : la collection property_values peut être périmée
+    # juste après save_property_eav_values)
+    rows = db.session.query(PropertyValue, PropertyAttribute.name).join(
+        PropertyAttribute, PropertyValue.attribute_id == PropertyAttribute.id
+    ).filter(
+        PropertyValue.property_id == prop.id,
+        PropertyAttribute.is_filterable != False
+    ).all()
+
+    existing_values = {v.attribute_key: v for v in entry.values}
+    seen_keys = set()
+    for pv, attr_name in rows:
+        key = normalize_attribute_key(attr_name)
+        if not key or key in seen_keys:
+            continue
+        seen_keys.add(key)
+
+        value = existing_values.get(key)
+        if not value:
+            value = PropertySearchIndexValue(property_id=prop.id, attribute_key=key)
+            entry.values.append(value)
+        value.value_string = pv.value_string.strip().lower() if pv.value_string is not None else None
+        value.value_integer = pv.value_integer
+        value.value_boolean = pv.value_boolean
+        value.value_decimal = pv.value_decimal
+
+    for key, value in existing_values.items():
+        if key not in seen_keys:
+            entry.values.remove(value)
+
+
+def remove_property_search_index(property_id):
+    """Retire explicitement un bien du read-model (suppression définitive du bien)."""
+    entry = PropertySearchIndex.query.get(property_id)
+    if entry:
+        db.session.delete(entry)
+    document = PropertySearchDocument.query.get(property_id)
+    if document:
+        db.session.delete(document)
+
+
+def sync_properties_search_index(properties):
+    for prop in properties:
+        sync_property_search_index(prop)
+
+
+def sync_search_index_for_status(status_id):
+    """Resynchronise tous les biens d'un statut (ex: bascule de is_deterministic)."""
+    sync_properties_search_index(Property.query.filter_by(status_id=status_id).all())
+
+
+def sync_search_index_for_attribute(attribute_id):
+    """Resynchronise les biens portant cet attribut (renommage, bascule de is_filterable)."""
+    db.session.flush()
+    property_ids = db.session.query(PropertyValue.property_id).filter(PropertyValue.attribute_id == attribute_id)
+    sync_properties_search_index(Property.query.filter(Property.id.in_(property_ids)).all())
+
+
+def remove_attribute_from_search_index(attribute_name):
+    """Purge les valeurs indexées d'un attribut supprimé."""
+    PropertySearchIndexValue.query.filter_by(
+        attribute_key=normalize_attribute_key(attribute_name)
+    ).delete(synchronize_session=False)
+
+
+def get_filterable_attribute_keys():
+    # Servi par le cache des attributs : aucune requête par listing
+    resolver = get_attribute_resolver()
+    return {normalize_attribute_key(a.name) for a in resolver.attributes if a.is_filterable is not False}
+
+
+def _index_value_condition(key, value):
+    """Condition typée sur PropertySearchIndexValue (mêmes règles que l'ancien filtre EAV)."""
+    if isinstance(value, bool):
+        value_cond = PropertySearchIndexValue.value_boolean == value
+    elif isinstance(value, int):
+        value_cond = PropertySearchIndexValue.value_integer == value
+    elif isinstance(value, float):
+        value_cond = PropertySearchIndexValue.value_decimal == str(value)
+    else:
+        value_cond = PropertySearchIndexValue.value_string == str(value).lower().strip()
+
+    return db.session.query(PropertySearchIndexValue.property_id).filter(
+        PropertySearchIndexValue.attribute_key == key,
+        value_cond
+    )
+
+
+def _legacy_eav_condition(key, value):
+    """Fallback pour les attributs non filtrables (absents du read-model)."""
+    if isinstance(value, bool):
+        value_cond = PropertyValue.value_boolean == value
+    elif isinstance(value, int):
+        value_cond = PropertyValue.value_integer == value
+    elif isinstance(value, float):
+        value_cond = PropertyValue.value_decimal == str(value)
+    else:
+        value_cond = func.lower(PropertyValue.value_string) == str(value).lower().strip()
+
+    return db.session.query(PropertyValue.property_id).join(
+        PropertyAttribute, PropertyValue.attribute_id == PropertyAttribute.id
+    ).filter(
+        func.lower(PropertyAttribute.name) == key,
+        value_cond
+    )
+
+
+def apply_radius_filter(query, lat_val, lng_val, radius_val):
+    """
+    Filtre par rayon en trois étapes :
+    1. préfixes geohash couvrant le rectangle englobant (index idx_psi_geohash),
+    2. rectangle englobant sur (latitude, longitude) (index composite idx_psi_lat_lng),
+    3. distance exacte (Haversine) uniquement sur les candidats restants.
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat_val, lng_val, radius_val)
+
+    prefixes = geohash_prefixes_for_bbox(min_lat, max_lat, min_lng, max_lng)
+    if prefixes:
+        query = query.filter(or_(*[PropertySearchIndex.geohash.like(f'{prefix}%') for prefix in prefixes]))
+
+    query = query.filter(
+        PropertySearchIndex.latitude.between(min_lat, max_lat),
+        PropertySearchIndex.longitude.between(min_lng, max_lng)
+    )
+
+    distance = EARTH_RADIUS_KM * func.acos(
+        func.cos(func.radians(lat_val)) *
+        func.cos(func.radians(PropertySearchIndex.latitude)) *
+        func.cos(func.radians(PropertySearchIndex.longitude) - func.radians(lng_val)) +
+        func.sin(func.radians(lat_val)) *
+        func.sin(func.radians(PropertySearchIndex.latitude))
+    )
+    return query.filter(distance <= radius_val)
+
+
+def build_listing_query(args, allow_country_filter=True, rank_by_relevance=True):
+    """
+    Construit la requête des listings publics sur le read-model PropertySearchIndex
+    à partir des paramètres de la requête HTTP (status, country, search, latitude/longitude/radius,
+    property_type_id, min_price, max_price, filters).
+    Retourne une requête triée par pertinence (si recherche textuelle et rank_by_relevance) puis par
+    (created_at, property_id) décroissants. La pagination par curseur exige rank_by_relevance=False.
+    """
+    query = PropertySearchIndex.query
+
+    # --- Statut ---
+    status_param = args.get('status')
+    if status_param and status_param != 'null' and status_param != '':
+        query = query.filter(PropertySearchIndex.status == status_param)
+    else:
+        query = query.filter(PropertySearchIndex.status.in_(DEFAULT_LISTING_STATUSES))
+
+    # --- Pays ---
+    if allow_country_filter:
+        country_param = args.get('country', '').strip()
+        if country_param and country_param.lower() != 'all' and country_param != 'null':
+            query = query.filter(PropertySearchIndex.country == country_param.lower())
+
+    # --- Recherche plein-texte (titre, ville, adresse, description) ---
+    relevance = None
+    search_query = args.get('search', '').strip()
+    if search_query:
+        query, relevance = apply_fulltext_search(query, PropertySearchIndex.property_id, search_query)
+
+    # --- Rayon géographique ---
+    try:
+        lat_param = args.get('latitude')
+        lng_param = args.get('longitude')
+        radius_param = args.get('radius')  # en kilomètres
+
+        if lat_param and lng_param and radius_param:
+            lat_val = float(lat_param)
+            lng_val = float(lng_param)
+            radius_val = float(radius_param)
+
+            query = apply_radius_filter(query, lat_val, lng_val, radius_val)
+    except Exception as geo_err:
+        current_app.logger.error(f"Erreur lors du filtrage géographique par rayon: {geo_err}")
+
+    # --- Type de bien ---
+    try:
+        property_type_id = args.get('property_type_id')
+        if property_type_id:
+            query = query.filter(PropertySearchIndex.property_type_id == int(property_type_id))
+    except (ValueError, TypeError):
+        pass
+
+    # --- Prix Min / Max ---
+    try:
+        min_price = args.get('min_price')
+        if min_price:
+            query = query.filter(PropertySearchIndex.price >= float(min_price))
+
+        max_price = args.get('max_price')
+        if max_price:
+            query = query.filter(PropertySearchIndex.price <= float(max_price))
+    except (ValueError, TypeError):
+        pass
+
+    # --- Filtres dynamiques EAV (stricts) ---
+    filters_json = args.get('filters')
+    if filters_json:
+        try:
+            dynamic_filters = json.loads(filters_json)
+            if isinstance(dynamic_filters, dict) and dynamic_filters:
+                filterable_keys = get_filterable_attribute_keys()
+                for key, value in dynamic_filters.items():
+                    norm_key = normalize_attribute_key(key)
+                    if norm_key in filterable_keys:
+                        subq = _index_value_condition(norm_key, value)
+                    else:
+                        subq = _legacy_eav_condition(norm_key, value)
+                    query = query.filter(PropertySearchIndex.property_id.in_(subq))
+        except json.JSONDecodeError:
+            pass
+
+    # Avec une recherche textuelle, les biens les plus pertinents passent en premier
+    if relevance is not None and rank_by_relevance:
+        query = query.order_by(relevance.desc())
+    return query.order_by(PropertySearchIndex.created_at.desc(), PropertySearchIndex.property_id.desc())
+
+
+def paginate_listing(args, allow_country_filter=True):
+    """
+    Applique build_listing_query puis la pagination demandée :
+    - `cursor` présent (vide pour la première page) : pagination par curseur sur (created_at, id),
+      sans OFFSET ; le COUNT(*) n'est fait que si `include_total=true`.
+    - sinon : pagination classique `page` / `per_page` (COUNT + OFFSET).
+    Retourne (entrées PropertySearchIndex de la page, métadonnées de pagination pour la réponse).
+    Lève ValueError si le curseur est invalide.
+    """
+    per_page = args.get('per_page', 20, type=int)
+    cursor = args.get('cursor')
+
+    if cursor is not None:
+        # Le tri par pertinence n'est pas compatible avec un curseur (created_at, id)
+        query = build_listing_query(args, allow_country_filter=allow_country_filter, rank_by_relevance=False)
+        include_total = args.get('include_total', 'false').lower() in ['true', '1']
+        entries, next_cursor, total = keyset_paginate(
+            query, cursor, per_page,
+            PropertySearchIndex.created_at, PropertySearchIndex.property_id,
+            key_fn=lambda entry: (entry.created_at, entry.property_id),
+            include_total=include_total
+        )
+        meta = {'next_cursor': next_cursor, 'has_more': next_cursor is not None, 'per_page': per_page}
+        if total is not None:
+            meta['total'] = total
+        return entries, meta
+
+    page = args.get('page', 1, type=int)
+    query = build_listing_query(args, allow_country_filter=allow_country_filter)
+    # La méthode .paginate() fait un COUNT(*) optimisé puis un LIMIT/OFFSET
+    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    return pagination.items, {'total': pagination.total, 'pages': pagination.pages, 'current_page': page}
@@ -0,0 +1,235 @@
+from collections import defaultdict
+from app import db
+from app.models import Property, PropertyValue, PropertyImage, PropertyStatus, PropertyType, PropertyAttribute, User
+from app.utils.attribute_resolver import get_attribute_resolver
+
+SHARE_LINK_BASE_URL = "https://goods.wooraentreprises.com/p/"
+
+# Colonnes de Properties lues par le sérialiseur rapide (tuples, sans objet ORM)
+PROPERTY_LIST_COLUMNS = (
+    Property.id, Property.owner_id, Property.agent_id, Property.buyer_id, Property.property_type_id,
+    Property.title, Property.description, Property.share_uid, Property.status, Property.status_id,
+    Property.price, Property.address, Property.city, Property.country, Property.postal_code,
+    Property.latitude, Property.longitude, Property.is_validated, Property.created_at, Property.updated_at,
+)
+
+
+def _attribute_names(attribute_ids):
+    by_id = get_attribute_resolver().by_id
+    names = {attr_id: by_id[attr_id].name for attr_id in attribute_ids if attr_id in by_id}
+
+    # Attribut créé par un autre worker depuis la dernière vérification de version du cache
+    missing = attribute_ids - names.keys()
+    if missing:
+        rows = db.session.query(PropertyAttribute.id, PropertyAttribute.name).filter(
+            PropertyAttribute.id.in_(missing)
+        ).all()
+        names.update(dict(rows))
+    return names
+
+
+def _load_values_and_images(property_ids):
+    """
+    Valeurs EAV (nom d'attribut, ligne) et URLs d'images par bien, en deux requêtes sur colonnes seules.
+    L'ordre (par id) est celui des collections property_values / images de l'ORM.
+    """
+    values_by_property = defaultdict(list)
+    image_urls_by_property = defaultdict(list)
+
+    value_rows = db.session.query(
+        PropertyValue.property_id, PropertyValue.attribute_id,
+        PropertyValue.value_string, PropertyValue.value_integer,
+        PropertyValue.value_boolean, PropertyValue.value_decimal
+    ).filter(PropertyValue.property_id.in_(property_ids)).order_by(PropertyValue.id).all()
+
+    attribute_names = _attribute_names({row.attribute_id for row in value_rows})
+    for row in value_rows:
+        values_by_property[row.property_id].append((attribute_names.get(row.attribute_id), row))
+
+    image_rows = db.session.query(PropertyImage.property_id, PropertyImage.image_url).filter(
+        PropertyImage.property_id.in_(property_ids)
+    ).order_by(PropertyImage.id).all()
+    for property_id, image_url in image_rows:
+        image_urls_by_property[property_id].append(image_url)
+
+    return values_by_property, image_urls_by_property
+
+
+class PropertySerializationContext:
+    """
+    Préchargement groupé de tout ce que Property.to_dict() lit dans ses relations, pour une page entière :
+    valeurs EAV, images, statuts, types, agents et acheteurs. Le nombre de requêtes est fixe
+    (une par relation) quelle que soit la taille de la page, au lieu de plusieurs lazy-loads par bien.
+    Les noms d'attributs sont résolus via la table id -> nom du résolveur d'attributs (en mémoire).
+    """
+
+    def __init__(self, properties):
+        self.values_by_property = defaultdict(list)
+        self.image_urls_by_property = defaultdict(list)
+        self.statuses = {}
+        self.property_types = {}
+        self.users = {}
+
+        properties = list(properties)
+        property_ids = [p.id for p in properties]
+        if not property_ids:
+            return
+
+        # 1. Valeurs EAV et images
+        self.values_by_property, self.image_urls_by_property = _load_values_and_images(property_ids)
+
+        # 2. Statuts et types (quelques lignes par page)
+        status_ids = {p.status_id for p in properties if p.status_id}
+        if status_ids:
+            self.statuses = {s.id: s for s in PropertyStatus.query.filter(PropertyStatus.id.in_(status_ids)).all()}
+
+        type_ids = {p.property_type_id for p in properties if p.property_type_id}
+        if type_ids:
+            self.property_types = {t.id: t for t in PropertyType.query.filter(PropertyType.id.in_(type_ids)).all()}
+
+        # 3. Agents et acheteurs en une seule requête
+        user_ids = {p.agent_id for p in properties if p.agent_id} | {p.buyer_id for p in properties if p.buyer_id}
+        if user_ids:
+            self.users = {u.id: u for u in User.query.filter(User.id.in_(user_ids)).all()}
+
+
+def serialize_properties(properties):
+    """Sérialise une liste de biens (même format que Property.to_dict()) en un nombre fixe de requêtes."""
+    properties = list(properties)
+    context = PropertySerializationContext(properties)
+    return [p.to_dict(context=context) for p in properties]
+
+
+# ===================================================================
+# SÉRIALISEUR RAPIDE (SANS HYDRATATION ORM) POUR LES LISTINGS
+# ===================================================================
+
+def _property_row_to_dict(row, status, property_type, agent, buyer, image_urls, attribute_values):
+    """Reproduit exactement le dict de Property.to_dict() à partir de tuples (voir scripts/check_serializer_parity.py)."""
+    status_data = {
+        'id': status.id, 'name': status.name, 'color': status.color,
+        'description': status.description, 'display_order': status.display_order,
+        'is_deterministic': status.is_deterministic
+    } if status else {
+        'id': 0, 'name': 'Statut Inconnu', 'color': '#808080'
+    }
+
+    price = float(row.price) if row.price is not None else None
+    latitude = float(row.latitude) if row.latitude is not None else None
+    longitude = float(row.longitude) if row.longitude is not None else None
+
+    data = {
+        'id': row.id, 'owner_id': row.owner_id, 'agent_id': row.agent_id,
+        'buyer_id': row.buyer_id,
+        'property_type_id': row.property_type_id,
+        'title': row.title, 'description': row.description,
+        'share_uid': row.share_uid,
+        'share_link': f"{SHARE_LINK_BASE_URL}{row.share_uid}" if row.share_uid else None,
+        'status': status_data,
+        'price': price,
+        'address': row.address, 'city': row.city, 'country': row.country, 'postal_code': row.postal_code,
+        'latitude': latitude,
+        'longitude': longitude,
+        'is_validated': row.is_validated,
+        'created_at': row.created_at.isoformat() if row.created_at else None,
+        'updated_at': row.updated_at.isoformat() if row.updated_at else None,
+    }
+
+    attributes_dict = {}
+    for attr_name, pv in attribute_values:
+        if not attr_name:
+            continue
+        if pv.value_boolean is not None:
+            attributes_dict[attr_name] = pv.value_boolean
+        elif pv.value_integer is not None:
+            attributes_dict[attr_name] = pv.value_integer
+        elif pv.value_decimal is not None:
+            attributes_dict[attr_name] = float(pv.value_decimal)
+        elif pv.value_string is not None:
+            attributes_dict[attr_name] = pv.value_string
+
+    # Clés système injectées (compatibilité app mobile), dans le même ordre que to_dict()
+    attributes_dict['title'] = row.title
+    attributes_dict['description'] = row.description
+    if price is not None:
+        attributes_dict['price'] = price
+    if status:
+        attributes_dict['status'] = status.name
+    elif row.status:
+        attributes_dict['status'] = row.status
+    attributes_dict['address'] = row.address
+    attributes_dict['city'] = row.city
+    attributes_dict['postal_code'] = row.postal_code
+    if latitude is not None:
+        attributes_dict['latitude'] = latitude
+    if longitude is not None:
+        attributes_dict['longitude'] = longitude
+    attributes_dict['property_type_id'] = row.property_type_id
+
+    data['attributes'] = attributes_dict
+    data['image_urls'] = image_urls
+    data['property_type'] = {'id': property_type.id, 'name': property_type.name} if property_type else None
+
+    if agent:
+        data['created_by_agent'] = {
+            'agent_id': agent.id,
+            'agent_name': f"{agent.first_name} {agent.last_name}",
+            'agent_email': agent.email
+        }
+    if buyer:
+        data['buyer_details'] = {
+            'buyer_id': buyer.id,
+            'buyer_name': f"{buyer.first_name} {buyer.last_name}",
+            'buyer_email': buyer.email
+        }
+    return data
+
+
+def serialize_property_ids(property_ids):
+    """
+    Sérialise une page de biens directement depuis des tuples (aucun objet Property, PropertyValue...
+    n'est construit : pas d'identity map ni d'instrumentation). Même sortie que Property.to_dict(),
+    dans l'ordre de property_ids. Nombre de requêtes fixe (au plus 6).
+    """
+    if not property_ids:
+        return []
+
+    rows = db.session.query(*PROPERTY_LIST_COLUMNS).filter(Property.id.in_(property_ids)).all()
+    if not rows:
+        return []
+
+    ids = [row.id for row in rows]
+    values_by_property, image_urls_by_property = _load_values_and_images(ids)
+
+    statuses, property_types, users = {}, {}, {}
+    status_ids = {row.status_id for row in rows if row.status_id}
+    if status_ids:
+        statuses = {s.id: s for s in db.session.query(
+            PropertyStatus.id, PropertyStatus.name, PropertyStatus.color, PropertyStatus.description,
+            PropertyStatus.display_order, PropertyStatus.is_deterministic
+        ).filter(PropertyStatus.id.in_(status_ids)).all()}
+
+    type_ids = {row.property_type_id for row in rows if row.property_type_id}
+    if type_ids:
+        property_types = {t.id: t for t in db.session.query(PropertyType.id, PropertyType.name).filter(
+            PropertyType.id.in_(type_ids)
+        ).all()}
+
+    user_ids = {row.agent_id for row in rows if row.agent_id} | {row.buyer_id for row in rows if row.buyer_id}
+    if user_ids:
+        users = {u.id: u for u in db.session.query(User.id, User.first_name, User.last_name, User.email).filter(
+            User.id.in_(user_ids)
+        ).all()}
+
+    by_id = {}
+    for row in rows:
+        by_id[row.id] = _property_row_to_dict(
+            row,
+            statuses.get(row.status_id),
+            property_types.get(row.property_type_id),
+            users.get(row.agent_id),
+            users.get(row.buyer_id),
+            image_urls_by_property.get(row.id, []),
+            values_by_property.get(row.id, [])
+        )
+    return [by_id[pid] for pid in property_ids if pid in by_id]
@@ -0,0 +1,140 @@
+import time
+import queue
+import smtplib
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from flask_mail import Connection
+
+# Erreurs de transport : la connexion est fermée puis rouverte et le message renvoyé une fois.
+# Les refus du serveur (destinataire invalide, message rejeté) sont propres au message et ne sont pas retentés ici.
+TRANSPORT_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, socket.timeout)
+
+
+def _is_transport_error(error):
+    if isinstance(error, TRANSPORT_ERRORS):
+        return True
+    # 421 : le serveur ferme la session (trop de messages, inactivité...)
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code == 421
+
+
+class PooledSMTPConnection:
+    """
+    Connexion SMTP authentifiée (flask_mail.Connection) réutilisée pour plusieurs messages.
+    Rouverte après max_messages envois, après idle_timeout secondes d'inactivité, ou sur erreur de transport.
+    """
+
+    def __init__(self, mail_state, max_messages=100, idle_timeout=60):
+        self.mail_state = mail_state
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self.connection = None
+        self.sent = 0
+        self.last_used = 0.0
+        self.opened = 0  # Nombre de sessions SMTP ouvertes (statistiques)
+
+    def open(self):
+        self.close()
+        self.connection = Connection(self.mail_state).__enter__()
+        self.sent = 0
+        self.opened += 1
+
+    def close(self):
+        if self.connection is None:
+            return
+        try:
+            self.connection.__exit__(None, None, None)
+        except Exception:
+            pass  # Session déjà coupée côté serveur
+        self.connection = None
+
+    def _is_stale(self):
+        return (
+            self.connection is None
+            or self.sent >= self.max_messages
+            or time.monotonic() - self.last_used > self.idle_timeout
+        )
+
+    def send(self, msg):
+        if self._is_stale():
+            self.open()
+        try:
+            self.connection.send(msg)
+        except Exception as e:
+            if not _is_transport_error(e):
+                raise
+            # Reconnexion transparente, un seul nouvel essai
+            self.open()
+            self.connection.send(msg)
+        self.sent += 1
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """
+    Petit pool de connexions SMTP pour le worker d'envoi : un lot de messages est réparti entre `size`
+    connexions envoyant en parallèle (un thread par connexion), sans handshake TLS ni login par message.
+    """
+
+    def __init__(self, app, size=None, max_messages_per_connection=None, idle_timeout=None):
+        self.app = app
+        self.size = max(1, size or app.config.get('MAIL_POOL_SIZE', 2))
+        mail_state = app.extensions['mail']
+        self.connections = [
+            PooledSMTPConnection(
+                mail_state,
+                max_messages=max_messages_per_connection or app.config.get('MAIL_MAX_EMAILS_PER_CONNECTION', 100),
+                idle_timeout=idle_timeout if idle_timeout is not None else app.config.get('MAIL_CONNECTION_IDLE_TIMEOUT', 60)
+            )
+            for _ in range(self.size)
+        ]
+        self._available = queue.LifoQueue()
+        for connection in self.connections:
+            self._available.put(connection)
+        self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix='smtp') if self.size > 1 else None
+
+    @property
+    def sessions_opened(self):
+        return sum(c.opened for c in self.connections)
+
+    def _send_chunk(self, indexed_messages):
+        # Exécuté dans un thread : Flask-Mail a besoin d'un contexte d'application
+        connection = self._available.get()
+        results = []
+        try:
+            with self.app.app_context():
+                for index, msg in indexed_messages:
+                    try:
+                        connection.send(msg)
+                        results.append((index, None))
+                    except Exception as e:
+                        results.append((index, e))
+        finally:
+            self._available.put(connection)
+        return results
+
+    def send_messages(self, messages):
+        """
+        Envoie un lot de flask_mail.Message. Retourne une liste alignée sur `messages` :
+        None si le message est parti, sinon l'exception levée.
+        """
+        indexed = list(enumerate(messages))
+        if not indexed:
+            return []
+        chunks = [indexed[i::self.size] for i in range(self.size) if indexed[i::self.size]]
+
+        if self._executor is None or len(chunks) == 1:
+            outcomes = [self._send_chunk(chunk) for chunk in chunks]
+        else:
+            outcomes = list(self._executor.map(self._send_chunk, chunks))
+
+        errors = [None] * len(messages)
+        for results in outcomes:
+            for index, error in results:
+                errors[index] = error
+        return errors
+
+    def close(self):
+        for connection in self.connections:
+            connection.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
@@ -0,0 +1,357 @@
+"""
+Webhooks FedaPay : accusé de réception immédiat, traitement asynchrone.
+- La route vérifie la signature, enregistre le corps brut dans WebhookEvents et répond 200 : aucune
+  recherche de transaction ni mise à jour de solde pendant la requête HTTP.
+- La contrainte unique (provider, event_id) absorbe les renvois : un webhook déjà reçu est un INSERT
+  refusé, sans autre effet.
+- Le worker (scripts/webhook_worker.py) applique les événements par lots ; l'effet métier et le passage
+  de l'événement en 'processed' sont validés dans la même transaction.
+"""
+import hashlib
+import hmac
+import json
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import or_, and_
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import WebhookEvent
+
+PROVIDER_FEDAPAY = 'fedapay'  # Paiements des passes de visite (/customers/payment/webhook/fedapay)
+PROVIDER_FEDAPAY_PAYOUT = 'fedapay_payout'  # Virements des commissions (/agents/webhooks/fedapay/payout)
+
+# Secret de signature de chaque point d'entrée (config.py)
+SECRET_SETTINGS = {
+    PROVIDER_FEDAPAY: 'FEDAPAY_WEBHOOK_SECRET',
+    PROVIDER_FEDAPAY_PAYOUT: 'FEDAPAY_PAYOUT_WEBHOOK_SECRET',
+}
+
+# Événements appliqués par lot de worker
+WEBHOOK_BATCH_SIZE = 50
+
+# Backoff exponentiel entre deux tentatives : RETRY_BASE_DELAY * 2^(tentative - 1), plafonné
+RETRY_BASE_DELAY = 30
+RETRY_MAX_DELAY = 3600
+# Un événement 'processing' verrouillé depuis plus longtemps est considéré comme abandonné (worker tué) et repris
+LOCK_TIMEOUT = 600
+
+
+class WebhookEventIgnored(Exception):
+    """L'événement n'a rien à appliquer (déjà traité, statut non géré...) : il n'est pas retenté."""
+
+
+# ===================================================================
+# RÉCEPTION
+# ===================================================================
+
+def verify_signature(body, provided_sig, secret):
+    """
+    Vérifie la signature HMAC-SHA256 du corps brut (en-tête X-FEDAPAY-SIGNATURE).
+    Retourne None si elle est valide ou si aucun secret n'est configuré, sinon le code d'erreur.
+    """
+    if not secret:
+        return None
+    if not provided_sig:
+        return 'missing_signature'
+
+    # FedaPay peut envoyer la signature avec un préfixe
+    if provided_sig.startswith('sha256='):
+        provided_sig = provided_sig[len('sha256='):]
+    elif '=' in provided_sig:
+        provided_sig = provided_sig.split('=')[1]
+
+    expected_sig = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(provided_sig.encode(), expected_sig.encode()):
+        return 'invalid_signature'
+    return None
+
+
+def _describe_payment(data):
+    """Retourne (objet transaction, type d'événement). La transaction peut être imbriquée sous 'v1/transaction'."""
+    transaction = data.get('v1/transaction') or data
+    if not transaction.get('id') and not transaction.get('reference') and data.get('id'):
+        transaction = dict(transaction, id=data['id'])
+    return transaction, data.get('name')
+
+
+def _describe_payout(data):
+    """Retourne (objet virement, type d'événement) : payload sous 'data' + 'event', ou à la racine + 'name'."""
+    payout, event = data.get('data'), data.get('event')
+    if not payout or not event:
+        payout, event = data, data.get('name')
+    return payout, event
+
+
+_describers = {
+    PROVIDER_FEDAPAY: _describe_payment,
+    PROVIDER_FEDAPAY_PAYOUT: _describe_payout,
+}
+
+
+def record_webhook_event(provider, event_id, body, event_type=None, object_id=None, object_status=None):
+    """
+    Enregistre l'événement (commit). Retourne (événement, True), ou (événement existant, False) si le même
+    événement a déjà été reçu.
+    """
+    event = WebhookEvent(
+        provider=provider,
+        event_id=event_id,
+        event_type=(event_type or None) and str(event_type)[:100],
+        object_id=str(object_id)[:100],
+        object_status=(object_status or None) and str(object_status)[:50],
+        payload=body.decode('utf-8'),
+        status='pending',
+        attempts=0,
+        next_attempt_at=datetime.utcnow()
+    )
+    db.session.add(event)
+    try:
+        db.session.commit()
+        return event, True
+    except IntegrityError:
+        db.session.rollback()
+        return WebhookEvent.query.filter_by(provider=provider, event_id=event_id).first(), False
+
+
+def ingest_webhook(provider, body, signature):
+    """
+    Vérifie puis enregistre un webhook reçu, sans le traiter. Retourne (réponse JSON, code HTTP).
+    Un même changement de statut d'une transaction ("<id>:<statut>") n'est enregistré qu'une fois.
+    """
+    if not body:
+        return {'status': 'empty_payload'}, 400
+
+    secret = current_app.config.get(SECRET_SETTINGS[provider])
+    if not secret:
+        current_app.logger.warning(f"⚠️ Webhook {provider} : pas de secret configuré ({SECRET_SETTINGS[provider]}), signature non vérifiée")
+    error = verify_signature(body, signature, secret)
+    if error:
+        current_app.logger.warning(f"❌ Webhook {provider} refusé : {error}")
+        return {'status': error}, 401
+
+    try:
+        data = json.loads(body.decode('utf-8'))
+    except (UnicodeDecodeError, ValueError):
+        data = None
+    if not data or not isinstance(data, dict):
+        return {'status': 'invalid_json'}, 400
+
+    obj, event_type = _describers[provider](data)
+    if not isinstance(obj, dict):
+        return {'status': 'invalid_json'}, 400
+    object_id = obj.get('id') or obj.get('reference')
+    if not object_id:
+        current_app.logger.warning(f"❌ Webhook {provider} sans identifiant de transaction")
+        return {'status': 'missing_transaction_id'}, 400
+
+    object_status = str(obj.get('status') or '').lower()
+    event_id = f"{object_id}:{object_status or event_type or 'unknown'}"[:150]
+    event, created = record_webhook_event(provider, event_id, body, event_type, object_id, object_status)
+    if not created:
+        current_app.logger.info(f"♻️ Webhook {provider} {event_id} déjà reçu (événement #{event.id})")
+        return {'status': 'duplicate', 'event_id': event.id}, 200
+
+    current_app.logger.info(f"📥 Webhook {provider} {event_id} enregistré (événement #{event.id})")
+    return {'status': 'received', 'event_id': event.id}, 200
+
+
+# ===================================================================
+# TRAITEMENT (WORKER)
+# ===================================================================
+
+_handlers = {}
+
+
+def webhook_handler(provider):
+    """
+    Décorateur : enregistre la fonction qui applique les événements d'un prestataire. Elle reçoit l'événement
+    et le payload décodé, retourne un résumé de l'effet appliqué et ne fait pas de commit.
+    """
+    def decorator(func):
+        _handlers[provider] = func
+        return func
+    return decorator
+
+
+def claim_webhook_batch(worker_name, batch_size=WEBHOOK_BATCH_SIZE):
+    """
+    Verrouille le prochain lot d'événements à appliquer et retourne leurs ids, dans l'ordre de réception.
+    SELECT ... FOR UPDATE SKIP LOCKED : plusieurs workers peuvent tourner en parallèle.
+    """
+    now = datetime.utcnow()
+    stale_before = now - timedelta(seconds=LOCK_TIMEOUT)
+
+    events = WebhookEvent.query.filter(
+        or_(
+            and_(WebhookEvent.status == 'pending', WebhookEvent.next_attempt_at <= now),
+            and_(WebhookEvent.status == 'processing', WebhookEvent.locked_at < stale_before)
+        )
+    ).order_by(WebhookEvent.received_at, WebhookEvent.id).limit(batch_size).with_for_update(skip_locked=True).all()
+
+    claimed = []
+    for event in events:
+        if event.status == 'processing' and event.attempts >= event.max_attempts:
+            # Worker mort pendant la dernière tentative autorisée
+            event.status = 'failed'
+            event.last_error = (event.last_error or '') + f"\nVerrou expiré ({event.locked_by}) après {event.attempts} tentative(s)."
+            event.locked_at = None
+            event.locked_by = None
+            continue
+        event.status = 'processing'
+        event.locked_at = now
+        event.locked_by = worker_name
+        event.attempts += 1
+        claimed.append(event)
+    db.session.commit()
+    return [event.id for event in claimed]
+
+
+def apply_webhook_event(event_pk):
+    """
+    Applique un événement verrouillé puis le marque 'processed' (même transaction que l'effet métier),
+    'ignored', ou le replanifie (backoff) / le marque 'failed' après max_attempts.
+    Retourne True si l'événement est traité ou ignoré.
+    """
+    event = db.session.get(WebhookEvent, event_pk)
+    handler = _handlers.get(event.provider)
+
+    try:
+        if handler is None:
+            raise LookupError(f"Aucun handler pour les webhooks '{event.provider}'.")
+        result, status = handler(event, json.loads(event.payload)), 'processed'
+    except WebhookEventIgnored as e:
+        db.session.rollback()
+        result, status = str(e), 'ignored'
+    except Exception as e:
+        db.session.rollback()
+        event = db.session.get(WebhookEvent, event_pk)
+        event.last_error = str(e)[-4000:]
+        event.locked_at = None
+        event.locked_by = None
+        if event.attempts >= event.max_attempts:
+            event.status = 'failed'
+            current_app.logger.error(f"❌ Webhook #{event_pk} ({event.provider} {event.event_id}) abandonné après {event.attempts} tentative(s): {e}")
+        else:
+            delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (event.attempts - 1))
+            event.status = 'pending'
+            event.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+            current_app.logger.warning(f"⚠️ Webhook #{event_pk} ({event.provider} {event.event_id}) en échec (tentative {event.attempts}), nouvel essai dans {delay}s: {e}")
+        db.session.commit()
+        return False
+
+    event = db.session.get(WebhookEvent, event_pk)
+    event.status = status
+    event.result = (result or '')[:255]
+    event.processed_at = datetime.utcnow()
+    event.locked_at = None
+    event.locked_by = None
+    event.last_error = None
+    db.session.commit()
+    current_app.logger.info(f"✅ Webhook #{event_pk} ({event.provider} {event.event_id}) {status}: {event.result}")
+    return True
+
+
+def process_webhook_batch(worker_name, batch_size=WEBHOOK_BATCH_SIZE):
+    """Applique au plus un lot. Retourne (nb d'événements traités, nb d'événements appliqués ou ignorés)."""
+    event_ids = claim_webhook_batch(worker_name, batch_size)
+    done = sum(1 for event_pk in event_ids if apply_webhook_event(event_pk))
+    return len(event_ids), done
+
+
+def requeue_failed_events():
+    """Remet en file les événements en échec (transaction locale créée entre-temps, par exemple). N'effectue pas de commit."""
+    return WebhookEvent.query.filter(WebhookEvent.status == 'failed').update({
+        WebhookEvent.status: 'pending',
+        WebhookEvent.attempts: 0,
+        WebhookEvent.next_attempt_at: datetime.utcnow()
+    }, synchronize_session=False)
+
+
+# ===================================================================
+# HANDLERS
+# ===================================================================
+
+@webhook_handler(PROVIDER_FEDAPAY)
+def _apply_visit_pass_payment(event, data):
+    """Paiement de passes de visite (initiate_visit_pass_payment) : crédite les passes une seule fois."""
+    from app.models import Transaction, ServiceFee, User
+
+    status = event.object_status
+    if status not in ('approved', 'declined', 'canceled', 'failed'):
+        raise WebhookEventIgnored(f"Statut non géré: {status}")
+
+    txn = Transaction.query.filter_by(related_entity_id=str(event.object_id)).with_for_update().first()
+    if status != 'approved':
+        if txn is None or 'En attente' not in (txn.description or ''):
+            raise WebhookEventIgnored(f"Paiement {status} sans transaction en attente")
+        txn.description = f'Paiement {status}'
+        return f"Transaction #{txn.id} marquée {status}"
+
+    if txn is None:
+        # La transaction locale peut ne pas encore être validée : l'événement est retenté
+        raise LookupError(f"Transaction locale {event.object_id} introuvable")
+    if 'validé' in (txn.description or ''):
+        raise WebhookEventIgnored(f"Transaction #{txn.id} déjà validée")
+    if 'Abonnement' in (txn.description or ''):
+        # Abonnements owner/agent : activés par /purchase-subscription, pas de passes à créditer
+        raise WebhookEventIgnored(f"Transaction #{txn.id} d'abonnement")
+
+    fee = ServiceFee.query.filter_by(service_key='visit_pass_purchase').first()
+    if fee is None:
+        raise LookupError("ServiceFee 'visit_pass_purchase' introuvable")
+
+    quantity = int(txn.amount / fee.amount)
+    credited = User.query.filter_by(id=txn.user_id).update(
+        {User.visit_passes: User.visit_passes + quantity}, synchronize_session=False
+    )
+    if not credited:
+        raise LookupError(f"Utilisateur {txn.user_id} introuvable")
+    txn.description = f'Achat de {quantity} passe(s) validé'
+    return f"+{quantity} passe(s) pour l'utilisateur {txn.user_id}"
+
+
+@webhook_handler(PROVIDER_FEDAPAY_PAYOUT)
+def _apply_commission_payout(event, data):
+    """Virement des commissions d'un agent : confirme le débit du portefeuille et solde les commissions une seule fois."""
+    from app.models import PayoutRequest, Commission, Transaction
+    from app.utils.ledger import settle_payout, release_payout
+
+    status = event.object_status
+    if status not in ('approved', 'declined', 'failed'):
+        raise WebhookEventIgnored(f"Statut non géré: {status}")
+
+    payout_request = PayoutRequest.query.filter_by(
+        fedapay_transaction_id=str(event.object_id)
+    ).with_for_update().first()
+    if payout_request is None:
+        raise LookupError(f"Demande de versement introuvable pour la transaction FedaPay {event.object_id}")
+    if payout_request.status in ('completed', 'failed'):
+        raise WebhookEventIgnored(f"Versement #{payout_request.id} déjà {payout_request.status}")
+
+    if status != 'approved':
+        payout, _ = _describe_payout(data)
+        payout_request.status = 'failed'
+        payout_request.error_message = payout.get('last_error_message', 'Versement échoué par FedaPay')
+        release_payout(payout_request)  # Montant réservé à la demande recrédité
+        return f"Versement #{payout_request.id} échoué: {payout_request.error_message}"
+
+    # Débité à la demande ; les demandes antérieures au grand livre le sont ici
+    settle_payout(payout_request)
+    payout_request.status = 'completed'
+    payout_request.completed_at = datetime.utcnow()
+    payout_request.actual_amount = payout_request.requested_amount  # On suppose que le montant versé est celui demandé
+
+    # Marquer toutes les commissions 'pending' comme 'paid'
+    updated_commissions = Commission.query.filter(
+        Commission.agent_id == payout_request.agent_id,
+        Commission.status == 'pending'
+    ).update({'status': 'paid'}, synchronize_session=False)
+
+    db.session.add(Transaction(
+        user_id=payout_request.agent_id,
+        amount=-payout_request.actual_amount,  # Montant négatif car c'est un retrait
+        type='commission_payout',
+        description=f'Virement FedaPay (Payout #{payout_request.id})',
+        related_entity_id=str(payout_request.id)
+    ))
+    return f"Versement #{payout_request.id} effectué ({updated_commissions} commission(s) payée(s))"
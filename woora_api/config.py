@@ -50,9 +50,39 @@ class Config:
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER') or os.environ.get('MAIL_USERNAME') or 'noreply@example.com'
     MAIL_MAX_EMAILS = None
     MAIL_ASCII_ATTACHMENTS = False
+    # Worker d'envoi (scripts/email_worker.py) : connexions SMTP authentifiées réutilisées entre les messages
+    MAIL_POOL_SIZE = int(os.environ.get('MAIL_POOL_SIZE') or 2)
+    MAIL_MAX_EMAILS_PER_CONNECTION = int(os.environ.get('MAIL_MAX_EMAILS_PER_CONNECTION') or 100)
+    MAIL_CONNECTION_IDLE_TIMEOUT = int(os.environ.get('MAIL_CONNECTION_IDLE_TIMEOUT') or 60)  # secondes
+
+    # Client HTTP sortant (app/utils/http_client.py) : FedaPay, Nominatim
+    HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT') or 5)  # secondes
+    HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT') or 30)  # secondes, si l'appel n'en précise pas
+    HTTP_MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES') or 2)
+    HTTP_RETRY_BACKOFF = float(os.environ.get('HTTP_RETRY_BACKOFF') or 0.5)  # secondes, doublé à chaque essai (jitter)
+    HTTP_RETRY_MAX_BACKOFF = float(os.environ.get('HTTP_RETRY_MAX_BACKOFF') or 4.0)
+    HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE') or 10)  # connexions keep-alive par hôte
+    HTTP_SLOW_REQUEST_THRESHOLD = float(os.environ.get('HTTP_SLOW_REQUEST_THRESHOLD') or 2.0)  # secondes
+
+    # Cache des réponses Nominatim (app/geocoding/cache.py) : LRU en mémoire par worker + table GeocodingCache
+    GEOCODING_CACHE_SIZE = int(os.environ.get('GEOCODING_CACHE_SIZE') or 4096)  # entrées en mémoire
+    GEOCODING_MEMORY_TTL = int(os.environ.get('GEOCODING_MEMORY_TTL') or 3600)  # secondes
+    GEOCODING_CACHE_TTL = int(os.environ.get('GEOCODING_CACHE_TTL') or 30 * 24 * 3600)  # secondes, en base
+    GEOCODING_NEGATIVE_TTL = int(os.environ.get('GEOCODING_NEGATIVE_TTL') or 24 * 3600)  # réponses vides
+    GEOCODING_REVERSE_PRECISION = int(os.environ.get('GEOCODING_REVERSE_PRECISION') or 4)  # décimales des coordonnées
+    # Appels Nominatim (app/geocoding/client.py) : quota partagé par tous les workers, 1 requête/s (politique publique)
+    NOMINATIM_BASE_URL = os.environ.get('NOMINATIM_BASE_URL') or 'https://nominatim.openstreetmap.org'
+    NOMINATIM_RATE_LIMIT = float(os.environ.get('NOMINATIM_RATE_LIMIT') or 1.0)  # requêtes/seconde
+    NOMINATIM_BURST = int(os.environ.get('NOMINATIM_BURST') or 1)
+    NOMINATIM_MAX_WAIT = float(os.environ.get('NOMINATIM_MAX_WAIT') or 1.0)  # secondes d'attente d'un jeton avant de servir le cache périmé
+    # Gazetteer hors ligne de l'autocomplétion (app/geocoding/gazetteer.py, construit par scripts/build_gazetteer.py)
+    GEOCODING_GAZETTEER_PATH = os.environ.get('GEOCODING_GAZETTEER_PATH') or os.path.join(_basedir, 'data', 'gazetteer.tsv.gz')
 
     # Configuration Cloudinary (Géré automatiquement par CLOUDINARY_URL)
     # Plus besoin de clés explicites ici si .env est correct
     #Paiement
     FEDAPAY_SECRET_KEY = os.environ.get('FEDAPAY_SECRET_KEY')
     FEDAPAY_PUBLIC_KEY = os.environ.get('FEDAPAY_PUBLIC_KEY')
+    # Secrets de signature des webhooks (X-FEDAPAY-SIGNATURE) ; sans secret, la signature n'est pas vérifiée
+    FEDAPAY_WEBHOOK_SECRET = os.environ.get('FEDAPAY_WEBHOOK_SECRET')  # /customers/payment/webhook/fedapay
+    FEDAPAY_PAYOUT_WEBHOOK_SECRET = os.environ.get('FEDAPAY_PAYOUT_WEBHOOK_SECRET')  # /agents/webhooks/fedapay/payout
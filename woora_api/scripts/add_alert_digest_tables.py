@@ -0,0 +1,91 @@
+"""
+Migration : digests des emails d'alerte
+=======================================
+- table AlertDigests ;
+- colonne Users.alert_digest_frequency ('instant' par défaut : un email par matching, comme avant) ;
+- colonnes PropertyRequestMatches.notified_at / digest_id + index.
+Les matches existants ont déjà été notifiés un par un : notified_at est initialisé à created_at pour
+qu'aucun digest ne les renvoie.
+
+Usage:
+    Depuis le dossier woora_api/ :
+    python scripts/add_alert_digest_tables.py
+"""
+
+import sys
+import os
+
+from dotenv import load_dotenv
+
+# Ajouter le dossier parent au path pour importer l'app Flask
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Charger les variables d'environnement
+load_dotenv()
+
+from app import create_app, db
+from app.models import AlertDigest
+from sqlalchemy import text
+
+
+def run_migration():
+    app = create_app()
+    with app.app_context():
+        inspector = db.inspect(db.engine)
+
+        print("Vérification de la table AlertDigests...")
+        if 'AlertDigests' not in inspector.get_table_names():
+            AlertDigest.__table__.create(db.engine)
+            print("✅ Table 'AlertDigests' créée.")
+        else:
+            print("ℹ️ La table 'AlertDigests' existe déjà.")
+
+        print("Vérification de la table Users...")
+        user_columns = [c['name'] for c in inspector.get_columns('Users')]
+        if 'alert_digest_frequency' not in user_columns:
+            db.session.execute(text(
+                "ALTER TABLE Users ADD COLUMN alert_digest_frequency "
+                "ENUM('instant', 'hourly', 'daily') NOT NULL DEFAULT 'instant'"
+            ))
+            db.session.commit()
+            print("✅ Colonne 'alert_digest_frequency' ajoutée.")
+        else:
+            print("ℹ️ La colonne 'alert_digest_frequency' existe déjà.")
+
+        print("Vérification de la table PropertyRequestMatches...")
+        match_columns = [c['name'] for c in inspector.get_columns('PropertyRequestMatches')]
+        match_indexes = [i['name'] for i in inspector.get_indexes('PropertyRequestMatches')]
+
+        if 'notified_at' not in match_columns:
+            db.session.execute(text("ALTER TABLE PropertyRequestMatches ADD COLUMN notified_at DATETIME NULL"))
+            db.session.commit()
+            print("✅ Colonne 'notified_at' ajoutée.")
+
+            # Les matches existants ont déjà reçu leur email unitaire
+            backfilled = db.session.execute(text(
+                "UPDATE PropertyRequestMatches SET notified_at = COALESCE(created_at, NOW()) WHERE notified_at IS NULL"
+            )).rowcount
+            db.session.commit()
+            print(f"✅ {backfilled} match(es) existant(s) marqué(s) comme notifié(s).")
+        else:
+            print("ℹ️ La colonne 'notified_at' existe déjà.")
+
+        if 'digest_id' not in match_columns:
+            db.session.execute(text("ALTER TABLE PropertyRequestMatches ADD COLUMN digest_id INT NULL"))
+            db.session.execute(text(
+                "ALTER TABLE PropertyRequestMatches ADD CONSTRAINT fk_match_digest "
+                "FOREIGN KEY (digest_id) REFERENCES AlertDigests (id) ON DELETE SET NULL"
+            ))
+            db.session.commit()
+            print("✅ Colonne 'digest_id' ajoutée.")
+        else:
+            print("ℹ️ La colonne 'digest_id' existe déjà.")
+
+        if 'idx_match_notified_at' not in match_indexes:
+            db.session.execute(text("CREATE INDEX idx_match_notified_at ON PropertyRequestMatches (notified_at)"))
+            db.session.commit()
+            print("✅ Index 'idx_match_notified_at' créé.")
+
+
+if __name__ == '__main__':
+    run_migration()
@@ -0,0 +1,74 @@
+"""
+Migration : tables du géocodage
+===============================
+- GeocodingCache : cache persistant des réponses Nominatim (app/geocoding/cache.py) ;
+- RateLimitBuckets : quota d'appels à Nominatim partagé par les workers (app/geocoding/client.py) ;
+  tokens/updated_at en DOUBLE (une table créée en FLOAT simple précision est convertie).
+
+Usage:
+    Depuis le dossier woora_api/ :
+    python scripts/add_geocoding_cache_table.py
+
+    Supprimer les entrées expirées depuis plus de 30 jours (à lancer de temps en temps, cron) :
+    python scripts/add_geocoding_cache_table.py --purge
+"""
+
+import sys
+import os
+import argparse
+
+from dotenv import load_dotenv
+
+# Ajouter le dossier parent au path pour importer l'app Flask
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Charger les variables d'environnement
+load_dotenv()
+
+from app import create_app, db
+from app.models import GeocodingCacheEntry, RateLimitBucket
+from app.geocoding.cache import purge_expired_entries
+from sqlalchemy import text
+
+
+def run_migration(purge=False):
+    app = create_app()
+    with app.app_context():
+        inspector = db.inspect(db.engine)
+        tables = inspector.get_table_names()
+        for model in (GeocodingCacheEntry, RateLimitBucket):
+            name = model.__tablename__
+            print(f"Vérification de la table {name}...")
+            if name not in tables:
+                model.__table__.create(db.engine)
+                print(f"✅ Table '{name}' créée.")
+            else:
+                print(f"ℹ️ La table '{name}' existe déjà.")
+
+        # Première version de RateLimitBuckets : colonnes FLOAT simple précision, l'horodatage epoch y était
+        # arrondi à ~128 s près et le quota de 1 requête/s n'était plus respecté
+        if RateLimitBucket.__tablename__ in tables and db.engine.dialect.name == 'mysql':
+            columns = {c['name']: c['type'] for c in inspector.get_columns(RateLimitBucket.__tablename__)}
+            if any(type(columns[name]).__name__.upper() != 'DOUBLE' for name in ('tokens', 'updated_at')):
+                print(f"Passage de {RateLimitBucket.__tablename__}.tokens/updated_at en DOUBLE...")
+                db.session.execute(text(
+                    f"ALTER TABLE {RateLimitBucket.__tablename__} "
+                    "MODIFY tokens DOUBLE NOT NULL, MODIFY updated_at DOUBLE NOT NULL"
+                ))
+                db.session.commit()
+                print("✅ Colonnes converties en DOUBLE.")
+            else:
+                print("ℹ️ Colonnes tokens/updated_at déjà en DOUBLE.")
+
+        if purge:
+            deleted = purge_expired_entries()
+            db.session.commit()
+            print(f"✅ {deleted} entrée(s) expirée(s) supprimée(s).")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Tables du géocodage')
+    parser.add_argument('--purge', action='store_true', help='Supprimer les entrées expirées')
+    args = parser.parse_args()
+
+    run_migration(purge=args.purge)
@@ -0,0 +1,94 @@
+"""
+Migration : grand livre des portefeuilles
+=========================================
+- tables LedgerEntries et LedgerBalanceSnapshots (app/utils/ledger.py) ; colonne
+  LedgerBalanceSnapshots.entry_count si la table existe sans elle (les snapshots existants sont
+  tous recalculés au prochain passage de scripts/snapshot_ledger_balances.py) ;
+- reprise de l'existant (--backfill) : pour chaque agent, les commissions 'paid' et les virements
+  'completed' sont inscrits au grand livre sans toucher Users.wallet_balance, puis un mouvement
+  d'ouverture ('opening:<user_id>') aligne le solde du grand livre sur wallet_balance.
+  Les virements 'pending' / 'processing' ne sont pas réservés : ils seront débités à la confirmation.
+La reprise est idempotente (clés uniques des mouvements) : elle peut être relancée.
+
+Usage:
+    Depuis le dossier woora_api/ :
+    python scripts/add_ledger_tables.py
+    python scripts/add_ledger_tables.py --backfill
+"""
+
+import sys
+import os
+import argparse
+from decimal import Decimal
+
+from dotenv import load_dotenv
+
+# Ajouter le dossier parent au path pour importer l'app Flask
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Charger les variables d'environnement
+load_dotenv()
+
+from app import create_app, db
+from app.models import LedgerEntry, LedgerBalanceSnapshot, User, Commission, PayoutRequest
+from app.utils.ledger import (
+    credit_commission, settle_payout, post_transaction, wallet_summary, wallet_account, OPENING_BALANCES_ACCOUNT
+)
+from sqlalchemy import text
+
+
+def backfill_agent(agent):
+    """Inscrit l'historique d'un agent au grand livre. Retourne le montant du mouvement d'ouverture."""
+    for commission in Commission.query.filter_by(agent_id=agent.id, status='paid'):
+        credit_commission(commission, description='Reprise', apply_balances=False)
+    for payout_request in PayoutRequest.query.filter_by(agent_id=agent.id, status='completed'):
+        settle_payout(payout_request, apply_balances=False)
+
+    residual = Decimal(str(agent.wallet_balance or 0)) - wallet_summary(agent.id)['balance']
+    if residual:
+        post_transaction(f'opening:{agent.id}', 'opening', [
+            (wallet_account(agent.id), residual, agent.id),
+            (OPENING_BALANCES_ACCOUNT, -residual, None),
+        ], description="Solde d'ouverture", apply_balances=False)
+    return residual
+
+
+def run_migration(backfill=False):
+    app = create_app()
+    with app.app_context():
+        inspector = db.inspect(db.engine)
+        tables = inspector.get_table_names()
+        for model in (LedgerEntry, LedgerBalanceSnapshot):
+            name = model.__tablename__
+            print(f"Vérification de la table {name}...")
+            if name not in tables:
+                model.__table__.create(db.engine)
+                print(f"✅ Table '{name}' créée.")
+            else:
+                print(f"ℹ️ La table '{name}' existe déjà.")
+
+        snapshot_columns = [c['name'] for c in inspector.get_columns(LedgerBalanceSnapshot.__tablename__)]
+        if 'entry_count' not in snapshot_columns:
+            print("Ajout de la colonne LedgerBalanceSnapshots.entry_count...")
+            db.session.execute(text("ALTER TABLE LedgerBalanceSnapshots ADD COLUMN entry_count INT NOT NULL DEFAULT 0"))
+            # Ligne de filigrane de l'ancienne version des snapshots
+            db.session.execute(text("DELETE FROM LedgerBalanceSnapshots WHERE account = '_snapshot_watermark'"))
+            db.session.commit()
+            print("✅ Colonne 'entry_count' ajoutée.")
+
+        if backfill:
+            agents = User.query.filter_by(role='agent').all()
+            adjusted = 0
+            for agent in agents:
+                if backfill_agent(agent):
+                    adjusted += 1
+                db.session.commit()
+            print(f"✅ {len(agents)} agent(s) repris au grand livre ({adjusted} mouvement(s) d'ouverture).")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Grand livre des portefeuilles')
+    parser.add_argument('--backfill', action='store_true', help="Reprendre l'historique des agents")
+    args = parser.parse_args()
+
+    run_migration(backfill=args.backfill)
@@ -0,0 +1,53 @@
+import sys
+import os
+
+from dotenv import load_dotenv
+
+# Ajouter le dossier parent au path pour importer l'app Flask
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Charger les variables d'environnement
+load_dotenv()
+
+from app import create_app, db
+from app.models import PropertyRequestMatch
+from sqlalchemy import text, func
+
+def run_migration():
+    app = create_app()
+    with app.app_context():
+        print("Vérification de la table PropertyRequestMatches...")
+        inspector = db.inspect(db.engine)
+        indexes = [i['name'] for i in inspector.get_indexes('PropertyRequestMatches')]
+
+        if 'uq_request_property_match' in indexes:
+            print("ℹ️ L'index unique 'uq_request_property_match' existe déjà.")
+            return
+
+        # 1. Suppression des doublons existants (on garde le match le plus ancien de chaque couple)
+        duplicates = db.session.query(
+            PropertyRequestMatch.property_request_id, PropertyRequestMatch.property_id, func.min(PropertyRequestMatch.id)
+        ).group_by(
+            PropertyRequestMatch.property_request_id, PropertyRequestMatch.property_id
+        ).having(func.count(PropertyRequestMatch.id) > 1).all()
+
+        removed = 0
+        for request_id, property_id, keep_id in duplicates:
+            removed += PropertyRequestMatch.query.filter(
+                PropertyRequestMatch.property_request_id == request_id,
+                PropertyRequestMatch.property_id == property_id,
+                PropertyRequestMatch.id != keep_id
+            ).delete(synchronize_session=False)
+        db.session.commit()
+        print(f"✅ {removed} match(s) en double supprimé(s).")
+
+        # 2. Index unique
+        print("Création de l'index unique 'uq_request_property_match'...")
+        db.session.execute(text(
+            "CREATE UNIQUE INDEX uq_request_property_match ON PropertyRequestMatches (property_request_id, property_id)"
+        ))
+        db.session.commit()
+        print("✅ Index unique 'uq_request_property_match' créé avec succès.")
+
+if __name__ == '__main__':
+    run_migration()
@@ -0,0 +1,51 @@
+import sys
+import os
+
+from dotenv import load_dotenv
+
+# Ajouter le dossier parent au path pour importer l'app Flask
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Charger les variables d'environnement
+load_dotenv()
+
+from app import create_app, db
+from app.models import PropertySearchIndex
+from app.utils.geo_utils import encode_geohash
+from sqlalchemy import text
+
+def run_migration():
+    app = create_app()
+    with app.app_context():
+        print("Vérification de la table PropertySearchIndex...")
+        inspector = db.inspect(db.engine)
+        columns = [c['name'] for c in inspector.get_columns('PropertySearchIndex')]
+        indexes = [i['name'] for i in inspector.get_indexes('PropertySearchIndex')]
+
+        if 'geohash' not in columns:
+            print("Ajout de la colonne 'geohash' à PropertySearchIndex...")
+            db.session.execute(text("ALTER TABLE PropertySearchIndex ADD COLUMN geohash VARCHAR(12) NULL"))
+            db.session.commit()
+            print("✅ Colonne 'geohash' ajoutée avec succès.")
+        else:
+            print("ℹ️ La colonne 'geohash' existe déjà.")
+
+        if 'idx_psi_geohash' not in indexes:
+            db.session.execute(text("CREATE INDEX idx_psi_geohash ON PropertySearchIndex (geohash)"))
+            print("✅ Index 'idx_psi_geohash' créé.")
+        if 'idx_psi_lat_lng' not in indexes:
+            db.session.execute(text("CREATE INDEX idx_psi_lat_lng ON PropertySearchIndex (latitude, longitude)"))
+            print("✅ Index 'idx_psi_lat_lng' créé.")
+        db.session.commit()
+
+        print("Calcul des geohash des biens indexés...")
+        updated = 0
+        for entry in PropertySearchIndex.query.filter(PropertySearchIndex.geohash == None).all():
+            entry.geohash = encode_geohash(entry.latitude, entry.longitude)
+            if entry.geohash:
+                updated += 1
+        db.session.commit()
+        print(f"✅ {updated} geohash calculés.")
+
+if __name__ == '__main__':
+    run_migration()
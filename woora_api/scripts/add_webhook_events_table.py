@@ -0,0 +1,41 @@
+"""
+Migration : table WebhookEvents
+===============================
+Webhooks FedaPay enregistrés par les routes (réponse immédiate) puis appliqués par
+scripts/webhook_worker.py ; la contrainte unique (provider, event_id) écarte les renvois.
+
+Usage:
+    Depuis le dossier woora_api/ :
+    python scripts/add_webhook_events_table.py
+"""
+
+import sys
+import os
+
+from dotenv import load_dotenv
+
+# Ajouter le dossier parent au path pour importer l'app Flask
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Charger les variables d'environnement
+load_dotenv()
+
+from app import create_app, db
+from app.models import WebhookEvent
+
+
+def run_migration():
+    app = create_app()
+    with app.app_context():
+        inspector = db.inspect(db.engine)
+        name = WebhookEvent.__tablename__
+        print(f"Vérification de la table {name}...")
+        if name not in inspector.get_table_names():
+            WebhookEvent.__table__.create(db.engine)
+            print(f"✅ Table '{name}' créée.")
+        else:
+            print(f"ℹ️ La table '{name}' existe déjà.")
+
+
+if __name__ == '__main__':
+    run_migration()
@@ -23,6 +23,10 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from app import create_app, db
 from app.models import Property, PropertyValue
 from app.utils.eav_utils import save_property_eav_values
+from app.utils.attribute_resolver import get_attribute_resolver
+from sqlalchemy import func
+
+BATCH_SIZE = 100
 
 def run_backfill(apply=False):
     app = create_app()
@@ -34,6 +38,14 @@ def run_backfill(apply=False):
         total = len(all_props)
         migrated = 0
         skipped = 0
+        pending_in_batch = 0
+
+        # Chargés une seule fois pour tout le backfill (au lieu d'une requête par bien)
+        resolver = get_attribute_resolver()
+        eav_counts = dict(
+            db.session.query(PropertyValue.property_id, func.count(PropertyValue.id))
+            .group_by(PropertyValue.property_id).all()
+        )
         
         print(f"\n{'='*60}")
         print(f"  Biens avec colonne JSON attributes : {total}")
@@ -46,7 +58,7 @@ def run_backfill(apply=False):
                 continue
             
             # Vérifier si ce bien a déjà des données EAV
-            existing_eav_count = PropertyValue.query.filter_by(property_id=prop.id).count()
+            existing_eav_count = eav_counts.get(prop.id, 0)
             
             if existing_eav_count > 0:
                 print(f"  [SKIP]  Property #{prop.id} '{prop.title[:40]}' - déjà {existing_eav_count} valeurs EAV")
@@ -57,16 +69,24 @@ def run_backfill(apply=False):
             
             if apply:
                 try:
-                    save_property_eav_values(prop.id, prop.attributes)
-                    db.session.commit()
+                    # Savepoint : une erreur sur un bien n'annule pas le reste du lot
+                    with db.session.begin_nested():
+                        save_property_eav_values(prop.id, prop.attributes, resolver=resolver)
                     migrated += 1
+                    pending_in_batch += 1
                     print(f"           ✓ Migré avec succès")
                 except Exception as e:
-                    db.session.rollback()
                     print(f"           ✗ ERREUR: {e}")
+
+                if pending_in_batch >= BATCH_SIZE:
+                    db.session.commit()
+                    pending_in_batch = 0
             else:
                 # Dry run - simuler ce qui serait fait
                 migrated += 1
+
+        if apply:
+            db.session.commit()
         
         print(f"\n{'='*60}")
         print(f"  Biens migrés (ou à migrer) : {migrated}")
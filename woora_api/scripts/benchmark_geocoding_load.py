@@ -0,0 +1,183 @@
+"""
+Test de charge de l'autocomplétion contre un faux serveur Nominatim local
+=========================================================================
+Démarre un faux Nominatim (latence configurable, comptage des appels), puis envoie la même rafale de
+frappes concurrentes (plusieurs utilisateurs tapant les mêmes préfixes) de deux façons :
+- Avant : chaque thread appelle Nominatim directement (ancien comportement de autocomplete_address) ;
+- Après : chaque thread appelle GET /geocoding/autocomplete (cache, single-flight, quota partagé).
+Affiche les latences p50 / p95 / p99 / max, le nombre d'appels reçus par le faux Nominatim et le pic
+d'appels sur une seconde (la politique publique autorise 1 requête/seconde).
+
+Utilise une base SQLite temporaire (tables GeocodingCache et RateLimitBuckets) et désactive le
+gazetteer : ni la base de production ni le vrai Nominatim ne sont touchés.
+
+Usage:
+    Depuis le dossier woora_api/ :
+    python scripts/benchmark_geocoding_load.py
+
+    Options :
+    --threads 32              utilisateurs simultanés
+    --requests 600            frappes envoyées par scénario
+    --upstream-latency 0.3    latence simulée de Nominatim (secondes)
+    --rate-limit 1            quota Nominatim (requêtes/seconde)
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import tempfile
+import argparse
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+# Ajouter le dossier parent au path pour importer l'app Flask
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+_database_file = os.path.join(tempfile.mkdtemp(prefix='woora_geocoding_'), 'benchmark.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{_database_file}'
+
+from config import Config
+# Options de pool MySQL non applicables à SQLite
+Config.SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 30}}
+
+import requests
+from app import create_app, db, limiter
+
+CITIES = [
+    'Cotonou', 'Porto-Novo', 'Parakou', 'Abomey-Calavi', 'Abomey', 'Bohicon', 'Djougou', 'Kandi',
+    'Lokossa', 'Ouidah', 'Natitingou', 'Savalou', 'Malanville', 'Nikki', 'Pobè', 'Kétou', 'Dassa-Zoumé',
+]
+# Préfixes tapés par les utilisateurs (plusieurs frappes successives par ville)
+PREFIXES = sorted({city[:n] for city in CITIES for n in range(2, min(len(city), 7) + 1)})
+
+
+class _FakeNominatim(BaseHTTPRequestHandler):
+    latency = 0.3
+    calls = []
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            self.calls.append(time.monotonic())
+        time.sleep(self.latency)
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path == '/search':
+            query = params.get('q', '').lower()
+            payload = [
+                {'address': {'city': city, 'country': 'Bénin'}, 'lat': '6.4', 'lon': '2.4', 'type': 'city',
+                 'osm_id': i, 'display_name': f'{city}, Bénin'}
+                for i, city in enumerate(CITIES) if city.lower().startswith(query)
+            ]
+        else:
+            payload = {'display_name': 'Cotonou, Bénin', 'address': {'city': 'Cotonou', 'country': 'Bénin'}}
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def _peak_per_second(calls):
+    calls = sorted(calls)
+    peak, start = 0, 0
+    for end, t in enumerate(calls):
+        while t - calls[start] >= 1.0:
+            start += 1
+        peak = max(peak, end - start + 1)
+    return peak
+
+
+def _run(label, send, keystrokes, threads):
+    _FakeNominatim.calls.clear()
+    latencies, empty = [], Counter()
+
+    def one(prefix):
+        started = time.perf_counter()
+        count = send(prefix)
+        latencies.append(time.perf_counter() - started)
+        if not count:
+            empty['empty'] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, keystrokes))
+    elapsed = time.perf_counter() - started
+
+    ms = [l * 1000 for l in latencies]
+    print(f"  {label:<10} p50 {_percentile(ms, 50):7.1f} ms | p95 {_percentile(ms, 95):7.1f} ms | "
+          f"p99 {_percentile(ms, 99):7.1f} ms | max {max(ms):7.1f} ms | durée {elapsed:5.1f}s")
+    print(f"  {'':<10} appels Nominatim : {len(_FakeNominatim.calls)} "
+          f"(pic {_peak_per_second(_FakeNominatim.calls)}/s), réponses vides : {empty['empty']}")
+
+
+def run_benchmark(threads=32, request_count=600, upstream_latency=0.3, rate_limit=1.0, seed=1):
+    _FakeNominatim.latency = upstream_latency
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _FakeNominatim)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_address[1]}'
+
+    app = create_app()
+    app.config.update(NOMINATIM_BASE_URL=base_url, NOMINATIM_RATE_LIMIT=rate_limit, GEOCODING_GAZETTEER_PATH=None)
+    # Toutes les frappes viennent de la même adresse : la limite par IP de l'API fausserait la mesure
+    limiter.enabled = False
+    with app.app_context():
+        db.create_all()
+
+    random.seed(seed)
+    # Les frappes se concentrent sur quelques villes populaires (distribution de Zipf approximative)
+    weights = [1 / (CITIES.index(next(c for c in CITIES if c.startswith(p))) + 1) for p in PREFIXES]
+    keystrokes = random.choices(PREFIXES, weights=weights, k=request_count)
+
+    print(f"\n{'='*60}")
+    print(f"  Faux Nominatim : {base_url} (latence {upstream_latency}s)")
+    print(f"  {request_count} frappes, {threads} utilisateurs simultanés, {len(set(keystrokes))} préfixes distincts")
+    print(f"  Quota : {rate_limit} requête(s)/s")
+    print(f"{'='*60}\n")
+
+    def before(prefix):
+        response = requests.get(f'{base_url}/search', params={'q': prefix, 'countrycodes': 'BJ', 'format': 'json',
+                                                               'addressdetails': 1, 'limit': 50}, timeout=5)
+        return len(response.json())
+
+    client = app.test_client()
+
+    def after(prefix):
+        return client.get('/geocoding/autocomplete', query_string={'q': prefix, 'country': 'BJ'}).get_json()['count']
+
+    _run('Avant', before, keystrokes, threads)
+    _run('Après', after, keystrokes, threads)
+    # Deuxième rafale : les préfixes sont en cache
+    _run('Après (2)', after, keystrokes, threads)
+
+    server.shutdown()
+    print()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Test de charge de l'autocomplétion (faux Nominatim local)")
+    parser.add_argument('--threads', type=int, default=32, help='Utilisateurs simultanés')
+    parser.add_argument('--requests', type=int, default=600, help='Frappes envoyées par scénario')
+    parser.add_argument('--upstream-latency', type=float, default=0.3, help='Latence simulée de Nominatim (s)')
+    parser.add_argument('--rate-limit', type=float, default=1.0, help='Quota Nominatim (requêtes/seconde)')
+    args = parser.parse_args()
+
+    run_benchmark(threads=args.threads, request_count=args.requests,
+                  upstream_latency=args.upstream_latency, rate_limit=args.rate_limit)
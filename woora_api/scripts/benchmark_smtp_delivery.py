@@ -0,0 +1,144 @@
+"""
+Benchmark de l'envoi SMTP : une session par message (mail.send) vs pool de connexions (SMTPConnectionPool)
+========================================================================================================
+Démarre un serveur SMTP local (aiosmtpd) qui simule le coût d'ouverture d'une session (TLS + login
+sur Gmail) par une latence sur EHLO, puis envoie le même lot de messages des deux façons.
+N'utilise ni la base de données ni le vrai serveur SMTP.
+
+Prérequis (outil de dev, pas une dépendance de l'API ; aiosmtpd est listé dans requirements-dev.txt) :
+    Depuis le dossier woora_api/ :
+    pip install -r requirements-dev.txt
+
+Usage:
+    Depuis le dossier woora_api/ :
+    python scripts/benchmark_smtp_delivery.py
+
+    Options :
+    --messages 300             nombre de messages envoyés par scénario
+    --session-latency 0.15     latence simulée à l'ouverture d'une session SMTP (secondes)
+    --connections 2            connexions du pool
+    --max-per-connection 100   messages par session avant renouvellement
+"""
+
+import sys
+import os
+import time
+import socket
+import asyncio
+import argparse
+
+# Ajouter le dossier parent au path pour importer l'app Flask
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from flask import Flask
+from flask_mail import Mail, Message
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    print("❌ aiosmtpd n'est pas installé : pip install -r requirements-dev.txt")
+    sys.exit(1)
+
+from app.utils.smtp_pool import SMTPConnectionPool
+
+
+class _CountingHandler:
+    """Compte les sessions et messages reçus ; retarde EHLO pour simuler handshake TLS + authentification."""
+
+    def __init__(self, session_latency):
+        self.session_latency = session_latency
+        self.sessions = 0
+        self.messages = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        await asyncio.sleep(self.session_latency)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages += 1
+        return '250 Message accepted for delivery'
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _build_app(port, max_per_connection):
+    app = Flask(__name__)
+    app.config.update(
+        MAIL_SERVER='127.0.0.1', MAIL_PORT=port, MAIL_USE_TLS=False, MAIL_USE_SSL=False,
+        MAIL_USERNAME=None, MAIL_PASSWORD=None, MAIL_DEFAULT_SENDER='noreply@woorabuilding.com',
+        MAIL_MAX_EMAILS_PER_CONNECTION=max_per_connection, MAIL_CONNECTION_IDLE_TIMEOUT=60
+    )
+    return app, Mail(app)
+
+
+def _messages(count):
+    return [
+        Message(
+            f'Nouveau bien correspondant à votre recherche #{i}',
+            recipients=[f'seeker{i}@example.com'],
+            html=f'<p>Bonjour, le bien #{i} correspond à votre alerte.</p>'
+        )
+        for i in range(count)
+    ]
+
+
+def _report(label, handler, count, elapsed):
+    print(f"  {label:<32} {count} messages en {elapsed:6.2f}s - {count / max(elapsed, 1e-9):8.1f} msg/s "
+          f"({handler.sessions} session(s) SMTP)")
+
+
+def run_benchmark(messages=300, session_latency=0.15, connections=2, max_per_connection=100):
+    handler = _CountingHandler(session_latency)
+    port = _free_port()
+    controller = Controller(handler, hostname='127.0.0.1', port=port)
+    controller.start()
+
+    try:
+        app, mail = _build_app(port, max_per_connection)
+        print(f"\n{'='*60}")
+        print(f"  Serveur SMTP local : 127.0.0.1:{port} (latence de session {session_latency}s)")
+        print(f"{'='*60}\n")
+
+        with app.app_context():
+            # Avant : une session SMTP par message (comportement de mail.send)
+            started = time.perf_counter()
+            for msg in _messages(messages):
+                mail.send(msg)
+            _report('Avant (mail.send)', handler, messages, time.perf_counter() - started)
+
+            # Après : pool de connexions réutilisées
+            handler.sessions = handler.messages = 0
+            pool = SMTPConnectionPool(app, size=connections, max_messages_per_connection=max_per_connection)
+            started = time.perf_counter()
+            errors = pool.send_messages(_messages(messages))
+            elapsed = time.perf_counter() - started
+            pool.close()
+            _report(f'Après (pool x{connections})', handler, messages, elapsed)
+
+            failed = sum(1 for e in errors if e is not None)
+            if failed or handler.messages != messages:
+                print(f"\n  ⚠️  {failed} échec(s), {handler.messages} message(s) reçu(s) par le serveur.")
+    finally:
+        controller.stop()
+    print()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark mail.send vs pool de connexions SMTP')
+    parser.add_argument('--messages', type=int, default=300, help='Messages envoyés par scénario')
+    parser.add_argument('--session-latency', type=float, default=0.15, help='Latence simulée par session SMTP (s)')
+    parser.add_argument('--connections', type=int, default=2, help='Connexions du pool')
+    parser.add_argument('--max-per-connection', type=int, default=100, help='Messages par session avant renouvellement')
+    args = parser.parse_args()
+
+    run_benchmark(messages=args.messages, session_latency=args.session_latency,
+                  connections=args.connections, max_per_connection=args.max_per_connection)
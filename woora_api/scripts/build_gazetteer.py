@@ -0,0 +1,189 @@
+"""
+Construction du gazetteer hors ligne de l'autocomplétion (app/geocoding/gazetteer.py)
+=====================================================================================
+Sources :
+- un extrait OpenStreetMap au format XML (.osm, .osm.gz, .osm.bz2) : nœuds place=city/town/village/... ;
+  un extrait .osm.pbf se convertit avec : osmium cat extrait.osm.pbf -o extrait.osm
+  (extraits par pays : https://download.geofabrik.de/africa.html) ;
+- les villes des biens validés (Properties.city), position moyenne des biens de la ville.
+Les entrées sont fusionnées avec le fichier existant (une entrée par nom replié et par pays, la mieux
+classée l'emporte).
+
+Usage:
+    Depuis le dossier woora_api/ :
+    python scripts/build_gazetteer.py --osm benin.osm.bz2 --country BJ
+    python scripts/build_gazetteer.py --from-properties
+
+    Options :
+    --output PATH          fichier produit (défaut: GEOCODING_GAZETTEER_PATH)
+    --replace              ignorer le contenu du fichier existant
+    --min-properties 2     nombre minimal de biens pour retenir une ville saisie par les propriétaires
+    --default-country BJ   code pays des biens dont le pays n'est pas reconnu
+"""
+
+import sys
+import os
+import bz2
+import gzip
+import argparse
+import xml.etree.ElementTree as ET
+from collections import Counter, defaultdict
+
+# Ajouter le dossier parent au path pour importer l'app Flask
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app import create_app, db
+from app.models import Property
+from app.geocoding.gazetteer import (
+    PLACE_TYPE_RANKS, fold_place_name, place_rank, read_gazetteer_rows, write_gazetteer_rows
+)
+
+# Pays tels que saisis dans Properties.country -> code ISO
+COUNTRY_CODES = {
+    'benin': 'BJ', 'senegal': 'SN', 'togo': 'TG', 'cote d ivoire': 'CI', 'ivory coast': 'CI',
+    'burkina faso': 'BF', 'niger': 'NE', 'nigeria': 'NG', 'mali': 'ML', 'ghana': 'GH',
+    'guinee': 'GN', 'cameroun': 'CM', 'gabon': 'GA', 'france': 'FR',
+}
+
+
+def _open_extract(path):
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rb')
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def load_osm_places(path, country_code, country_name=None):
+    """Nœuds place=* nommés d'un extrait OSM XML (lecture en flux, mémoire constante)."""
+    rows = []
+    with _open_extract(path) as f:
+        for _, element in ET.iterparse(f, events=('end',)):
+            if element.tag not in ('node', 'way', 'relation'):
+                continue
+            if element.tag == 'node':
+                tags = {tag.get('k'): tag.get('v') for tag in element.iter('tag')}
+                place_type = tags.get('place')
+                name = tags.get('name:fr') or tags.get('name')
+                if place_type in PLACE_TYPE_RANKS and name:
+                    rows.append({
+                        'country_code': country_code,
+                        'name': name.strip(),
+                        'type': place_type,
+                        'latitude': element.get('lat'),
+                        'longitude': element.get('lon'),
+                        'state': tags.get('is_in:state') or tags.get('addr:state') or '',
+                        'country': country_name or tags.get('is_in:country') or '',
+                        'osm_id': element.get('id'),
+                    })
+            element.clear()
+    return rows
+
+
+def load_property_cities(min_properties=2, default_country=None):
+    """Villes des biens validés : orthographe la plus fréquente, position moyenne des biens."""
+    spellings = defaultdict(Counter)
+    positions = defaultdict(list)
+    countries = {}
+
+    query = db.session.query(Property.city, Property.country, Property.latitude, Property.longitude).filter(
+        Property.is_validated == True,
+        Property.city != None
+    )
+    for city, country, latitude, longitude in query.yield_per(1000):
+        country_code = COUNTRY_CODES.get(fold_place_name(country)) or default_country
+        key = fold_place_name(city)
+        if not country_code or len(key) < 2:
+            continue
+        spellings[(country_code, key)][city.strip()] += 1
+        countries.setdefault((country_code, key), (country or '').strip())
+        if latitude is not None and longitude is not None:
+            positions[(country_code, key)].append((float(latitude), float(longitude)))
+
+    rows = []
+    for (country_code, key), names in spellings.items():
+        if sum(names.values()) < min_properties:
+            continue
+        points = positions.get((country_code, key))
+        rows.append({
+            'country_code': country_code,
+            'name': names.most_common(1)[0][0],
+            'type': 'locality',
+            'latitude': f"{sum(p[0] for p in points) / len(points):.6f}" if points else '',
+            'longitude': f"{sum(p[1] for p in points) / len(points):.6f}" if points else '',
+            'state': '',
+            'country': countries[(country_code, key)],
+            'osm_id': '',
+        })
+    return rows
+
+
+def merge_rows(*sources):
+    """Une entrée par (pays, nom replié) : la mieux classée (ville > village > ... > ville saisie) l'emporte."""
+    merged = {}
+    for rows in sources:
+        for row in rows:
+            key = (row['country_code'].upper(), fold_place_name(row['name']))
+            if not key[1]:
+                continue
+            row['country_code'] = key[0]
+            current = merged.get(key)
+            if current is None or place_rank(row['type']) < place_rank(current['type']):
+                merged[key] = row
+    return list(merged.values())
+
+
+def run_build(osm=None, country=None, country_name=None, from_properties=False, output=None,
+              replace=False, min_properties=2, default_country=None):
+    app = create_app()
+    with app.app_context():
+        output = output or app.config['GEOCODING_GAZETTEER_PATH']
+        sources = []
+
+        if not replace and os.path.exists(output):
+            existing = list(read_gazetteer_rows(output))
+            print(f"  Fichier existant : {len(existing)} localité(s)")
+            sources.append(existing)
+
+        if osm:
+            places = load_osm_places(osm, country.upper(), country_name)
+            print(f"  Extrait OSM {osm} : {len(places)} localité(s)")
+            sources.append(places)
+
+        if from_properties:
+            cities = load_property_cities(min_properties, default_country and default_country.upper())
+            print(f"  Villes des biens : {len(cities)} localité(s)")
+            sources.append(cities)
+
+        rows = merge_rows(*sources)
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        count = write_gazetteer_rows(output, rows)
+        by_country = Counter(row['country_code'] for row in rows)
+        print(f"\n  ✅  {count} localité(s) écrite(s) dans {output} : {dict(sorted(by_country.items()))}\n")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Construction du gazetteer hors ligne de l'autocomplétion")
+    parser.add_argument('--osm', default=None, help='Extrait OSM XML (.osm, .osm.gz, .osm.bz2)')
+    parser.add_argument('--country', default=None, help="Code pays ISO de l'extrait OSM (ex: BJ)")
+    parser.add_argument('--country-name', default=None, help="Nom du pays affiché dans les suggestions (ex: Bénin)")
+    parser.add_argument('--from-properties', action='store_true', help='Ajouter les villes des biens validés')
+    parser.add_argument('--output', default=None, help='Fichier produit (défaut: GEOCODING_GAZETTEER_PATH)')
+    parser.add_argument('--replace', action='store_true', help='Ignorer le contenu du fichier existant')
+    parser.add_argument('--min-properties', type=int, default=2, help='Biens minimum pour retenir une ville saisie')
+    parser.add_argument('--default-country', default=None, help='Code pays des biens dont le pays est inconnu')
+    args = parser.parse_args()
+
+    if args.osm and not args.country:
+        parser.error('--country est requis avec --osm')
+    if args.osm and args.osm.endswith('.pbf'):
+        parser.error('Format PBF non supporté : convertir avec "osmium cat extrait.osm.pbf -o extrait.osm"')
+    if not args.osm and not args.from_properties:
+        parser.error('Indiquer au moins une source : --osm et/ou --from-properties')
+
+    run_build(osm=args.osm, country=args.country, country_name=args.country_name,
+              from_properties=args.from_properties, output=args.output, replace=args.replace,
+              min_properties=args.min_properties, default_country=args.default_country)
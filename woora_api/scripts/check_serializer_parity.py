@@ -0,0 +1,85 @@
+"""
+Contrôle de parité du sérialiseur rapide des listings
+======================================================
+Compare, bien par bien, la sortie JSON de serialize_property_ids() (tuples, sans hydratation ORM)
+avec celle de Property.to_dict(). Les deux doivent être identiques octet pour octet
+(mêmes clés, même ordre, mêmes valeurs). Lecture seule : aucune écriture en base.
+
+Usage:
+    Depuis le dossier woora_api/ :
+    python scripts/check_serializer_parity.py
+
+    Limiter le contrôle aux N premiers biens :
+    python scripts/check_serializer_parity.py --limit 500
+
+Code de sortie 1 si au moins une différence est trouvée.
+"""
+
+import sys
+import os
+import json
+import argparse
+
+# Ajouter le dossier parent au path pour importer l'app Flask
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app import create_app, db
+from app.models import Property
+from app.utils.serialization_utils import serialize_property_ids
+
+BATCH_SIZE = 200
+
+
+def _dump(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def run_check(limit=None):
+    app = create_app()
+
+    with app.app_context():
+        query = db.session.query(Property.id).order_by(Property.id)
+        if limit:
+            query = query.limit(limit)
+        property_ids = [pid for (pid,) in query.all()]
+        total = len(property_ids)
+        mismatches = 0
+
+        print(f"\n{'='*60}")
+        print(f"  Biens à comparer : {total}")
+        print(f"{'='*60}\n")
+
+        for start in range(0, total, BATCH_SIZE):
+            batch_ids = property_ids[start:start + BATCH_SIZE]
+            fast = {d['id']: _dump(d) for d in serialize_property_ids(batch_ids)}
+
+            for prop in Property.query.filter(Property.id.in_(batch_ids)).order_by(Property.id).all():
+                expected = _dump(prop.to_dict())
+                if fast.get(prop.id) != expected:
+                    mismatches += 1
+                    print(f"  ✗ Bien #{prop.id} : sortie différente")
+                    print(f"      to_dict()  : {expected}")
+                    print(f"      rapide     : {fast.get(prop.id)}")
+
+            # Libère l'identity map entre deux lots
+            db.session.expunge_all()
+            print(f"  Comparés : {min(start + BATCH_SIZE, total)}/{total}")
+
+        print(f"\n{'='*60}")
+        if mismatches:
+            print(f"  ❌  {mismatches} bien(s) avec une sortie différente.")
+        else:
+            print(f"  ✅  Parité complète sur {total} bien(s).")
+        print(f"{'='*60}\n")
+        return mismatches
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Vérifie la parité serialize_property_ids() / Property.to_dict()')
+    parser.add_argument('--limit', type=int, default=None, help='Nombre maximum de biens à comparer')
+    args = parser.parse_args()
+
+    sys.exit(1 if run_check(limit=args.limit) else 0)
@@ -0,0 +1,109 @@
+"""
+Worker d'envoi des emails (EmailOutbox)
+=======================================
+Les routes n'envoient plus d'email pendant la requête HTTP : email_utils enregistre le message dans
+l'outbox (même transaction que la modification métier) et ce worker l'envoie par lots.
+Plusieurs workers peuvent tourner en parallèle (verrouillage SELECT ... FOR UPDATE SKIP LOCKED).
+Chaque worker garde un petit pool de connexions SMTP authentifiées (app/utils/smtp_pool.py) : pas de
+handshake TLS ni de login par message, reconnexion automatique, session renouvelée après
+MAIL_MAX_EMAILS_PER_CONNECTION messages.
+Un email en échec est retenté avec un backoff exponentiel, puis passé en 'dead' après max_attempts.
+
+Usage:
+    Depuis le dossier woora_api/ :
+    python scripts/email_worker.py
+
+    Vider l'outbox puis s'arrêter (cron, debug) :
+    python scripts/email_worker.py --once
+
+    Options :
+    --batch-size 50       emails par lot (défaut: 50)
+    --poll-interval 2     attente (secondes) quand l'outbox est vide
+    --connections 2       connexions SMTP du pool (défaut: MAIL_POOL_SIZE)
+    --requeue-dead        remettre en file les emails en dead-letter avant de démarrer
+"""
+
+import sys
+import os
+import time
+import signal
+import argparse
+
+# Ajouter le dossier parent au path pour importer l'app Flask
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app import create_app, db
+from app.models import EmailOutbox
+from app.utils.job_queue import default_worker_name
+from app.utils.email_outbox import process_email_batch, requeue_dead_emails, OUTBOX_BATCH_SIZE
+from app.utils.smtp_pool import SMTPConnectionPool
+
+_stop_requested = False
+
+
+def _request_stop(signum, frame):
+    global _stop_requested
+    _stop_requested = True
+    print(f"\n  Signal {signum} reçu : arrêt après le lot en cours...")
+
+
+def run_worker(once=False, batch_size=OUTBOX_BATCH_SIZE, poll_interval=2.0, requeue_dead=False, connections=None):
+    app = create_app()
+    worker_name = default_worker_name()
+
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    with app.app_context():
+        EmailOutbox.__table__.create(db.engine, checkfirst=True)
+
+        if requeue_dead:
+            requeued = requeue_dead_emails()
+            db.session.commit()
+            print(f"  ♻️  {requeued} email(s) en dead-letter remis en file.")
+
+        pool = SMTPConnectionPool(app, size=connections)
+
+        print(f"\n{'='*60}")
+        print(f"  Worker email : {worker_name}")
+        print(f"  Connexions SMTP : {pool.size}")
+        print(f"  Mode : {'ONCE (vide l outbox puis s arrête)' if once else 'CONTINU'}")
+        print(f"{'='*60}\n")
+
+        total_processed = total_sent = 0
+        while not _stop_requested:
+            try:
+                processed, sent = process_email_batch(worker_name, batch_size, pool=pool)
+                total_processed += processed
+                total_sent += sent
+                if processed:
+                    continue
+            except Exception as e:
+                # Erreur d'infrastructure (connexion base...) : on patiente avant de réessayer
+                db.session.rollback()
+                app.logger.error(f"❌ Worker email {worker_name}: {e}", exc_info=True)
+
+            if once:
+                break
+            db.session.remove()
+            time.sleep(poll_interval)
+
+        pool.close()
+        print(f"\n  ✅  Worker arrêté. Emails traités : {total_processed}, envoyés : {total_sent} "
+              f"({pool.sessions_opened} session(s) SMTP ouverte(s))\n")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Worker d'envoi des emails de l'outbox")
+    parser.add_argument('--once', action='store_true', help='Envoyer les emails en attente puis s\'arrêter')
+    parser.add_argument('--batch-size', type=int, default=OUTBOX_BATCH_SIZE, help='Emails par lot')
+    parser.add_argument('--poll-interval', type=float, default=2.0, help='Attente (secondes) quand l\'outbox est vide')
+    parser.add_argument('--connections', type=int, default=None, help='Connexions SMTP du pool (défaut: MAIL_POOL_SIZE)')
+    parser.add_argument('--requeue-dead', action='store_true', help='Remettre en file les emails en dead-letter')
+    args = parser.parse_args()
+
+    run_worker(once=args.once, batch_size=args.batch_size, poll_interval=args.poll_interval,
+               requeue_dead=args.requeue_dead, connections=args.connections)
@@ -0,0 +1,84 @@
+"""
+Worker de la file de tâches (BackgroundJobs)
+=============================================
+Exécute en continu les jobs enregistrés par l'API (matching des alertes, ...), hors des requêtes HTTP.
+Plusieurs workers peuvent tourner en parallèle (verrouillage SELECT ... FOR UPDATE SKIP LOCKED).
+Un job en échec est retenté avec un backoff exponentiel, puis marqué 'failed' après max_attempts.
+
+Usage:
+    Depuis le dossier woora_api/ :
+    python scripts/job_worker.py
+
+    Vider la file puis s'arrêter (cron, debug) :
+    python scripts/job_worker.py --once
+
+    Intervalle de scrutation quand la file est vide (secondes, défaut: 2) :
+    python scripts/job_worker.py --poll-interval 5
+"""
+
+import sys
+import os
+import time
+import signal
+import argparse
+
+# Ajouter le dossier parent au path pour importer l'app Flask
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app import create_app, db
+from app.models import BackgroundJob
+from app.utils.job_queue import process_next_job, default_worker_name
+
+_stop_requested = False
+
+
+def _request_stop(signum, frame):
+    global _stop_requested
+    _stop_requested = True
+    print(f"\n  Signal {signum} reçu : arrêt après le job en cours...")
+
+
+def run_worker(once=False, poll_interval=2.0):
+    app = create_app()
+    worker_name = default_worker_name()
+
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    with app.app_context():
+        BackgroundJob.__table__.create(db.engine, checkfirst=True)
+
+        print(f"\n{'='*60}")
+        print(f"  Worker : {worker_name}")
+        print(f"  Mode : {'ONCE (vide la file puis s arrête)' if once else 'CONTINU'}")
+        print(f"{'='*60}\n")
+
+        processed = 0
+        while not _stop_requested:
+            try:
+                if process_next_job(worker_name):
+                    processed += 1
+                    continue
+            except Exception as e:
+                # Erreur d'infrastructure (connexion base...) : on patiente avant de réessayer
+                db.session.rollback()
+                app.logger.error(f"❌ Worker {worker_name}: {e}", exc_info=True)
+
+            if once:
+                break
+            db.session.remove()
+            time.sleep(poll_interval)
+
+        print(f"\n  ✅  Worker arrêté. Jobs traités : {processed}\n")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Worker de la file de tâches BackgroundJobs')
+    parser.add_argument('--once', action='store_true', help='Traiter les jobs disponibles puis s\'arrêter')
+    parser.add_argument('--poll-interval', type=float, default=2.0, help='Attente (secondes) quand la file est vide')
+    args = parser.parse_args()
+
+    run_worker(once=args.once, poll_interval=args.poll_interval)
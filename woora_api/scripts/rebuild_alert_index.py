@@ -0,0 +1,90 @@
+"""
+Reconstruction de l'index inversé des alertes (PropertyRequestIndex / PropertyRequestCriteria)
+================================================================================================
+Crée les tables PropertyRequestIndex et PropertyRequestCriteria si besoin, puis indexe toutes les
+alertes existantes : critères obligatoires (type, statut souhaité, ville normalisée, fourchette de prix)
+et critères dynamiques typés extraits de request_details. À lancer une fois après le déploiement :
+sans entrée d'index, une alerte existante n'est plus proposée au moteur de matching.
+
+Usage:
+    Depuis le dossier woora_api/ :
+    python scripts/rebuild_alert_index.py
+
+    Pour réellement appliquer les changements (par défaut: dry-run):
+    python scripts/rebuild_alert_index.py --apply
+"""
+
+import sys
+import os
+import argparse
+
+# Ajouter le dossier parent au path pour importer l'app Flask
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app import create_app, db
+from app.models import PropertyRequest, PropertyRequestIndex, PropertyRequestCriteria
+from app.utils.alert_index_utils import sync_property_request_index, sync_property_request_criteria, ACTIVE_REQUEST_STATUSES
+from sqlalchemy.orm import selectinload
+
+BATCH_SIZE = 500
+
+
+def run_rebuild(apply=False):
+    app = create_app()
+
+    with app.app_context():
+        if apply:
+            PropertyRequestIndex.__table__.create(db.engine, checkfirst=True)
+            PropertyRequestCriteria.__table__.create(db.engine, checkfirst=True)
+
+        request_ids = [rid for (rid,) in db.session.query(PropertyRequest.id).order_by(PropertyRequest.id).all()]
+        total = len(request_ids)
+        active = 0
+        criteria_count = 0
+
+        print(f"\n{'='*60}")
+        print(f"  Alertes à indexer : {total}")
+        print(f"  Mode : {'APPLY (écriture réelle)' if apply else 'DRY-RUN (aucun changement)'}")
+        print(f"{'='*60}\n")
+
+        for start in range(0, total, BATCH_SIZE):
+            batch_ids = request_ids[start:start + BATCH_SIZE]
+            query = PropertyRequest.query.filter(PropertyRequest.id.in_(batch_ids))
+            if apply:
+                query = query.options(selectinload(PropertyRequest.criteria))
+            for req in query.all():
+                if req.status in ACTIVE_REQUEST_STATUSES:
+                    active += 1
+                if apply:
+                    criteria_count += len(sync_property_request_criteria(req))
+                    sync_property_request_index(req)
+
+            if apply:
+                try:
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"  ✗ ERREUR sur le lot {start}-{start + len(batch_ids)}: {e}")
+                    continue
+            print(f"  Traitées : {min(start + BATCH_SIZE, total)}/{total}")
+
+        print(f"\n{'='*60}")
+        print(f"  Alertes actives : {active}")
+        if apply:
+            print(f"  Critères dynamiques enregistrés : {criteria_count}")
+        if not apply:
+            print(f"\n  ⚠️  C'était un DRY-RUN. Ajoutez --apply pour appliquer réellement.")
+        else:
+            print(f"\n  ✅  Index des alertes reconstruit.")
+        print(f"{'='*60}\n")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Reconstruit l'index inversé des alertes (PropertyRequestIndex / PropertyRequestCriteria)")
+    parser.add_argument('--apply', action='store_true', help='Appliquer réellement la reconstruction (défaut: dry-run)')
+    args = parser.parse_args()
+
+    run_rebuild(apply=args.apply)
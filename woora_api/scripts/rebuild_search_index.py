@@ -0,0 +1,83 @@
+"""
+Reconstruction du read-model de recherche (PropertySearchIndex)
+================================================================
+Crée les tables PropertySearchIndex / PropertySearchIndexValues / PropertySearchDocuments
+(index plein-texte) si besoin, puis resynchronise tous les biens. À lancer une fois après le déploiement,
+puis à chaque fois qu'un doute existe sur la cohérence du read-model.
+
+Usage:
+    Depuis le dossier woora_api/ :
+    python scripts/rebuild_search_index.py
+
+    Pour réellement appliquer les changements (par défaut: dry-run):
+    python scripts/rebuild_search_index.py --apply
+"""
+
+import sys
+import os
+import argparse
+
+# Ajouter le dossier parent au path pour importer l'app Flask
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app import create_app, db
+from app.models import Property, PropertySearchIndex, PropertySearchIndexValue, PropertySearchDocument
+from app.utils.search_index_utils import sync_property_search_index, is_publicly_visible
+
+BATCH_SIZE = 200
+
+
+def run_rebuild(apply=False):
+    app = create_app()
+
+    with app.app_context():
+        if apply:
+            PropertySearchIndex.__table__.create(db.engine, checkfirst=True)
+            PropertySearchIndexValue.__table__.create(db.engine, checkfirst=True)
+            # Index FULLTEXT (MySQL) / table FTS5 + triggers (SQLite) créés avec la table
+            PropertySearchDocument.__table__.create(db.engine, checkfirst=True)
+
+        property_ids = [pid for (pid,) in db.session.query(Property.id).order_by(Property.id).all()]
+        total = len(property_ids)
+        visible = 0
+
+        print(f"\n{'='*60}")
+        print(f"  Biens à synchroniser : {total}")
+        print(f"  Mode : {'APPLY (écriture réelle)' if apply else 'DRY-RUN (aucun changement)'}")
+        print(f"{'='*60}\n")
+
+        for start in range(0, total, BATCH_SIZE):
+            batch_ids = property_ids[start:start + BATCH_SIZE]
+            for prop in Property.query.filter(Property.id.in_(batch_ids)).all():
+                if is_publicly_visible(prop):
+                    visible += 1
+                if apply:
+                    sync_property_search_index(prop)
+
+            if apply:
+                try:
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"  ✗ ERREUR sur le lot {start}-{start + len(batch_ids)}: {e}")
+                    continue
+            print(f"  Traités : {min(start + BATCH_SIZE, total)}/{total}")
+
+        print(f"\n{'='*60}")
+        print(f"  Biens visibles publiquement (indexés) : {visible}")
+        if not apply:
+            print(f"\n  ⚠️  C'était un DRY-RUN. Ajoutez --apply pour appliquer réellement.")
+        else:
+            print(f"\n  ✅  Read-model reconstruit.")
+        print(f"{'='*60}\n")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Reconstruit le read-model PropertySearchIndex')
+    parser.add_argument('--apply', action='store_true', help='Appliquer réellement la reconstruction (défaut: dry-run)')
+    args = parser.parse_args()
+
+    run_rebuild(apply=args.apply)
@@ -0,0 +1,155 @@
+"""
+Re-matching complet des alertes (PropertyRequests) contre le catalogue validé
+==============================================================================
+À lancer après un changement des règles de scoring, des noms d'attributs ou du seuil de 80%.
+Les alertes actives sont partitionnées par property_type_id. Pour chaque type, les biens validés sont
+extraits une seule fois en tableaux NumPy (app/utils/match_engine.py), puis des paquets d'alertes sont
+scorés en parallèle dans un pool de processus (chaque alerte contre tous les biens du type en une
+opération vectorisée). Les nouveaux matches sont écrits par lots
+(INSERT multi-lignes, doublons ignorés). Les matches existants ne sont jamais supprimés.
+
+Usage:
+    Depuis le dossier woora_api/ :
+    python scripts/rematch_all.py
+
+    Pour réellement écrire les matches (par défaut: dry-run, comptage uniquement):
+    python scripts/rematch_all.py --apply
+
+    Options :
+    --workers 8         nombre de processus (défaut: nombre de CPU)
+    --type-id 3         limiter à un type de bien
+    --chunk-size 500    alertes par tâche envoyée au pool
+    --notify            notifier les nouveaux matches : digest immédiat pour les chercheurs en mode 'instant',
+                        prochain digest horaire / quotidien pour les autres (défaut: non, matches marqués
+                        comme déjà notifiés)
+"""
+
+import sys
+import os
+import time
+import argparse
+import multiprocessing
+
+# Ajouter le dossier parent au path pour importer l'app Flask
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app import create_app, db
+from app.models import PropertyRequest
+from app.utils.alert_index_utils import ACTIVE_REQUEST_STATUSES
+from app.utils.match_engine import load_property_columns, load_alert_specs
+from app.utils.matching_utils import insert_new_match_pairs
+from app.utils.alert_digest import queue_instant_digests
+
+DEFAULT_CHUNK_SIZE = 500
+
+# Colonnes du type en cours, transmises une seule fois à chaque processus du pool
+_worker_columns = None
+
+
+def _init_worker(columns):
+    global _worker_columns
+    _worker_columns = columns
+
+
+def _score_chunk(alerts):
+    """Exécuté dans un processus du pool : retourne (nb d'alertes, couples (request_id, property_id) matchés)."""
+    pairs = []
+    for alert in alerts:
+        for property_id in _worker_columns.match_alert(alert).tolist():
+            pairs.append((alert.id, property_id))
+    return len(alerts), pairs
+
+
+def run_rematch(apply=False, workers=None, type_id=None, chunk_size=DEFAULT_CHUNK_SIZE, notify=False):
+    app = create_app()
+    workers = workers or multiprocessing.cpu_count()
+
+    with app.app_context():
+        type_query = db.session.query(PropertyRequest.property_type_id).filter(
+            PropertyRequest.status.in_(ACTIVE_REQUEST_STATUSES),
+            PropertyRequest.property_type_id != None
+        ).distinct()
+        if type_id is not None:
+            type_query = type_query.filter(PropertyRequest.property_type_id == type_id)
+        type_ids = sorted(t for (t,) in type_query.all())
+
+        print(f"\n{'='*60}")
+        print(f"  Types de bien à traiter : {len(type_ids)}")
+        print(f"  Processus : {workers}")
+        print(f"  Mode : {'APPLY (écriture réelle)' if apply else 'DRY-RUN (aucun changement)'}")
+        print(f"{'='*60}\n")
+
+        started = time.perf_counter()
+        total_alerts = total_pairs_scored = total_matches = total_new = 0
+
+        for property_type_id in type_ids:
+            type_started = time.perf_counter()
+            columns = load_property_columns(property_type_id)
+            alerts = load_alert_specs(statuses=ACTIVE_REQUEST_STATUSES, property_type_id=property_type_id)
+            if not alerts or not len(columns):
+                print(f"  Type #{property_type_id} : {len(alerts)} alerte(s), {len(columns)} bien(s) - ignoré")
+                continue
+
+            alerts_by_id = {a.id: a for a in alerts}
+            chunks = [alerts[i:i + chunk_size] for i in range(0, len(alerts), chunk_size)]
+            type_matches = type_new = 0
+
+            # Les processus forkés ne doivent pas hériter des connexions ouvertes du pool SQLAlchemy
+            db.session.commit()
+            db.engine.dispose()
+
+            with multiprocessing.Pool(processes=workers, initializer=_init_worker, initargs=(columns,)) as pool:
+                for scored_alerts, pairs in pool.imap_unordered(_score_chunk, chunks):
+                    type_matches += len(pairs)
+                    if apply and pairs:
+                        try:
+                            new_pairs = insert_new_match_pairs(pairs, notified=not notify)
+                            if notify and new_pairs:
+                                # Un digest par chercheur du lot (emails commités avec les matches)
+                                queue_instant_digests({alerts_by_id[request_id].customer_id for request_id, _ in new_pairs})
+                            db.session.commit()
+                        except Exception as e:
+                            db.session.rollback()
+                            print(f"  ✗ ERREUR d'écriture d'un lot (type #{property_type_id}): {e}")
+                            continue
+                        type_new += len(new_pairs)
+
+            elapsed = time.perf_counter() - type_started
+            pairs_scored = len(alerts) * len(columns)
+            total_alerts += len(alerts)
+            total_pairs_scored += pairs_scored
+            total_matches += type_matches
+            total_new += type_new
+            print(
+                f"  Type #{property_type_id} : {len(alerts)} alertes x {len(columns)} biens, "
+                f"{type_matches} matches ({type_new} nouveaux) en {elapsed:.1f}s "
+                f"- {pairs_scored / max(elapsed, 1e-9):,.0f} couples/s"
+            )
+
+        elapsed = time.perf_counter() - started
+        print(f"\n{'='*60}")
+        print(f"  Alertes traitées : {total_alerts} ({total_alerts / max(elapsed, 1e-9):,.0f} alertes/s)")
+        print(f"  Couples évalués  : {total_pairs_scored} ({total_pairs_scored / max(elapsed, 1e-9):,.0f} couples/s)")
+        print(f"  Matches trouvés  : {total_matches}")
+        print(f"  Durée totale     : {elapsed:.1f}s")
+        if not apply:
+            print(f"\n  ⚠️  C'était un DRY-RUN. Ajoutez --apply pour écrire les matches.")
+        else:
+            print(f"\n  ✅  {total_new} nouveau(x) match(es) enregistré(s).")
+        print(f"{'='*60}\n")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Re-matching complet des alertes contre les biens validés')
+    parser.add_argument('--apply', action='store_true', help='Écrire réellement les matches (défaut: dry-run)')
+    parser.add_argument('--workers', type=int, default=None, help='Nombre de processus (défaut: nombre de CPU)')
+    parser.add_argument('--type-id', type=int, default=None, help='Limiter à un type de bien')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Alertes par tâche du pool')
+    parser.add_argument('--notify', action='store_true', help='Notifier les nouveaux matches (digests)')
+    args = parser.parse_args()
+
+    run_rematch(apply=args.apply, workers=args.workers, type_id=args.type_id,
+                chunk_size=args.chunk_size, notify=args.notify)
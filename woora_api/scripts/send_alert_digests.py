@@ -0,0 +1,86 @@
+"""
+Envoi des digests d'alerte horaires / quotidiens
+================================================
+Les chercheurs en mode 'hourly' ou 'daily' (Users.alert_digest_frequency) ne reçoivent pas d'email à
+chaque matching : leurs nouveaux matches (PropertyRequestMatches.notified_at NULL) sont regroupés ici en
+un seul email par chercheur, au plus une fois par heure / par jour (voir app/utils/alert_digest.py).
+Les emails sont mis en file dans l'outbox et envoyés par scripts/email_worker.py.
+Les chercheurs en mode 'instant' dont un digest aurait échoué sont rattrapés au passage.
+
+Usage:
+    Depuis le dossier woora_api/ :
+    python scripts/send_alert_digests.py
+
+    Un seul passage puis arrêt (cron) :
+    python scripts/send_alert_digests.py --once
+
+    Options :
+    --interval 300     attente (secondes) entre deux passages
+    --dry-run          afficher les chercheurs dus sans rien envoyer
+"""
+
+import sys
+import os
+import time
+import signal
+import argparse
+
+# Ajouter le dossier parent au path pour importer l'app Flask
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app import create_app, db
+from app.utils.alert_digest import due_customer_ids, send_due_digests
+
+_stop_requested = False
+
+
+def _request_stop(signum, frame):
+    global _stop_requested
+    _stop_requested = True
+    print(f"\n  Signal {signum} reçu : arrêt après le passage en cours...")
+
+
+def run_digests(once=False, interval=300.0, dry_run=False):
+    app = create_app()
+
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    with app.app_context():
+        print(f"\n{'='*60}")
+        print(f"  Digests d'alerte")
+        print(f"  Mode : {'DRY-RUN (aucun envoi)' if dry_run else ('ONCE' if once else 'CONTINU')}")
+        print(f"{'='*60}\n")
+
+        while not _stop_requested:
+            try:
+                if dry_run:
+                    customer_ids = due_customer_ids()
+                    print(f"  {len(customer_ids)} chercheur(s) avec un digest dû : {customer_ids[:50]}")
+                    break
+                digests, matches = send_due_digests()
+                if digests:
+                    print(f"  📬 {digests} digest(s) mis en file ({matches} bien(s) annoncé(s)).")
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(f"❌ Digests d'alerte: {e}", exc_info=True)
+
+            if once:
+                break
+            db.session.remove()
+            time.sleep(interval)
+
+        print(f"\n  ✅  Arrêt.\n")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Envoi des digests d'alerte horaires / quotidiens")
+    parser.add_argument('--once', action='store_true', help='Un seul passage puis arrêt')
+    parser.add_argument('--interval', type=float, default=300.0, help='Attente (secondes) entre deux passages')
+    parser.add_argument('--dry-run', action='store_true', help='Afficher les chercheurs dus sans rien envoyer')
+    args = parser.parse_args()
+
+    run_digests(once=args.once, interval=args.interval, dry_run=args.dry_run)
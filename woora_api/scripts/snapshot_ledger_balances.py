@@ -0,0 +1,91 @@
+"""
+Snapshots des soldes du grand livre
+===================================
+Fige périodiquement dans LedgerBalanceSnapshots le solde et les cumuls (commissions gagnées, montants virés) de chaque compte
+du grand livre (app/utils/ledger.py) : les lectures (GET /agents/commissions, /agents/commissions/summary)
+n'additionnent plus que les écritures enregistrées depuis le dernier passage.
+Chaque passage compare, par compte, le nombre d'écritures et le plus grand id à ceux du snapshot, et ne
+recalcule que les comptes qui ont changé. Une écriture validée en retard (id inférieur au dernier figé) est
+reprise au passage suivant ; d'ici là, les lectures ne la voient pas.
+Un seul processus à la fois (ligne 'ledger' du Procfile).
+
+Usage:
+    Depuis le dossier woora_api/ :
+    python scripts/snapshot_ledger_balances.py
+
+    Un seul passage puis arrêt (cron) :
+    python scripts/snapshot_ledger_balances.py --once
+
+    Options :
+    --interval 300     attente (secondes) entre deux passages
+    --verify           comparer Users.wallet_balance au solde du grand livre (agents) et afficher les écarts
+"""
+
+import sys
+import os
+import time
+import signal
+import argparse
+
+# Ajouter le dossier parent au path pour importer l'app Flask
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app import create_app, db
+from app.utils.ledger import refresh_balance_snapshots, find_wallet_drifts
+
+_stop_requested = False
+
+
+def _request_stop(signum, frame):
+    global _stop_requested
+    _stop_requested = True
+    print(f"\n  Signal {signum} reçu : arrêt après le passage en cours...")
+
+
+def run_snapshots(once=False, interval=300.0, verify=False):
+    app = create_app()
+
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    with app.app_context():
+        print(f"\n{'='*60}")
+        print(f"  Snapshots du grand livre")
+        print(f"  Mode : {'VERIFY' if verify else ('ONCE' if once else 'CONTINU')}")
+        print(f"{'='*60}\n")
+
+        while not _stop_requested:
+            try:
+                if verify:
+                    drifts = find_wallet_drifts()
+                    for user_id, wallet_balance, ledger_balance in drifts:
+                        print(f"  ⚠️  Agent {user_id} : wallet_balance {wallet_balance} / grand livre {ledger_balance}")
+                    print(f"  {len(drifts)} écart(s) trouvé(s).")
+                    break
+                accounts = refresh_balance_snapshots()
+                db.session.commit()
+                if accounts:
+                    print(f"  📒 {accounts} compte(s) mis à jour.")
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(f"❌ Snapshots du grand livre: {e}", exc_info=True)
+
+            if once:
+                break
+            db.session.remove()
+            time.sleep(interval)
+
+        print(f"\n  ✅  Arrêt.\n")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Snapshots des soldes du grand livre')
+    parser.add_argument('--once', action='store_true', help='Un seul passage puis arrêt')
+    parser.add_argument('--interval', type=float, default=300.0, help='Attente (secondes) entre deux passages')
+    parser.add_argument('--verify', action='store_true', help='Comparer les soldes au grand livre')
+    args = parser.parse_args()
+
+    run_snapshots(once=args.once, interval=args.interval, verify=args.verify)
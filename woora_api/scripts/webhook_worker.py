@@ -0,0 +1,99 @@
+"""
+Worker des webhooks FedaPay (WebhookEvents)
+===========================================
+Les routes webhook ne font plus que vérifier la signature et enregistrer l'événement (réponse 200 immédiate) ;
+ce worker applique les événements par lots : passes de visite créditées, versements des commissions soldés.
+Plusieurs workers peuvent tourner en parallèle (verrouillage SELECT ... FOR UPDATE SKIP LOCKED).
+Un événement en échec (transaction locale introuvable...) est retenté avec un backoff exponentiel,
+puis marqué 'failed' après max_attempts.
+
+Usage:
+    Depuis le dossier woora_api/ :
+    python scripts/webhook_worker.py
+
+    Appliquer les événements en attente puis s'arrêter (cron, debug) :
+    python scripts/webhook_worker.py --once
+
+    Options :
+    --batch-size 50       événements par lot (défaut: 50)
+    --poll-interval 2     attente (secondes) quand la file est vide
+    --retry-failed        remettre en file les événements en échec avant de démarrer
+"""
+
+import sys
+import os
+import time
+import signal
+import argparse
+
+# Ajouter le dossier parent au path pour importer l'app Flask
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app import create_app, db
+from app.models import WebhookEvent
+from app.utils.job_queue import default_worker_name
+from app.utils.webhook_events import process_webhook_batch, requeue_failed_events, WEBHOOK_BATCH_SIZE
+
+_stop_requested = False
+
+
+def _request_stop(signum, frame):
+    global _stop_requested
+    _stop_requested = True
+    print(f"\n  Signal {signum} reçu : arrêt après le lot en cours...")
+
+
+def run_worker(once=False, batch_size=WEBHOOK_BATCH_SIZE, poll_interval=2.0, retry_failed=False):
+    app = create_app()
+    worker_name = default_worker_name()
+
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    with app.app_context():
+        WebhookEvent.__table__.create(db.engine, checkfirst=True)
+
+        if retry_failed:
+            requeued = requeue_failed_events()
+            db.session.commit()
+            print(f"  ♻️  {requeued} événement(s) en échec remis en file.")
+
+        print(f"\n{'='*60}")
+        print(f"  Worker webhooks : {worker_name}")
+        print(f"  Mode : {'ONCE (vide la file puis s arrête)' if once else 'CONTINU'}")
+        print(f"{'='*60}\n")
+
+        total_processed = total_done = 0
+        while not _stop_requested:
+            try:
+                processed, done = process_webhook_batch(worker_name, batch_size)
+                total_processed += processed
+                total_done += done
+                if processed:
+                    continue
+            except Exception as e:
+                # Erreur d'infrastructure (connexion base...) : on patiente avant de réessayer
+                db.session.rollback()
+                app.logger.error(f"❌ Worker webhooks {worker_name}: {e}", exc_info=True)
+
+            if once:
+                break
+            db.session.remove()
+            time.sleep(poll_interval)
+
+        print(f"\n  ✅  Worker arrêté. Événements traités : {total_processed}, appliqués ou ignorés : {total_done}\n")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Worker des webhooks FedaPay')
+    parser.add_argument('--once', action='store_true', help='Appliquer les événements en attente puis s\'arrêter')
+    parser.add_argument('--batch-size', type=int, default=WEBHOOK_BATCH_SIZE, help='Événements par lot')
+    parser.add_argument('--poll-interval', type=float, default=2.0, help='Attente (secondes) quand la file est vide')
+    parser.add_argument('--retry-failed', action='store_true', help='Remettre en file les événements en échec')
+    args = parser.parse_args()
+
+    run_worker(once=args.once, batch_size=args.batch_size, poll_interval=args.poll_interval,
+               retry_failed=args.retry_failed)